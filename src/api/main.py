@@ -1,7 +1,9 @@
 import os
+import json
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 from src.services.instagram_service import (
     instagram_create_media,
     instagram_publish_media
@@ -15,7 +17,25 @@ from src.services.linkedin_service import (
     linkedin_post_image
 )
 from src.services.content_publisher import ContentPublisher
-from src.services.intelligent_publisher import IntelligentPublisher
+from src.services.intelligent_publisher import (
+    COMMAND_STATS,
+    PROCESSING_STATS,
+    RELAY_STATS,
+    STAGE_STATS,
+    IntelligentPublisher,
+)
+from src.services.response_cache import get_default_cache
+from src.services.asset_store import get_default_asset_store
+from src.services.run_store import RunConflictError, get_default_run_store
+from src.services.llm_backend import DEFAULT_CHAT_MODEL
+from src.services.llm_adapter import (
+    DIGEST_STATS,
+    HEDGER,
+    PROMPT_REGISTRY,
+    SINGLE_FLIGHT,
+    TIER_STATS,
+    TOKEN_BUDGETER
+)
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -55,6 +75,10 @@ class ContentGenerationRequest(BaseModel):
     platforms: List[str] = ["facebook", "instagram"]
     auto_publish: bool = False
     image_url: Optional[str] = None
+    generation_mode: Optional[str] = None  # "per_platform" o "combined"
+    use_cache: bool = True  # Si es False, ignora la caché de respuestas del LLM
+    preference: Optional[str] = None  # "latency", "balanced" o "quality" (nivel de modelo)
+    run_id: Optional[str] = None  # Reanuda una ejecución anterior sin repetir sus etapas completadas
 
 
 class ContentPreviewRequest(BaseModel):
@@ -62,12 +86,17 @@ class ContentPreviewRequest(BaseModel):
     heading: str
     material: str
     platforms: List[str] = ["facebook", "instagram"]
+    generation_mode: Optional[str] = None  # "per_platform" o "combined"
+    use_cache: bool = True  # Si es False, ignora la caché de respuestas del LLM
+    preference: Optional[str] = None  # "latency", "balanced" o "quality" (nivel de modelo)
 
 
 class NaturalCommandRequest(BaseModel):
     """Modelo para comando en lenguaje natural"""
     command: str
     test_mode: bool = False  # Si es True, solo genera contenido sin publicar
+    one_shot: Optional[bool] = None  # Analizar y redactar en una sola llamada (por defecto SMART_PUBLISH_ONE_SHOT)
+    run_id: Optional[str] = None  # Reanuda una ejecución anterior sin repetir sus etapas completadas
 
 
 # -------------------------
@@ -206,7 +235,11 @@ def generate_content_with_llm(data: ContentGenerationRequest):
             material=data.material,
             platforms=data.platforms,
             auto_publish=data.auto_publish,
-            image_url=data.image_url
+            image_url=data.image_url,
+            generation_mode=data.generation_mode,
+            use_cache=data.use_cache,
+            preference=data.preference,
+            run_id=data.run_id
         )
         
         return {
@@ -216,6 +249,9 @@ def generate_content_with_llm(data: ContentGenerationRequest):
             "data": result
         }
         
+    except RunConflictError as e:
+        # El run_id pertenece a otra solicitud: error del cliente
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -247,7 +283,10 @@ def preview_content_with_llm(data: ContentPreviewRequest):
         result = publisher.preview_content(
             heading=data.heading,
             material=data.material,
-            platforms=data.platforms
+            platforms=data.platforms,
+            generation_mode=data.generation_mode,
+            use_cache=data.use_cache,
+            preference=data.preference
         )
         
         return {
@@ -260,6 +299,76 @@ def preview_content_with_llm(data: ContentPreviewRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _get_openai_api_key() -> str:
+    """Obtiene la clave API de OpenAI o lanza un error HTTP 500."""
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    if not openai_api_key:
+        raise HTTPException(
+            status_code=500, 
+            detail="OPENAI_API_KEY no configurada en variables de entorno"
+        )
+    return openai_api_key
+
+
+async def _sse_stream(events: AsyncIterator[Dict]) -> AsyncIterator[str]:
+    """Convierte eventos del publisher al formato Server-Sent Events."""
+    try:
+        async for event in events:
+            name = event.pop("event")
+            payload = json.dumps(event, ensure_ascii=False)
+            yield f"event: {name}\ndata: {payload}\n\n"
+    except Exception as e:
+        payload = json.dumps({"error": str(e)}, ensure_ascii=False)
+        yield f"event: error\ndata: {payload}\n\n"
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@app.post("/generate-content/stream")
+async def generate_content_stream(data: ContentGenerationRequest):
+    """
+    Genera contenido con LLM en streaming (Server-Sent Events).
+    
+    Emite eventos "delta" con los fragmentos de cada plataforma a medida que se
+    generan, "platform_complete" con el JSON validado de cada plataforma y un
+    evento final "done" con el mismo contenido que /generate-content. Siempre
+    genera una llamada por plataforma (generation_mode se ignora). No usa
+    puntos de control: run_id se ignora y un reintento genera y publica de
+    nuevo; para reanudar una ejecución usa /generate-content.
+    """
+    publisher = ContentPublisher(_get_openai_api_key())
+    events = publisher.stream_generate_and_publish(
+        heading=data.heading,
+        material=data.material,
+        platforms=data.platforms,
+        auto_publish=data.auto_publish,
+        image_url=data.image_url,
+        use_cache=data.use_cache,
+        preference=data.preference
+    )
+    return StreamingResponse(_sse_stream(events), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@app.post("/preview-content/stream")
+async def preview_content_stream(data: ContentPreviewRequest):
+    """
+    Genera la vista previa en streaming (Server-Sent Events).
+    
+    Emite los mismos eventos que /generate-content/stream y un evento final
+    "done" con el contenido de /preview-content, incluidas las sugerencias de imagen.
+    """
+    publisher = ContentPublisher(_get_openai_api_key())
+    events = publisher.stream_preview_content(
+        heading=data.heading,
+        material=data.material,
+        platforms=data.platforms,
+        use_cache=data.use_cache,
+        preference=data.preference
+    )
+    return StreamingResponse(_sse_stream(events), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @app.post("/smart-publish")
 def smart_publish(data: NaturalCommandRequest):
     """
@@ -292,15 +401,15 @@ def smart_publish(data: NaturalCommandRequest):
             )
         
         # Crear publisher inteligente
-        smart_publisher = IntelligentPublisher(openai_api_key)
+        smart_publisher = IntelligentPublisher(openai_api_key, one_shot=data.one_shot)
         
         # Procesar comando en lenguaje natural
         if data.test_mode:
             # Solo generar contenido sin publicar
-            result = smart_publisher.process_natural_command_test_mode(data.command)
+            result = smart_publisher.process_natural_command_test_mode(data.command, run_id=data.run_id)
         else:
             # Generar y publicar
-            result = smart_publisher.process_natural_command(data.command)
+            result = smart_publisher.process_natural_command(data.command, run_id=data.run_id)
         
         return {
             "success": result.get("success", False),
@@ -308,6 +417,9 @@ def smart_publish(data: NaturalCommandRequest):
             "data": result
         }
         
+    except RunConflictError as e:
+        # El run_id pertenece a otra solicitud: error del cliente
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -332,11 +444,14 @@ def root():
             "/smart-publish": "🤖 Comando inteligente en lenguaje natural con DALL-E",
             "/generate-content": "Generar y publicar contenido",
             "/preview-content": "Vista previa del contenido",
+            "/generate-content/stream": "Generar contenido en streaming (SSE)",
+            "/preview-content/stream": "Vista previa en streaming (SSE)",
             "/publish/instagram": "Publicar directamente en Instagram",
             "/publish/facebook/text": "Publicar texto en Facebook",
             "/publish/facebook/image": "Publicar imagen en Facebook",
             "/publish/linkedin/text": "Publicar texto en LinkedIn",
             "/publish/linkedin/image": "Publicar imagen en LinkedIn",
+            "/metrics": "Métricas de caché y rendimiento",
             "/diagnostics": "Diagnóstico de configuración"
         },
         "smart_examples": [
@@ -349,6 +464,28 @@ def root():
     }
 
 
+@app.get("/metrics")
+def metrics():
+    """Métricas de rendimiento del pipeline de generación."""
+    cache = get_default_cache()
+    asset_store = get_default_asset_store()
+    run_store = get_default_run_store()
+    return {
+        "llm_cache": cache.stats() if cache else {"enabled": False},
+        "token_budgets": TOKEN_BUDGETER.stats(),
+        "single_flight": SINGLE_FLIGHT.stats(),
+        "llm_hedging": HEDGER.stats(),
+        "model_tiers": TIER_STATS.stats(),
+        "material_digest": DIGEST_STATS.stats(),
+        "command_parser": COMMAND_STATS.stats(),
+        "smart_publish_stages": STAGE_STATS.stats(),
+        "image_relay": RELAY_STATS.stats(),
+        "image_processing": PROCESSING_STATS.stats(),
+        "asset_store": asset_store.stats() if asset_store else {"enabled": False},
+        "run_store": run_store.stats() if run_store else {"enabled": False}
+    }
+
+
 @app.get("/diagnostics")
 def diagnostics():
     """Endpoint de diagnóstico para verificar configuración."""
@@ -379,7 +516,8 @@ def diagnostics():
             },
             "openai": {
                 "OPENAI_API_KEY_configured": bool(os.getenv("OPENAI_API_KEY"))
-            }
+            },
+            "prompt_templates": PROMPT_REGISTRY.token_report(DEFAULT_CHAT_MODEL)
         },
         "test_urls": {
             "instagram_create": f"https://graph.facebook.com/v19.0/{IG_USER_ID}/media",
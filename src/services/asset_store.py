@@ -0,0 +1,434 @@
+"""
+Almacén local de imágenes generadas y de sus identificadores en cada plataforma.
+
+Cada imagen se identifica por el SHA-256 de sus bytes y, si Pillow está
+instalado, por un hash perceptual (dHash) que reconoce imágenes casi
+idénticas. El almacén relaciona la imagen con el prompt que la generó, las
+URLs por las que se ha visto y sus identificadores en las plataformas (ID de
+la foto en Facebook y URN del asset en LinkedIn), de modo que un mismo prompt
+no se vuelve a pagar y los mismos bytes no se vuelven a subir.
+
+No se guardan tokens de acceso: de Facebook se guarda el ID de la foto y la
+URL se arma con el token vigente al usarla (ver facebook_photo_url), y las
+URLs se registran sin el parámetro access_token.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from io import BytesIO
+from typing import Dict, Iterable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Distancia de Hamming máxima entre dHash para considerar dos imágenes iguales
+DEFAULT_MAX_PHASH_DISTANCE = 4
+
+FACEBOOK_PHOTO_URL = "https://graph.facebook.com/v19.0/{photo_id}/picture"
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 de los bytes de la imagen"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def perceptual_hash(data: bytes) -> Optional[str]:
+    """
+    Calcula el dHash de 64 bits de una imagen.
+
+    Returns:
+        Optional[str]: Hash en hexadecimal, o None si Pillow no está instalado
+        o los bytes no son una imagen válida
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(BytesIO(data)) as image:
+            pixels = list(image.convert("L").resize((9, 8)).getdata())
+    except Exception as e:
+        logger.warning(f"No se pudo calcular el hash perceptual: {e}")
+        return None
+
+    bits = 0
+    for row in range(8):
+        for column in range(8):
+            left = pixels[row * 9 + column]
+            right = pixels[row * 9 + column + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:016x}"
+
+
+def facebook_photo_url(photo_id: str, access_token: Optional[str] = None) -> str:
+    """
+    URL de una foto subida a Facebook.
+
+    Args:
+        photo_id (str): ID de la foto
+        access_token (Optional[str]): Token vigente de la página; sin él, la URL
+            sirve solo como clave de búsqueda
+
+    Returns:
+        str: URL de la imagen
+    """
+    url = FACEBOOK_PHOTO_URL.format(photo_id=photo_id)
+    return f"{url}?{urlencode({'access_token': access_token})}" if access_token else url
+
+
+def strip_access_token(url: str) -> str:
+    """URL sin el parámetro access_token, para guardarla o buscarla sin el token"""
+    parts = urlsplit(url)
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != "access_token"]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _without_tokens(refs: Dict) -> Dict:
+    """Quita de las referencias guardadas las URLs que incluyen un token de acceso"""
+    return {
+        key: _without_tokens(value) if isinstance(value, dict) else value
+        for key, value in refs.items()
+        if not (isinstance(value, str) and "access_token=" in value)
+    }
+
+
+def _merge_refs(current: Dict, new: Dict) -> Dict:
+    merged = dict(current)
+    for key, value in new.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = {**merged[key], **value}
+        elif value is not None:
+            merged[key] = value
+    return merged
+
+
+class AssetStore:
+    """Imágenes direccionadas por contenido con TTL y expulsión LRU (SQLite)"""
+
+    def __init__(
+        self,
+        db_path: str,
+        ttl_seconds: float = 7 * 86400,
+        max_entries: int = 1000,
+    ):
+        """
+        Args:
+            db_path (str): Ruta del archivo SQLite compartido por los workers
+            ttl_seconds (float): Vigencia por defecto de cada imagen
+            max_entries (int): Imágenes máximas; al superarlo se expulsan las menos usadas
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {
+            "prompt_hits": 0,
+            "content_hits": 0,
+            "similar_hits": 0,
+            "url_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0,
+        }
+
+        directory = os.path.dirname(os.path.abspath(self.db_path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._get_connection()
+        connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS assets (
+                sha256 TEXT PRIMARY KEY,
+                phash TEXT,
+                size_bytes INTEGER,
+                refs TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS asset_aliases (
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                PRIMARY KEY (kind, value)
+            );
+            CREATE INDEX IF NOT EXISTS idx_assets_last_used ON assets (last_used_at);
+            """
+        )
+        self._purge_tokens(connection)
+        connection.commit()
+
+        logger.info(f"AssetStore inicializado ({self.db_path}, máximo {self.max_entries} imágenes)")
+
+    def _purge_tokens(self, connection: sqlite3.Connection):
+        """Elimina las URLs con token de acceso guardadas por versiones anteriores"""
+        connection.execute("DELETE FROM asset_aliases WHERE value LIKE '%access_token=%'")
+        rows = connection.execute("SELECT sha256, refs FROM assets WHERE refs LIKE '%access_token=%'").fetchall()
+        connection.executemany(
+            "UPDATE assets SET refs = ? WHERE sha256 = ?",
+            [(json.dumps(_without_tokens(json.loads(refs)), ensure_ascii=False), sha256) for sha256, refs in rows],
+        )
+
+    @staticmethod
+    def prompt_hash(**components) -> str:
+        """Clave estable del prompt y los parámetros de generación"""
+        serialized = json.dumps(components, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Obtiene una conexión SQLite por hilo"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _increment(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _load(self, sha256: str, counter: str) -> Optional[Dict]:
+        """Lee una imagen vigente y actualiza su último uso"""
+        now = time.time()
+        try:
+            connection = self._get_connection()
+            row = connection.execute(
+                "SELECT phash, size_bytes, refs, created_at, expires_at FROM assets WHERE sha256 = ?",
+                (sha256,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            phash, size_bytes, refs, created_at, expires_at = row
+            if expires_at <= now:
+                self._delete(connection, [sha256])
+                connection.commit()
+                self._increment("expired")
+                return None
+
+            connection.execute("UPDATE assets SET last_used_at = ? WHERE sha256 = ?", (now, sha256))
+            connection.commit()
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            logger.warning(f"Error leyendo el almacén de imágenes: {e}")
+            return None
+
+        self._increment(counter)
+        return {
+            "sha256": sha256,
+            "phash": phash,
+            "size_bytes": size_bytes,
+            "refs": json.loads(refs),
+            "created_at": created_at,
+            "expires_at": expires_at,
+        }
+
+    def _find_alias(self, kind: str, value: str, counter: str) -> Optional[Dict]:
+        try:
+            row = self._get_connection().execute(
+                "SELECT sha256 FROM asset_aliases WHERE kind = ? AND value = ?", (kind, value)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Error leyendo el almacén de imágenes: {e}")
+            row = None
+        asset = self._load(row[0], counter) if row else None
+        if asset is None:
+            self._increment("misses")
+        return asset
+
+    def find_by_prompt(self, prompt_hash: str) -> Optional[Dict]:
+        """Imagen generada previamente con el mismo prompt"""
+        return self._find_alias("prompt", prompt_hash, "prompt_hits")
+
+    def find_by_url(self, url: str) -> Optional[Dict]:
+        """Imagen publicada o descargada previamente desde esa URL"""
+        return self._find_alias("url", strip_access_token(url), "url_hits")
+
+    def find_by_content(self, sha256: str) -> Optional[Dict]:
+        """Imagen con exactamente los mismos bytes"""
+        asset = self._load(sha256, "content_hits")
+        if asset is None:
+            self._increment("misses")
+        return asset
+
+    def find_similar(
+        self, phash: Optional[str], max_distance: int = DEFAULT_MAX_PHASH_DISTANCE
+    ) -> Optional[Dict]:
+        """Imagen perceptualmente casi idéntica (distancia de Hamming entre dHash)"""
+        if not phash:
+            return None
+        try:
+            rows = self._get_connection().execute(
+                "SELECT sha256, phash FROM assets WHERE phash IS NOT NULL AND expires_at > ?",
+                (time.time(),),
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Error leyendo el almacén de imágenes: {e}")
+            return None
+
+        target = int(phash, 16)
+        best = min(
+            ((bin(target ^ int(candidate, 16)).count("1"), sha256) for sha256, candidate in rows),
+            default=None,
+        )
+        if best is None or best[0] > max_distance:
+            self._increment("misses")
+            return None
+        return self._load(best[1], "similar_hits")
+
+    def save(
+        self,
+        sha256: str,
+        refs: Dict,
+        prompt_hash: Optional[str] = None,
+        phash: Optional[str] = None,
+        size_bytes: Optional[int] = None,
+        urls: Iterable[str] = (),
+        ttl_seconds: Optional[float] = None,
+    ) -> Dict:
+        """
+        Registra una imagen o agrega identificadores a una existente.
+
+        Args:
+            sha256 (str): Hash de contenido de la imagen
+            refs (Dict): Identificadores en plataformas, por ejemplo
+                {"facebook_photo_id", "linkedin_asset_urns": {persona: urn}}
+            prompt_hash (Optional[str]): Prompt que generó la imagen
+            phash (Optional[str]): Hash perceptual
+            size_bytes (Optional[int]): Tamaño de la imagen
+            urls (Iterable[str]): URLs adicionales por las que se conoce la imagen
+                (se guardan sin el parámetro access_token)
+            ttl_seconds (Optional[float]): Vigencia específica; por defecto la del almacén
+
+        Returns:
+            Dict: Identificadores combinados de la imagen
+        """
+        now = time.time()
+        expires_at = now + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+        connection = self._get_connection()
+        try:
+            # Leer y combinar dentro de la misma transacción: otros hilos o workers
+            # pueden agregar identificadores a la misma imagen a la vez
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT refs, phash, size_bytes, created_at FROM assets WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+            merged = _merge_refs(json.loads(row[0]) if row else {}, refs)
+            connection.execute(
+                "INSERT OR REPLACE INTO assets "
+                "(sha256, phash, size_bytes, refs, created_at, last_used_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    sha256,
+                    phash or (row[1] if row else None),
+                    size_bytes if size_bytes is not None else (row[2] if row else None),
+                    json.dumps(merged, ensure_ascii=False),
+                    row[3] if row else now,
+                    now,
+                    expires_at,
+                ),
+            )
+
+            aliases = [("url", strip_access_token(url)) for url in urls]
+            if merged.get("facebook_photo_id"):
+                aliases.append(("url", facebook_photo_url(merged["facebook_photo_id"])))
+            if prompt_hash:
+                aliases.append(("prompt", prompt_hash))
+            connection.executemany(
+                "INSERT OR REPLACE INTO asset_aliases (kind, value, sha256) VALUES (?, ?, ?)",
+                [(kind, value, sha256) for kind, value in aliases],
+            )
+
+            self._evict(connection, now)
+            connection.commit()
+        except sqlite3.Error as e:
+            if connection.in_transaction:
+                connection.rollback()
+            logger.warning(f"Error escribiendo el almacén de imágenes: {e}")
+            return refs
+
+        self._increment("stores")
+        return merged
+
+    def _delete(self, connection: sqlite3.Connection, hashes: Iterable[str]):
+        hashes = [(sha256,) for sha256 in hashes]
+        connection.executemany("DELETE FROM assets WHERE sha256 = ?", hashes)
+        connection.executemany("DELETE FROM asset_aliases WHERE sha256 = ?", hashes)
+
+    def _evict(self, connection: sqlite3.Connection, now: float):
+        """Elimina las imágenes vencidas y, si sobran, las usadas hace más tiempo"""
+        expired = [
+            row[0]
+            for row in connection.execute("SELECT sha256 FROM assets WHERE expires_at <= ?", (now,))
+        ]
+        total = connection.execute("SELECT COUNT(*) FROM assets").fetchone()[0]
+        overflow = max(0, total - len(expired) - self.max_entries)
+        least_used = [
+            row[0]
+            for row in connection.execute(
+                "SELECT sha256 FROM assets WHERE expires_at > ? ORDER BY last_used_at LIMIT ?",
+                (now, overflow),
+            )
+        ]
+        self._delete(connection, expired + least_used)
+        with self._lock:
+            self._counters["expired"] += len(expired)
+            self._counters["evictions"] += len(least_used)
+
+    def stats(self) -> Dict:
+        """Aciertos por tipo de búsqueda, altas y expulsiones"""
+        with self._lock:
+            counters = dict(self._counters)
+        try:
+            entries = self._get_connection().execute("SELECT COUNT(*) FROM assets").fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+        hits = sum(counters[name] for name in ("prompt_hits", "content_hits", "similar_hits", "url_hits"))
+        lookups = hits + counters["misses"]
+        counters.update(
+            {
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "perceptual_hash": Image is not None,
+            }
+        )
+        return counters
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_asset_store() -> Optional[AssetStore]:
+    """
+    Devuelve el almacén de imágenes compartido del proceso configurado por variables de entorno.
+
+    Returns:
+        Optional[AssetStore]: None si ASSET_STORE_ENABLED está desactivado
+    """
+    global _default_store
+
+    if os.getenv("ASSET_STORE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = AssetStore(
+                db_path=os.getenv("ASSET_STORE_DB_PATH", ".cache/asset_store.sqlite3"),
+                ttl_seconds=float(os.getenv("ASSET_STORE_TTL_SECONDS", str(7 * 86400))),
+                max_entries=int(os.getenv("ASSET_STORE_MAX_ENTRIES", "1000")),
+            )
+        return _default_store
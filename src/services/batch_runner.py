@@ -0,0 +1,295 @@
+"""
+Procesamiento por lotes de archivos JSONL sin intervención del usuario.
+
+Cada línea del archivo de entrada es un objeto con la misma estructura que
+acepta process_content ({encabezado, material, target_platforms}). Las
+líneas se leen de una en una, se procesan con concurrencia acotada y cada
+resultado se agrega de inmediato al archivo NDJSON de salida.
+
+El progreso se guarda en un archivo de checkpoint con el desplazamiento en
+bytes hasta el cual la entrada está completamente procesada y el tamaño de
+la salida en ese momento. Al reanudar, la salida se recorta a ese tamaño y
+la lectura continúa desde ese desplazamiento, de modo que ningún registro
+se pierde ni se duplica.
+
+Uso:
+    python src/services/batch_runner.py entrada.jsonl salida.ndjson
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+
+# Permitir la ejecución directa del módulo (python src/services/batch_runner.py)
+if __package__ in (None, ""):
+    sys.path.insert(
+        0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    )
+
+from src.services.llm_adapter import process_content
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+DEFAULT_CHECKPOINT_EVERY = 10
+
+
+class BatchRunner:
+    """Procesa un archivo JSONL registro por registro con checkpoint y reanudación"""
+
+    def __init__(
+        self,
+        input_path: str,
+        output_path: str,
+        checkpoint_path: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+        processor: Callable[[Dict], Dict] = process_content,
+    ):
+        """
+        Args:
+            input_path (str): Archivo JSONL de entrada
+            output_path (str): Archivo NDJSON de salida
+            checkpoint_path (Optional[str]): Archivo de checkpoint; por defecto <salida>.checkpoint
+            max_concurrency (Optional[int]): Registros procesados simultáneamente
+            checkpoint_every (int): Registros completados entre cada checkpoint
+            processor (Callable[[Dict], Dict]): Función que transforma un registro
+        """
+        self.input_path = os.path.abspath(input_path)
+        self.output_path = os.path.abspath(output_path)
+        self.checkpoint_path = checkpoint_path or f"{self.output_path}.checkpoint"
+        self.max_concurrency = max(1, max_concurrency or DEFAULT_BATCH_CONCURRENCY)
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.processor = processor
+
+        # Registros leídos en espera o en proceso; limita la memoria usada
+        self.max_in_flight = self.max_concurrency * 2
+
+    def load_checkpoint(self) -> Optional[Dict]:
+        """Lee el checkpoint existente, si lo hay"""
+        if not os.path.exists(self.checkpoint_path):
+            return None
+
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+
+        if checkpoint.get("input_path") != self.input_path:
+            raise Exception(
+                f"El checkpoint {self.checkpoint_path} pertenece a otro archivo de entrada: "
+                f"{checkpoint.get('input_path')}"
+            )
+        return checkpoint
+
+    def _write_checkpoint(self, state: Dict):
+        """Escribe el checkpoint de forma atómica"""
+        temp_path = f"{self.checkpoint_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.checkpoint_path)
+
+    def _process_line(self, raw_line: bytes, offset: int) -> Dict:
+        """Procesa una línea de entrada y construye su registro de salida"""
+        output = {"offset": offset}
+        try:
+            record = json.loads(raw_line)
+            if not isinstance(record, dict):
+                raise ValueError("Cada línea debe contener un objeto JSON")
+            if "id" in record:
+                output["id"] = record["id"]
+            output["encabezado"] = record.get("encabezado")
+            output["results"] = self.processor(record)
+            output["status"] = "ok"
+        except Exception as e:
+            logger.error(f"Error procesando el registro en el byte {offset}: {e}")
+            output["status"] = "error"
+            output["error"] = str(e)
+        return output
+
+    def run(self, resume: bool = True) -> Dict:
+        """
+        Procesa el archivo de entrada completo.
+
+        Args:
+            resume (bool): Continuar desde el checkpoint existente en lugar de empezar de cero
+
+        Returns:
+            Dict: Resumen con registros procesados, exitosos y fallidos
+        """
+        checkpoint = self.load_checkpoint() if resume else None
+        state = {
+            "input_path": self.input_path,
+            "input_offset": 0,
+            "output_offset": 0,
+            "completed_ahead": [],
+            "processed": 0,
+            "succeeded": 0,
+            "failed": 0,
+        }
+        if checkpoint:
+            state.update(checkpoint)
+            logger.info(
+                f"Reanudando desde el byte {state['input_offset']} "
+                f"({state['processed']} registros ya procesados)"
+            )
+
+        # Descartar resultados escritos después del último checkpoint
+        output_mode = "r+b" if checkpoint and os.path.exists(self.output_path) else "wb"
+        with open(self.output_path, output_mode) as output_file:
+            output_file.truncate(state["output_offset"])
+            output_file.seek(state["output_offset"])
+            self._process_file(output_file, state)
+
+        return {
+            "processed": state["processed"],
+            "succeeded": state["succeeded"],
+            "failed": state["failed"],
+            "output_path": self.output_path,
+        }
+
+    def _process_file(self, output_file, state: Dict):
+        already_done = set(state["completed_ahead"])
+        # Orden de lectura de los registros en vuelo: [offset, offset_siguiente, terminado]
+        in_order = deque()
+        futures = {}
+        since_checkpoint = 0
+        started_at = time.monotonic()
+        processed_at_start = state["processed"]
+
+        def save_checkpoint():
+            output_file.flush()
+            os.fsync(output_file.fileno())
+            # Avanzar hasta el primer registro aún sin terminar
+            while in_order and in_order[0][2]:
+                state["input_offset"] = in_order.popleft()[1]
+            state["completed_ahead"] = [entry[0] for entry in in_order if entry[2]]
+            state["output_offset"] = output_file.tell()
+            state["updated_at"] = time.time()
+            self._write_checkpoint(state)
+
+        def collect(done_futures):
+            nonlocal since_checkpoint
+            for future in done_futures:
+                entry = futures.pop(future)
+                output = future.result()
+                output_file.write(
+                    (json.dumps(output, ensure_ascii=False) + "\n").encode("utf-8")
+                )
+                entry[2] = True
+                state["processed"] += 1
+                state["succeeded" if output["status"] == "ok" else "failed"] += 1
+                since_checkpoint += 1
+
+            if since_checkpoint >= self.checkpoint_every:
+                save_checkpoint()
+                since_checkpoint = 0
+                processed = state["processed"] - processed_at_start
+                elapsed = time.monotonic() - started_at
+                logger.info(
+                    f"Lote: {state['processed']} registros "
+                    f"({state['failed']} con error, {processed / elapsed:.1f} registros/s)"
+                )
+
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        try:
+            with open(self.input_path, "rb") as input_file:
+                input_file.seek(state["input_offset"])
+                offset = state["input_offset"]
+
+                while True:
+                    raw_line = input_file.readline()
+                    if not raw_line:
+                        break
+                    line_offset, offset = offset, offset + len(raw_line)
+
+                    entry = [line_offset, offset, False]
+                    in_order.append(entry)
+                    if not raw_line.strip() or line_offset in already_done:
+                        entry[2] = True
+                        continue
+
+                    futures[executor.submit(self._process_line, raw_line, line_offset)] = entry
+                    if len(futures) >= self.max_in_flight:
+                        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                        collect(done)
+
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                collect(done)
+        except KeyboardInterrupt:
+            logger.warning("Lote interrumpido; guardando checkpoint")
+            executor.shutdown(wait=True, cancel_futures=True)
+            collect([future for future in futures if future.done() and not future.cancelled()])
+            save_checkpoint()
+            raise
+        finally:
+            executor.shutdown(wait=True)
+
+        save_checkpoint()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Procesamiento por lotes de archivos JSONL - Transformación Digital"
+    )
+    parser.add_argument("input", help="Archivo JSONL con {encabezado, material, target_platforms}")
+    parser.add_argument("output", help="Archivo NDJSON de resultados")
+    parser.add_argument("--checkpoint", help="Archivo de checkpoint (por defecto <salida>.checkpoint)")
+    parser.add_argument(
+        "--concurrency",
+        "-c",
+        type=int,
+        default=DEFAULT_BATCH_CONCURRENCY,
+        help="Registros procesados simultáneamente",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=DEFAULT_CHECKPOINT_EVERY,
+        help="Registros completados entre cada checkpoint",
+    )
+    parser.add_argument(
+        "--restart", action="store_true", help="Ignorar el checkpoint y empezar de cero"
+    )
+
+    args = parser.parse_args()
+
+    if not os.getenv("OPENAI_API_KEY"):
+        print("❌ OPENAI_API_KEY no configurada")
+        sys.exit(1)
+
+    runner = BatchRunner(
+        args.input,
+        args.output,
+        checkpoint_path=args.checkpoint,
+        max_concurrency=args.concurrency,
+        checkpoint_every=args.checkpoint_every,
+    )
+
+    try:
+        summary = runner.run(resume=not args.restart)
+    except KeyboardInterrupt:
+        print("\n⏸️  Lote interrumpido; ejecuta el mismo comando para reanudar")
+        sys.exit(130)
+    except Exception as e:
+        logger.error(f"Error en el lote: {e}")
+        print(f"\n❌ Error: {e}")
+        sys.exit(1)
+
+    print(
+        f"✅ Lote completado: {summary['processed']} registros "
+        f"({summary['succeeded']} exitosos, {summary['failed']} con error)"
+    )
+    print(f"   Resultados en: {summary['output_path']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Analizador local de comandos de publicación en lenguaje natural.
+
+Reconoce, sin llamar al LLM, las plataformas, el tema, el título y si hace
+falta una imagen en comandos como "Publica en Facebook e Instagram sobre el
+evento de mañana" o "Post on LinkedIn about our new office". Entiende
+español e inglés, sinónimos de cada red social y calcula una confianza: el
+IntelligentPublisher solo consulta al LLM cuando la confianza es baja.
+"""
+
+import re
+import threading
+import unicodedata
+from typing import Dict, List, Optional
+
+SUPPORTED_PLATFORMS = ("facebook", "instagram", "linkedin")
+
+# Plataformas usadas cuando el comando habla de "redes" sin nombrar ninguna
+DEFAULT_PLATFORMS = ["facebook", "instagram"]
+
+PLATFORM_SYNONYMS = {
+    "facebook": ["facebook", "fb", "face", "feisbuk"],
+    "instagram": ["instagram", "insta", "ig"],
+    "linkedin": ["linkedin", "linked in", "linkedln"],
+}
+
+# Expresiones sobre texto sin acentos y en minúsculas (ver _fold)
+_ALL_PLATFORMS = re.compile(
+    r"\b(todas (las )?(redes|plataformas)|en todas partes|all (social )?(platforms|networks|channels)"
+    r"|every (platform|network|channel)|everywhere)\b"
+)
+_GENERIC_SOCIAL = re.compile(r"\b(redes( sociales)?|social media|socials|social networks?)\b")
+_INTENT = re.compile(
+    r"\b(public\w*|poste\w*|post|compart\w*|sub[eai]\w*|crea\w*|genera\w*|escrib\w*|anunci\w*"
+    r"|publish\w*|shar\w*|creat\w*|writ\w*|announc\w*|upload\w*)\b"
+)
+_TOPIC_MARKER = re.compile(
+    r"\b(sobre|acerca de|respecto a|hablando de|anunciando|promocionando"
+    r"|about|regarding|announcing|promoting)\s+"
+)
+_IMAGE_WORDS = r"(imagen(es)?|fotos?|fotografias?|ilustracion(es)?|images?|photos?|pictures?|illustrations?)"
+_IMAGE_CLAUSE = re.compile(
+    rf"\s*,?\s+(con|with|y|and)\s+(una |un |an? )?(?P<before>([a-z]+ ){{0,2}}?){_IMAGE_WORDS}\b(?P<after>[^,.;]*)"
+)
+_NO_IMAGE = re.compile(
+    rf"\b(sin (una |ninguna )?{_IMAGE_WORDS}|solo texto|solamente texto|unicamente texto"
+    rf"|text[ -]only|only text|no {_IMAGE_WORDS}|without (an? )?{_IMAGE_WORDS})\b"
+)
+_NO_IMAGE_CLAUSE = re.compile(r"\s*,?\s*((y|and) )?" + _NO_IMAGE.pattern)
+_WANTS_IMAGE = re.compile(rf"\b({_IMAGE_WORDS}|visual\w*|dibujo|ilustrad\w*|illustrated)\b")
+_CONTRAST = re.compile(r"\b(pero|aunque|excepto|salvo|menos|but|although|except|unless)\b")
+_ENGLISH_HINTS = re.compile(r"\b(the|about|with|and|our|post|on|for|new|please)\b")
+_SPANISH_HINTS = re.compile(r"\b(el|la|los|las|sobre|con|y|nuestro|nuestra|en|para|de|nuevo)\b")
+
+# Comandos más largos que esto suelen incluir matices que conviene dejar al LLM
+MAX_FAST_PATH_CHARS = 280
+
+TITLE_MAX_CHARS = 80
+
+
+def _fold(text: str) -> str:
+    """Minúsculas sin acentos, conservando la posición de cada carácter"""
+    return "".join(unicodedata.normalize("NFD", char)[0].lower()[:1] or char for char in text)
+
+
+def _platform_pattern(synonym: str) -> str:
+    return r"\b" + re.escape(synonym).replace(r"\ ", r"\s*") + r"\b"
+
+
+def _find_platforms(folded: str) -> Dict[str, List[str]]:
+    """Plataformas mencionadas y plataformas excluidas ("excepto LinkedIn", "not on Facebook")"""
+    mentioned, excluded = [], []
+    for platform, synonyms in PLATFORM_SYNONYMS.items():
+        for synonym in synonyms:
+            pattern = _platform_pattern(synonym)
+            negated = re.search(
+                r"\b(excepto|menos|salvo|sin|no|except|not|without)\s+(en |on |in |a |el |la )?" + pattern,
+                folded,
+            )
+            if negated:
+                excluded.append(platform)
+                break
+            if re.search(pattern, folded):
+                mentioned.append(platform)
+                break
+    return {"mentioned": mentioned, "excluded": excluded}
+
+
+def _detect_language(folded: str) -> str:
+    english = len(_ENGLISH_HINTS.findall(folded))
+    spanish = len(_SPANISH_HINTS.findall(folded))
+    return "en" if english > spanish else "es"
+
+
+def _extract_topic(command: str, folded: str) -> Optional[Dict]:
+    """
+    Tema del comando (texto original) y estilo de imagen pedido, si lo hay.
+
+    El tema termina antes de la cláusula de imagen, de un contraste ("pero
+    no en Instagram"), de un destino negado (", no en Instagram") y de los
+    destinos finales ("en Facebook"). "span"
+    indica el tramo del marcador al final del tema: las plataformas que
+    aparecen allí son parte del tema y no destinos de la publicación.
+    """
+    marker = _TOPIC_MARKER.search(folded)
+    if not marker:
+        return None
+
+    start, end = marker.end(), len(folded)
+    style = ""
+    image_clause = _IMAGE_CLAUSE.search(folded, start)
+    if image_clause:
+        end = image_clause.start()
+        style = " ".join(
+            command[image_clause.start(group):image_clause.end(group)].strip()
+            for group in ("before", "after")
+        ).strip()
+    no_image = _NO_IMAGE_CLAUSE.search(folded, start, end)
+    if no_image:
+        end = no_image.start()
+    contrast = _CONTRAST.search(folded, start, end)
+    if contrast:
+        end = contrast.start()
+
+    platform_words = "|".join(
+        _platform_pattern(synonym) for synonyms in PLATFORM_SYNONYMS.values() for synonym in synonyms
+    )
+    # "... en Facebook, no en Instagram", "... on Facebook and not on Instagram"
+    negated = re.compile(
+        rf"\s*,?\s*((y|and)\s+)?(no|not)\s+(en|on|in)\s+(el |la |mi |nuestra |our |my )?({platform_words})"
+    ).search(folded, start, end)
+    if negated:
+        end = negated.start()
+
+    # Quitar destinos al final: "... en Instagram y Facebook", "... on LinkedIn"
+    trailing = re.search(
+        rf"\s+(en|para|on|for|in)\s+((el |la |las |mi |nuestra |our |my )?({platform_words})"
+        rf"(\s*(,|y|e|and)\s*)?)+\s*$",
+        folded[start:end],
+    )
+    if trailing:
+        end = start + trailing.start()
+
+    topic = command[start:end].strip(" \t\n.,;:!¡?¿\"'")
+    return {"topic": topic, "style": style, "span": (marker.start(), end)} if topic else None
+
+
+def _build_title(topic: str) -> str:
+    title = re.split(r"[.;:!?\n]|,\s", topic, maxsplit=1)[0].strip()
+    if len(title) > TITLE_MAX_CHARS:
+        title = title[:TITLE_MAX_CHARS].rsplit(" ", 1)[0]
+    return title[:1].upper() + title[1:]
+
+
+def parse_command(command: str) -> Dict:
+    """
+    Analiza un comando de publicación sin llamar al LLM.
+
+    Args:
+        command (str): Comando en lenguaje natural (español o inglés)
+
+    Returns:
+        Dict: Análisis con la misma estructura que el del LLM (platforms, title,
+              content, needs_image, image_prompt) más "confidence" entre 0 y 1
+              y "language"
+    """
+    folded = _fold(command)
+    language = _detect_language(folded)
+    confidence = 0.0
+
+    extracted = _extract_topic(command, folded)
+    if extracted:
+        # "Publica en Facebook sobre cómo usar Instagram": Instagram es el tema, no un destino
+        topic_start, topic_end = extracted["span"]
+        targets = folded[:topic_start] + " " + folded[topic_end:]
+    else:
+        targets = folded
+
+    # Las exclusiones se buscan en todo el comando: la negación puede quedar junto al tema
+    found = _find_platforms(targets)
+    found["excluded"] = _find_platforms(folded)["excluded"]
+    found["mentioned"] = [p for p in found["mentioned"] if p not in found["excluded"]]
+    if _ALL_PLATFORMS.search(targets):
+        platforms = [p for p in SUPPORTED_PLATFORMS if p not in found["excluded"]]
+        confidence += 0.4
+    elif found["mentioned"]:
+        platforms = found["mentioned"]
+        confidence += 0.4
+    elif _GENERIC_SOCIAL.search(targets):
+        platforms = [p for p in DEFAULT_PLATFORMS if p not in found["excluded"]]
+        confidence += 0.3
+    else:
+        platforms = [p for p in DEFAULT_PLATFORMS if p not in found["excluded"]]
+        confidence += 0.1
+
+    if _INTENT.search(folded):
+        confidence += 0.2
+
+    if extracted:
+        topic, style = extracted["topic"], extracted["style"]
+        confidence += 0.3 if len(topic.split()) >= 2 else 0.2
+    else:
+        topic, style = command.strip(), ""
+
+    declines_image = bool(_NO_IMAGE.search(folded))
+    wants_image = not declines_image and bool(_WANTS_IMAGE.search(folded))
+    needs_image = wants_image or (not declines_image and "instagram" in platforms)
+    if declines_image and "instagram" in platforms:
+        # Instagram no admite publicaciones sin imagen: que lo resuelva el LLM
+        confidence -= 0.3
+    else:
+        confidence += 0.1 if wants_image or declines_image else 0.05
+
+    if "?" in command:
+        confidence -= 0.2
+    if len(command) > MAX_FAST_PATH_CHARS:
+        confidence -= 0.2
+    if _CONTRAST.search(folded) and not found["excluded"]:
+        # El tema se corta en el contraste: si no excluye una plataforma, que lo resuelva el LLM
+        confidence -= 0.3
+    if not platforms:
+        confidence = 0.0
+
+    if language == "en":
+        image_prompt = f"{style + ' ' if style else ''}image about {topic}".strip()
+        image_prompt = image_prompt[:1].upper() + image_prompt[1:]
+    else:
+        image_prompt = f"Imagen {style + ' ' if style else ''}sobre {topic}".strip()
+
+    return {
+        "platforms": platforms,
+        "title": _build_title(topic) if extracted else "Publicación en redes sociales",
+        "content": topic,
+        "needs_image": needs_image,
+        "image_prompt": image_prompt,
+        "confidence": round(min(max(confidence, 0.0), 1.0), 2),
+        "language": language,
+    }
+
+
+class CommandParserStats:
+    """Comandos resueltos localmente frente a los que requirieron al LLM"""
+
+    SOURCES = ("fast_path", "llm", "one_shot", "fallback")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {source: 0 for source in self.SOURCES}
+
+    def record(self, source: str):
+        """
+        Args:
+            source (str): "fast_path" (analizador local), "llm", "one_shot"
+                (análisis y publicaciones en una sola llamada) o "fallback"
+                (el LLM falló y se usó el análisis local de baja confianza)
+        """
+        with self._lock:
+            self._counters[source] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+        total = sum(counters.values())
+        counters["total"] = total
+        counters["fast_path_hit_rate"] = round(counters["fast_path"] / total, 3) if total else None
+        return counters
@@ -0,0 +1,229 @@
+"""
+Ajuste local y determinista de publicaciones a los límites de cada plataforma.
+
+En lugar de pedir otra generación al LLM cuando el texto excede el límite,
+se recorta localmente: primero se eliminan las etiquetas de menor valor al
+final del texto y después se corta en el último límite de oración, de emoji
+o de palabra que quepa, sin partir secuencias de emoji compuestas. Si el
+recorte pierde demasiado contenido la publicación se marca para regenerarse.
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+# Número máximo de etiquetas según las guías de cada plataforma
+PLATFORM_MAX_HASHTAGS = {
+    "facebook": 5,
+    "instagram": 10,
+    "linkedin": 5,
+    "tiktok": 8,
+    "whatsapp": 2,
+}
+
+# Fracción mínima del texto original que debe conservarse para no regenerar
+MIN_KEPT_RATIO = 0.6
+
+ELLIPSIS = "…"
+
+SENTENCE_END = re.compile(r"[.!?…](?:[\"'”»)]*)(?=\s)|\n")
+TRAILING_HASHTAGS = re.compile(r"(?:\s*#[\wÀ-ɏ]+)+\s*$")
+HASHTAG = re.compile(r"#[\wÀ-ɏ]+")
+HASHTAG_WORDS = re.compile(r"[A-ZÁÉÍÓÚÑ]?[a-záéíóúñü]+|[A-ZÁÉÍÓÚÑ]+(?![a-z])|\d+")
+
+ZWJ = 0x200D
+KEYCAP = 0x20E3
+
+
+def _is_emoji(char: str) -> bool:
+    code = ord(char)
+    return (
+        0x1F000 <= code <= 0x1FAFF
+        or 0x2600 <= code <= 0x27BF
+        or 0x2B00 <= code <= 0x2BFF
+        or 0x2300 <= code <= 0x23FF
+    )
+
+
+def _is_cluster_continuation(char: str) -> bool:
+    """Caracteres que nunca deben quedar separados del anterior"""
+    code = ord(char)
+    return (
+        code == ZWJ
+        or code == KEYCAP
+        or 0xFE00 <= code <= 0xFE0F  # selectores de variación
+        or 0x1F3FB <= code <= 0x1F3FF  # tonos de piel
+        or 0xE0020 <= code <= 0xE007F  # etiquetas de banderas
+        or 0x0300 <= code <= 0x036F  # diacríticos combinables
+    )
+
+
+def _is_regional_indicator(char: str) -> bool:
+    return 0x1F1E6 <= ord(char) <= 0x1F1FF
+
+
+def is_safe_cut(text: str, index: int) -> bool:
+    """Indica si text[:index] no parte un grafema compuesto (emoji, bandera, acento)"""
+    if index <= 0 or index >= len(text):
+        return True
+    if _is_cluster_continuation(text[index]) or ord(text[index - 1]) == ZWJ:
+        return False
+    if _is_regional_indicator(text[index]):
+        # Las banderas son pares de indicadores regionales
+        run = 0
+        position = index - 1
+        while position >= 0 and _is_regional_indicator(text[position]):
+            run += 1
+            position -= 1
+        return run % 2 == 0
+    return True
+
+
+def _hashtag_terms(tag: str) -> List[str]:
+    return [word.lower() for word in HASHTAG_WORDS.findall(tag.lstrip("#")) if len(word) >= 4]
+
+
+def _hashtag_value(tag: str, index: int, text_lower: str) -> Tuple[int, int]:
+    """Valor de una etiqueta: primero relevancia respecto al texto, luego su posición"""
+    relevant = any(term in text_lower for term in _hashtag_terms(tag))
+    return (1 if relevant else 0, -index)
+
+
+def rank_hashtags(hashtags: List[str], text: str) -> List[str]:
+    """Ordena las etiquetas de menor a mayor valor"""
+    text_lower = HASHTAG.sub(" ", text).lower()
+    indexed = list(enumerate(hashtags))
+    indexed.sort(key=lambda item: _hashtag_value(item[1], item[0], text_lower))
+    return [tag for _, tag in indexed]
+
+
+def normalize_hashtags(hashtags, text: str, max_hashtags: int) -> List[str]:
+    """Normaliza, elimina duplicados y descarta las etiquetas de menor valor sobre el máximo"""
+    normalized = []
+    seen = set()
+    for tag in hashtags if isinstance(hashtags, list) else []:
+        if not isinstance(tag, str):
+            continue
+        tag = tag.strip().replace(" ", "")
+        if not tag or tag == "#":
+            continue
+        if not tag.startswith("#"):
+            tag = f"#{tag}"
+        if tag.lower() in seen:
+            continue
+        seen.add(tag.lower())
+        normalized.append(tag)
+
+    if len(normalized) > max_hashtags:
+        to_drop = set(rank_hashtags(normalized, text)[: len(normalized) - max_hashtags])
+        normalized = [tag for tag in normalized if tag not in to_drop]
+    return normalized
+
+
+def _drop_trailing_hashtags(text: str, limit: int) -> str:
+    """Elimina etiquetas del bloque final del texto, empezando por las de menor valor"""
+    match = TRAILING_HASHTAGS.search(text)
+    if not match:
+        return text
+
+    body = text[: match.start()]
+    inline_tags = HASHTAG.findall(match.group(0))
+    for tag in rank_hashtags(inline_tags, body):
+        candidate = body + (" " + " ".join(inline_tags) if inline_tags else "")
+        if len(candidate) <= limit:
+            return candidate
+        inline_tags.remove(tag)
+
+    return body.rstrip()
+
+
+def _last_cut(positions: List[int], limit: int, text: str) -> int:
+    valid = [position for position in positions if position <= limit and is_safe_cut(text, position)]
+    return max(valid) if valid else 0
+
+
+def truncate_text(text: str, limit: int) -> str:
+    """
+    Recorta el texto al límite en el mejor punto disponible.
+
+    Prioridad: fin de oración, fin de emoji y fin de palabra con puntos
+    suspensivos; como último recurso, un corte seguro con puntos suspensivos.
+    """
+    if len(text) <= limit:
+        return text
+
+    minimum = int(limit * 0.5)
+
+    sentence_cuts = [match.end() for match in SENTENCE_END.finditer(text[: limit + 1])]
+    cut = _last_cut(sentence_cuts, limit, text)
+    if cut >= minimum:
+        return text[:cut].rstrip()
+
+    emoji_cuts = [
+        index + 1
+        for index, char in enumerate(text[: limit + 1])
+        if _is_emoji(char) or _is_cluster_continuation(char)
+    ]
+    cut = _last_cut(emoji_cuts, limit, text)
+    if cut >= minimum:
+        return text[:cut].rstrip()
+
+    word_cuts = [match.start() for match in re.finditer(r"\s", text[:limit])]
+    cut = _last_cut(word_cuts, limit - len(ELLIPSIS), text)
+    if cut >= minimum:
+        return text[:cut].rstrip() + ELLIPSIS
+
+    cut = limit - len(ELLIPSIS)
+    while cut > 0 and not is_safe_cut(text, cut):
+        cut -= 1
+    return text[:cut] + ELLIPSIS
+
+
+def fit_content(content: Dict, platform: str, limit: int) -> Dict:
+    """
+    Ajusta una publicación generada a los límites de la plataforma.
+
+    Args:
+        content (Dict): Publicación con "text" y "hashtags"
+        platform (str): Plataforma destino
+        limit (int): Límite de caracteres del texto
+
+    Las publicaciones dentro del límite solo actualizan character_count. En
+    las recortadas, "hashtags" deja de listar las etiquetas eliminadas del
+    texto y se limita al máximo de la plataforma.
+
+    Returns:
+        Dict: Publicación ajustada con character_count actualizado. Incluye
+        "needs_regeneration": True si el recorte conservó menos del
+        MIN_KEPT_RATIO del texto original.
+    """
+    fitted = dict(content)
+    original_text = fitted.get("text", "")
+    fitted["character_count"] = len(original_text)
+    if len(original_text) <= limit:
+        return fitted
+
+    text = _drop_trailing_hashtags(original_text, limit)
+    text = truncate_text(text, limit)
+
+    # Las etiquetas recortadas del texto tampoco se listan en "hashtags"
+    remaining = HASHTAG.findall(text)
+    kept = {tag.lower() for tag in remaining}
+    removed = {tag.lower() for tag in HASHTAG.findall(original_text)} - kept
+    candidates = normalize_hashtags(
+        (fitted.get("hashtags") if isinstance(fitted.get("hashtags"), list) else []) + remaining,
+        text,
+        len(original_text),
+    )
+
+    fitted["text"] = text
+    fitted["hashtags"] = normalize_hashtags(
+        [tag for tag in candidates if tag.lower() not in removed],
+        text,
+        PLATFORM_MAX_HASHTAGS.get(platform, 5),
+    )
+    fitted["character_count"] = len(text)
+
+    if original_text and len(text) / len(original_text) < MIN_KEPT_RATIO:
+        fitted["needs_regeneration"] = True
+
+    return fitted
@@ -2,12 +2,23 @@
 Servicio integrado que combina generación de contenido con LLM y publicación en redes sociales
 """
 
+import asyncio
 import json
 import logging
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Callable, Dict, List, Optional
 from datetime import datetime
 
+from src.services.asset_store import strip_access_token
+from src.services.image_processing import RECOMMENDED_IMAGE_SIZES, recommended_size
 from src.services.llm_adapter import LLMAdapter, validate_input_data
+from src.services.publish_dispatcher import ensure_published, publish_concurrently
+from src.services.run_store import (
+    INSTAGRAM_CREATION_STAGE,
+    RunCheckpoints,
+    RunConflictError,
+    RunStore,
+    get_default_run_store,
+)
 from src.services.instagram_service import instagram_create_media, instagram_publish_media
 from src.services.facebook_service import facebook_post_text, facebook_post_image
 from src.config import PAGE_ACCESS_TOKEN
@@ -27,6 +38,7 @@ class ContentPublisher:
         """
         self.llm_adapter = LLMAdapter(openai_api_key)
         self.supported_platforms = ["facebook", "instagram"]
+        self.run_store = get_default_run_store()
         logger.info("ContentPublisher inicializado correctamente")
     
     def generate_and_publish(
@@ -35,20 +47,40 @@ class ContentPublisher:
         material: str, 
         platforms: List[str],
         auto_publish: bool = False,
-        image_url: Optional[str] = None
+        image_url: Optional[str] = None,
+        generation_mode: Optional[str] = None,
+        use_cache: bool = True,
+        preference: Optional[str] = None,
+        progress_callback: Optional[Callable[[Dict], None]] = None,
+        run_id: Optional[str] = None
     ) -> Dict:
         """
         Genera contenido optimizado para cada plataforma y opcionalmente lo publica.
         
+        El contenido de cada plataforma y cada publicación realizada se guardan
+        bajo un run_id; al reintentar con el mismo run_id se reutilizan y solo
+        se generan las plataformas sin contenido y se repiten las publicaciones
+        que fallaron.
+        
         Args:
             heading (str): Encabezado del contenido
             material (str): Material original
             platforms (List[str]): Plataformas objetivo ["facebook", "instagram"]
             auto_publish (bool): Si debe publicar automáticamente
             image_url (Optional[str]): URL de imagen para usar en las publicaciones
+            generation_mode (Optional[str]): "per_platform" o "combined" (una sola llamada al LLM)
+            use_cache (bool): Si es False, regenera el contenido aunque exista en caché
+            preference (Optional[str]): "latency", "balanced" o "quality" para elegir el nivel de modelo
+            progress_callback (Optional[Callable[[Dict], None]]): Recibe el progreso por fragmento
+                cuando el material es tan largo que se resume por partes
+            run_id (Optional[str]): Ejecución anterior de la misma solicitud a reanudar
             
         Returns:
-            Dict: Contenido generado y resultados de publicación
+            Dict: Contenido generado, plataformas sin contenido (missing_platforms),
+            resultados de publicación y run_id
+            
+        Raises:
+            RunConflictError: Si run_id pertenece a otra solicitud
         """
         try:
             logger.info(f"Generando contenido para: {', '.join(platforms)}")
@@ -59,52 +91,192 @@ class ContentPublisher:
             if not supported_platforms:
                 raise ValueError(f"Ninguna plataforma soportada para publicación. Soportadas: {self.supported_platforms}")
             
-            # Generar contenido con el LLM
-            generated_content = self.llm_adapter.transform_for_multiple_platforms(
+            checkpoints = self._start_run(
+                run_id,
                 heading=heading,
                 material=material,
-                target_platforms=supported_platforms
+                platforms=supported_platforms,
+                image_url=image_url,
+                generation_mode=generation_mode,
+                preference=preference
             )
             
+            # Reutilizar el contenido de un intento anterior y generar solo el que falta
+            generated_content = {
+                platform: checkpoints.reuse(f"content:{platform}")
+                for platform in supported_platforms
+                if f"content:{platform}" in checkpoints
+            }
+            pending_platforms = [p for p in supported_platforms if p not in generated_content]
+            if pending_platforms:
+                new_content = self.llm_adapter.transform_for_multiple_platforms(
+                    heading=heading,
+                    material=material,
+                    target_platforms=pending_platforms,
+                    generation_mode=generation_mode,
+                    use_cache=use_cache,
+                    preference=preference,
+                    progress_callback=progress_callback
+                )
+                for platform in pending_platforms:
+                    if platform in new_content:
+                        generated_content[platform] = new_content[platform]
+                        checkpoints.save(f"content:{platform}", new_content[platform])
+            
+            missing_platforms = [p for p in supported_platforms if p not in generated_content]
+            if missing_platforms:
+                logger.warning(f"Sin contenido generado para: {', '.join(missing_platforms)}")
+            
             results = {
-                "generated_content": generated_content,
+                "generated_content": {p: generated_content[p] for p in supported_platforms if p in generated_content},
+                "missing_platforms": missing_platforms,
                 "publication_results": {},
                 "timestamp": datetime.now().isoformat(),
-                "auto_published": auto_publish
+                "auto_published": auto_publish,
+                "run_id": checkpoints.run_id
             }
             
             # Si auto_publish está activado, publicar en cada plataforma
             if auto_publish:
-                logger.info("Iniciando publicación automática...")
-                
-                for platform in supported_platforms:
-                    if platform in generated_content:
-                        try:
-                            platform_content = generated_content[platform]
-                            publication_result = self._publish_to_platform(
-                                platform, 
-                                platform_content, 
-                                image_url
-                            )
-                            results["publication_results"][platform] = publication_result
-                        except Exception as e:
-                            logger.error(f"Error publicando en {platform}: {e}")
-                            results["publication_results"][platform] = {
-                                "error": str(e),
-                                "status": "failed"
-                            }
+                results["publication_results"] = self._publish_generated_content(
+                    supported_platforms, generated_content, image_url, checkpoints
+                )
+            results["resumed_stages"] = checkpoints.reused
             
             return results
             
+        except RunConflictError:
+            raise
         except Exception as e:
             logger.error(f"Error en generate_and_publish: {e}")
             raise Exception(f"Error generando/publicando contenido: {str(e)}")
     
+    def _start_run(self, run_id: Optional[str], **request) -> RunCheckpoints:
+        """
+        Registra la ejecución en el almacén de puntos de control o retoma run_id.
+        
+        Raises:
+            RunConflictError: Si run_id pertenece a otra solicitud
+        """
+        if self.run_store is None:
+            return RunCheckpoints(None, run_id, {})
+        return self.run_store.start(run_id or RunStore.new_run_id(), "generate_content", **request)
+    
+    def _publish_generated_content(
+        self,
+        platforms: List[str],
+        generated_content: Dict,
+        image_url: Optional[str] = None,
+        checkpoints: Optional[RunCheckpoints] = None
+    ) -> Dict:
+        """
+        Publica el contenido generado en todas las plataformas a la vez.
+        
+        Cada plataforma tiene su propio tiempo límite (PUBLISH_TIMEOUT_<PLATAFORMA>)
+        y su propio estado en el resultado. Las plataformas ya publicadas en un
+        intento anterior de la misma ejecución no se vuelven a publicar y las
+        que no tienen contenido generado se informan como fallidas.
+        
+        Args:
+            platforms (List[str]): Plataformas donde publicar
+            generated_content (Dict): Contenido generado por plataforma
+            image_url (Optional[str]): URL de imagen
+            checkpoints (Optional[RunCheckpoints]): Puntos de control de la ejecución
+            
+        Returns:
+            Dict: Resultado de publicación por plataforma
+        """
+        logger.info("Iniciando publicación automática...")
+        
+        def publish(platform: str) -> Dict:
+            stage = f"publish:{platform}"
+            if checkpoints is not None and stage in checkpoints:
+                return checkpoints.reuse(stage)
+            result = self._publish_to_platform(platform, generated_content[platform], image_url, checkpoints)
+            if checkpoints is not None:
+                checkpoints.save(stage, result)
+            return result
+        
+        publication_results = publish_concurrently(
+            [platform for platform in platforms if platform in generated_content],
+            publish
+        )
+        for platform in platforms:
+            if platform not in generated_content:
+                publication_results[platform] = {
+                    "status": "failed",
+                    "error": f"No se generó contenido para {platform}",
+                    "elapsed_seconds": None,
+                }
+        return publication_results
+    
+    async def stream_generate_and_publish(
+        self,
+        heading: str,
+        material: str,
+        platforms: List[str],
+        auto_publish: bool = False,
+        image_url: Optional[str] = None,
+        use_cache: bool = True,
+        preference: Optional[str] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Versión en streaming de generate_and_publish.
+        
+        Emite los eventos de generación de cada plataforma a medida que llegan y
+        un evento final {"event": "done", "data": ...} con la misma estructura que
+        devuelve generate_and_publish.
+        
+        Args:
+            heading (str): Encabezado del contenido
+            material (str): Material original
+            platforms (List[str]): Plataformas objetivo ["facebook", "instagram"]
+            auto_publish (bool): Si debe publicar automáticamente
+            image_url (Optional[str]): URL de imagen para usar en las publicaciones
+            use_cache (bool): Si es False, regenera el contenido aunque exista en caché
+            preference (Optional[str]): "latency", "balanced" o "quality" para elegir el nivel de modelo
+            
+        Yields:
+            Dict: Eventos de progreso y resultado final
+        """
+        supported_platforms = [p for p in platforms if p in self.supported_platforms]
+        
+        if not supported_platforms:
+            yield {
+                "event": "error",
+                "error": f"Ninguna plataforma soportada para publicación. Soportadas: {self.supported_platforms}"
+            }
+            return
+        
+        generated_content = {}
+        async for event in self.llm_adapter.astream_for_multiple_platforms(
+            heading, material, supported_platforms, use_cache=use_cache, preference=preference
+        ):
+            if event["event"] == "platform_complete":
+                generated_content[event["platform"]] = event["content"]
+            yield event
+        
+        results = {
+            "generated_content": generated_content,
+            "publication_results": {},
+            "timestamp": datetime.now().isoformat(),
+            "auto_published": auto_publish
+        }
+        
+        if auto_publish:
+            yield {"event": "publishing", "platforms": list(generated_content)}
+            results["publication_results"] = await asyncio.to_thread(
+                self._publish_generated_content, supported_platforms, generated_content, image_url
+            )
+        
+        yield {"event": "done", "data": results}
+    
     def _publish_to_platform(
         self, 
         platform: str, 
         content: Dict, 
-        image_url: Optional[str] = None
+        image_url: Optional[str] = None,
+        checkpoints: Optional[RunCheckpoints] = None
     ) -> Dict:
         """
         Publica contenido en una plataforma específica.
@@ -113,6 +285,8 @@ class ContentPublisher:
             platform (str): Plataforma objetivo
             content (Dict): Contenido generado por el LLM
             image_url (Optional[str]): URL de imagen
+            checkpoints (Optional[RunCheckpoints]): Puntos de control de la ejecución;
+                guardan el contenedor de Instagram para no recrearlo al reintentar
             
         Returns:
             Dict: Resultado de la publicación
@@ -130,6 +304,7 @@ class ContentPublisher:
                     # Publicar solo texto en Facebook
                     logger.info("Publicando texto en Facebook")
                     result = facebook_post_text(text)
+                ensure_published("facebook", result)
                 
                 return {
                     "status": "published",
@@ -144,13 +319,20 @@ class ContentPublisher:
                 
                 logger.info(f"Publicando en Instagram - imagen: {image_url}, texto: {text[:50]}...")
                 
-                # Crear contenedor de media en Instagram
-                creation_result = instagram_create_media(image_url, text)
-                logger.info(f"Resultado creación Instagram: {creation_result}")
-                
-                if "id" not in creation_result:
-                    logger.error(f"Error en creación Instagram: {creation_result}")
-                    raise Exception(f"Error creando media en Instagram: {creation_result}")
+                # Crear contenedor de media en Instagram (o reutilizar el de un intento anterior)
+                creation = {"image_url": strip_access_token(image_url), "caption": text}
+                saved = checkpoints.outputs.get(INSTAGRAM_CREATION_STAGE) if checkpoints is not None else None
+                if saved and all(saved.get(key) == value for key, value in creation.items()):
+                    creation_result = checkpoints.reuse(INSTAGRAM_CREATION_STAGE)["response"]
+                else:
+                    creation_result = instagram_create_media(image_url, text)
+                    logger.info(f"Resultado creación Instagram: {creation_result}")
+                    
+                    if "id" not in creation_result:
+                        logger.error(f"Error en creación Instagram: {creation_result}")
+                        raise Exception(f"Error creando media en Instagram: {creation_result}")
+                    if checkpoints is not None:
+                        checkpoints.save(INSTAGRAM_CREATION_STAGE, {**creation, "response": creation_result})
                 
                 creation_id = creation_result["id"]
                 logger.info(f"Media creado en Instagram con ID: {creation_id}")
@@ -159,6 +341,9 @@ class ContentPublisher:
                 publish_result = instagram_publish_media(creation_id)
                 logger.info(f"Resultado publicación Instagram: {publish_result}")
                 
+                if "id" not in publish_result:
+                    raise Exception(f"Error publicando media {creation_id} en Instagram: {publish_result}")
+                
                 return {
                     "status": "published",
                     "platform": "instagram",
@@ -194,7 +379,7 @@ class ContentPublisher:
                     image_suggestions[platform] = {
                         "type": "image",
                         "prompt": platform_content["suggested_image_prompt"],
-                        "recommended_size": "1080x1080" if platform == "instagram" else "1200x630"
+                        "recommended_size": recommended_size(platform)
                     }
                 
                 # TikTok tiene suggested_video_prompt (para futura implementación)
@@ -202,12 +387,21 @@ class ContentPublisher:
                     image_suggestions[platform] = {
                         "type": "video",
                         "prompt": platform_content["suggested_video_prompt"],
-                        "recommended_size": "1080x1920"
+                        "recommended_size": RECOMMENDED_IMAGE_SIZES["vertical"]
                     }
         
         return image_suggestions
     
-    def preview_content(self, heading: str, material: str, platforms: List[str]) -> Dict:
+    def preview_content(
+        self,
+        heading: str,
+        material: str,
+        platforms: List[str],
+        generation_mode: Optional[str] = None,
+        use_cache: bool = True,
+        preference: Optional[str] = None,
+        progress_callback: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
         """
         Genera vista previa del contenido sin publicar.
         
@@ -215,6 +409,11 @@ class ContentPublisher:
             heading (str): Encabezado del contenido
             material (str): Material original
             platforms (List[str]): Plataformas objetivo
+            generation_mode (Optional[str]): "per_platform" o "combined" (una sola llamada al LLM)
+            use_cache (bool): Si es False, regenera el contenido aunque exista en caché
+            preference (Optional[str]): "latency", "balanced" o "quality" para elegir el nivel de modelo
+            progress_callback (Optional[Callable[[Dict], None]]): Recibe el progreso por fragmento
+                cuando el material es tan largo que se resume por partes
             
         Returns:
             Dict: Vista previa del contenido generado
@@ -227,7 +426,11 @@ class ContentPublisher:
             generated_content = self.llm_adapter.transform_for_multiple_platforms(
                 heading=heading,
                 material=material,
-                target_platforms=supported_platforms
+                target_platforms=supported_platforms,
+                generation_mode=generation_mode,
+                use_cache=use_cache,
+                preference=preference,
+                progress_callback=progress_callback
             )
             
             # Generar sugerencias de imagen
@@ -244,6 +447,49 @@ class ContentPublisher:
         except Exception as e:
             logger.error(f"Error en preview_content: {e}")
             raise Exception(f"Error generando vista previa: {str(e)}")
+    
+    async def stream_preview_content(
+        self,
+        heading: str,
+        material: str,
+        platforms: List[str],
+        use_cache: bool = True,
+        preference: Optional[str] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Versión en streaming de preview_content.
+        
+        Args:
+            heading (str): Encabezado del contenido
+            material (str): Material original
+            platforms (List[str]): Plataformas objetivo
+            use_cache (bool): Si es False, regenera el contenido aunque exista en caché
+            preference (Optional[str]): "latency", "balanced" o "quality" para elegir el nivel de modelo
+            
+        Yields:
+            Dict: Eventos de generación y un evento final {"event": "done", "data": ...}
+            con la misma estructura que devuelve preview_content
+        """
+        supported_platforms = [p for p in platforms if p in self.supported_platforms]
+        
+        generated_content = {}
+        async for event in self.llm_adapter.astream_for_multiple_platforms(
+            heading, material, supported_platforms, use_cache=use_cache, preference=preference
+        ):
+            if event["event"] == "platform_complete":
+                generated_content[event["platform"]] = event["content"]
+            yield event
+        
+        yield {
+            "event": "done",
+            "data": {
+                "preview": True,
+                "generated_content": generated_content,
+                "image_suggestions": self.generate_image_suggestions(generated_content),
+                "supported_platforms": supported_platforms,
+                "timestamp": datetime.now().isoformat()
+            }
+        }
 
 
 def create_content_publisher(openai_api_key: str) -> ContentPublisher:
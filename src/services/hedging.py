@@ -0,0 +1,217 @@
+"""
+Solicitudes de cobertura (hedged requests) para reducir la latencia de cola.
+
+Si una llamada al LLM no terminó cuando alcanza el percentil configurado de
+la latencia observada recientemente para esa operación, se envía una
+solicitud duplicada, se usa la primera que termine y se cancela la otra.
+Un presupuesto por minuto limita cuántos duplicados se envían para acotar
+el costo adicional.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(values: List[float], percentile: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+    return ordered[index]
+
+
+class LatencyTracker:
+    """Ventana de latencias recientes por operación"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, deque] = {}
+
+    def record(self, operation: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(operation, deque(maxlen=self.window)).append(seconds)
+
+    def samples(self, operation: str) -> List[float]:
+        with self._lock:
+            return list(self._samples.get(operation, ()))
+
+    def operations(self) -> List[str]:
+        with self._lock:
+            return list(self._samples)
+
+    def percentile(self, operation: str, percentile: float) -> Optional[float]:
+        return _percentile(self.samples(operation), percentile)
+
+
+class HedgeBudget:
+    """Límite de solicitudes duplicadas por minuto"""
+
+    def __init__(self, max_per_minute: int):
+        self.max_per_minute = max_per_minute
+        self._lock = threading.Lock()
+        self._sent = deque()
+
+    def try_acquire(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            while self._sent and now - self._sent[0] >= 60:
+                self._sent.popleft()
+            if len(self._sent) >= self.max_per_minute:
+                return False
+            self._sent.append(now)
+            return True
+
+
+class RequestHedger:
+    """Ejecuta llamadas al LLM con una solicitud duplicada cuando se retrasan"""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        percentile: float = 95,
+        max_hedges_per_minute: int = 30,
+        min_samples: int = 20,
+        window: int = 200,
+    ):
+        """
+        Args:
+            enabled (bool): Activa el envío de solicitudes duplicadas
+            percentile (float): Percentil de latencia tras el cual se envía el duplicado
+            max_hedges_per_minute (int): Duplicados permitidos por minuto
+            min_samples (int): Latencias necesarias antes de empezar a duplicar
+            window (int): Latencias recientes consideradas por operación
+        """
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.budget = HedgeBudget(max_hedges_per_minute)
+
+        # Latencia de cada intento completado (define el umbral de duplicado)
+        self._attempts = LatencyTracker(window)
+        # Latencia percibida por quien llama, con o sin duplicado
+        self._observed = LatencyTracker(window)
+
+        self._lock = threading.Lock()
+        self._counters = {
+            "requests": 0,
+            "hedges_sent": 0,
+            "hedges_won": 0,
+            "budget_exhausted": 0,
+        }
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def hedge_delay(self, operation: str) -> Optional[float]:
+        """Tiempo de espera antes de duplicar, o None si aún no hay suficientes datos"""
+        samples = self._attempts.samples(operation)
+        if len(samples) < self.min_samples:
+            return None
+        return _percentile(samples, self.percentile)
+
+    async def _timed(self, operation: str, coroutine_function: Callable[[], Awaitable[Any]]):
+        started = time.monotonic()
+        result = await coroutine_function()
+        self._attempts.record(operation, time.monotonic() - started)
+        return result
+
+    async def run(self, operation: str, coroutine_function: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Ejecuta la llamada, duplicándola si supera el umbral de latencia.
+
+        Args:
+            operation (str): Nombre de la operación (plataforma, análisis de comando, ...)
+            coroutine_function (Callable[[], Awaitable[Any]]): Crea una nueva llamada al LLM
+
+        Returns:
+            Any: Resultado de la primera llamada que termine correctamente
+        """
+        self._count("requests")
+        started = time.monotonic()
+        try:
+            return await self._run(operation, coroutine_function)
+        finally:
+            self._observed.record(operation, time.monotonic() - started)
+
+    async def _run(self, operation: str, coroutine_function: Callable[[], Awaitable[Any]]) -> Any:
+        delay = self.hedge_delay(operation) if self.enabled else None
+        if delay is None:
+            return await self._timed(operation, coroutine_function)
+
+        primary = asyncio.ensure_future(self._timed(operation, coroutine_function))
+        hedge = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+
+            if not self.budget.try_acquire():
+                self._count("budget_exhausted")
+                return await primary
+
+            logger.info(f"Enviando solicitud duplicada para {operation} tras {delay:.2f}s")
+            self._count("hedges_sent")
+            hedge = asyncio.ensure_future(self._timed(operation, coroutine_function))
+            attempts = {primary, hedge}
+            first_error = None
+
+            while attempts:
+                done, attempts = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        if attempt is hedge:
+                            self._count("hedges_won")
+                        return attempt.result()
+                    first_error = first_error or attempt.exception()
+
+            raise first_error
+        finally:
+            for attempt in (primary, hedge):
+                if attempt is not None and not attempt.done():
+                    attempt.cancel()
+
+    def stats(self) -> Dict:
+        """Latencias p50/p99 por operación y costo adicional de los duplicados"""
+        with self._lock:
+            counters = dict(self._counters)
+
+        operations = {}
+        for operation in self._observed.operations():
+            samples = self._observed.samples(operation)
+            delay = self.hedge_delay(operation)
+            operations[operation] = {
+                "samples": len(samples),
+                "p50_seconds": round(_percentile(samples, 50), 3),
+                "p99_seconds": round(_percentile(samples, 99), 3),
+                "hedge_delay_seconds": round(delay, 3) if delay is not None else None,
+            }
+
+        requests = counters["requests"]
+        return {
+            "enabled": self.enabled,
+            "percentile": self.percentile,
+            "max_hedges_per_minute": self.budget.max_per_minute,
+            **counters,
+            # Cada duplicado es una llamada extra al LLM que puede facturarse completa
+            "extra_cost_ratio": round(counters["hedges_sent"] / requests, 4) if requests else 0.0,
+            "operations": operations,
+        }
+
+
+def create_default_hedger() -> RequestHedger:
+    """Crea el hedger del proceso a partir de las variables de entorno"""
+    return RequestHedger(
+        enabled=os.getenv("LLM_HEDGING_ENABLED", "false").lower() in ("1", "true", "yes"),
+        percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "95")),
+        max_hedges_per_minute=int(os.getenv("LLM_HEDGE_MAX_PER_MINUTE", "30")),
+        min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")),
+    )
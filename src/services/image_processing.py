@@ -0,0 +1,407 @@
+"""
+Preparación de imágenes para cada red social antes de subirlas.
+
+DALL-E devuelve un PNG cuadrado de 1024x1024 que suele ocupar varios MB.
+Este módulo lo convierte al formato, calidad, tamaño y relación de aspecto
+recomendados para cada plataforma (los mismos que sugiere
+ContentPublisher.generate_image_suggestions), de modo que las subidas y el
+procesamiento del lado de la plataforma son más rápidos.
+
+Todas las versiones se derivan de una sola imagen maestra: el recorte se
+centra en la zona con más detalle (energía de bordes) y, si el recorte
+descartaría demasiada imagen, el resto se completa con un relleno difuminado
+de la propia imagen. Así una imagen cuadrada sirve también para formatos
+apaisados o verticales sin pagar otra generación.
+
+Decodificar y recomprimir usa la CPU, así que el trabajo se ejecuta en un
+pool de procesos compartido y no bloquea el hilo que atiende la petición.
+Pillow es opcional: sin él las imágenes se suben sin cambios.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image, ImageFilter, ImageOps
+except ImportError:
+    Image = None
+    ImageFilter = None
+    ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+# Tamaños recomendados por plataforma ("vertical" para historias, reels y TikTok)
+RECOMMENDED_IMAGE_SIZES = {
+    "instagram": "1080x1080",
+    "facebook": "1200x630",
+    "linkedin": "1200x630",
+    "vertical": "1080x1920",
+}
+
+DEFAULT_IMAGE_SIZE = "1200x630"
+
+# Calidad JPEG usada al recomprimir (1-95)
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+
+# Calidad de la copia de la imagen maestra de la que se derivan las demás
+IMAGE_MASTER_QUALITY = int(os.getenv("IMAGE_MASTER_QUALITY", "95"))
+
+# Fracción máxima de la imagen que puede descartar un recorte; el resto se rellena
+IMAGE_MAX_CROP_FRACTION = float(os.getenv("IMAGE_MAX_CROP_FRACTION", "0.35"))
+
+# Incrementar al cambiar el recorte o el relleno: invalida las versiones guardadas
+DERIVATION_VERSION = "1"
+
+# Lado mayor de la miniatura usada para buscar la zona con más detalle
+_INTEREST_SAMPLE_SIZE = 256
+
+# Procesos dedicados a preparar imágenes
+IMAGE_PROCESSING_WORKERS = int(os.getenv("IMAGE_PROCESSING_WORKERS", "2"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def recommended_size(platform: str) -> str:
+    """Tamaño recomendado ("ANCHOxALTO") para la plataforma"""
+    return RECOMMENDED_IMAGE_SIZES.get(platform, DEFAULT_IMAGE_SIZE)
+
+
+def parse_size(size: str) -> Tuple[int, int]:
+    """
+    Convierte "1200x630" en (1200, 630).
+
+    Raises:
+        ValueError: Si el tamaño no tiene el formato ANCHOxALTO
+    """
+    try:
+        width, height = (int(value) for value in size.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"Tamaño de imagen inválido: {size}")
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Tamaño de imagen inválido: {size}")
+    return width, height
+
+
+def image_spec(platform: str) -> Dict:
+    """Formato de salida para la plataforma (todas aceptan JPEG; Instagram lo exige)"""
+    width, height = parse_size(recommended_size(platform))
+    return {"width": width, "height": height, "format": "JPEG", "quality": IMAGE_JPEG_QUALITY}
+
+
+def master_spec() -> Dict:
+    """Copia de la imagen maestra: mismo tamaño, calidad alta, sin recortes"""
+    return {"width": None, "height": None, "format": "JPEG", "quality": IMAGE_MASTER_QUALITY}
+
+
+def variant_key(spec: Dict) -> str:
+    """Identificador estable de una versión, p. ej. "1200x630-jpeg-q85-v1" """
+    size = f"{spec['width']}x{spec['height']}" if spec["width"] else "master"
+    return f"{size}-{spec['format'].lower()}-q{spec['quality']}-v{DERIVATION_VERSION}"
+
+
+def guess_content_type(data: bytes) -> str:
+    """Tipo MIME según la firma de los primeros bytes (PNG por defecto)"""
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/png"
+
+
+def is_available() -> bool:
+    """True si Pillow está instalado y el preprocesamiento está activado"""
+    enabled = os.getenv("IMAGE_PROCESSING_ENABLED", "true").lower() not in ("0", "false", "no")
+    return Image is not None and enabled
+
+
+def _interest_profile(image, axis: int) -> List[int]:
+    """
+    Energía de bordes por columna (axis=0) o por fila (axis=1).
+
+    Se calcula sobre una miniatura y se devuelve un valor por píxel de la
+    imagen a tamaño completo (interpolado), para ubicar el recorte.
+    """
+    sample = image.copy()
+    sample.thumbnail((_INTEREST_SAMPLE_SIZE, _INTEREST_SAMPLE_SIZE))
+    edges = sample.convert("L").filter(ImageFilter.FIND_EDGES)
+    width, height = edges.size
+    pixels = list(edges.getdata())
+    # Descartar el borde de un píxel: FIND_EDGES lo marca siempre como borde
+    if axis == 0:
+        profile = [
+            sum(pixels[y * width + x] for y in range(1, height - 1)) if 0 < x < width - 1 else 0
+            for x in range(width)
+        ]
+        full = image.width
+    else:
+        profile = [
+            sum(pixels[y * width + 1:(y + 1) * width - 1]) if 0 < y < height - 1 else 0
+            for y in range(height)
+        ]
+        full = image.height
+    return [profile[min(len(profile) - 1, index * len(profile) // full)] for index in range(full)]
+
+
+def _best_window(profile: List[int], window: int) -> int:
+    """Inicio de la ventana de tamaño window con más energía (la más centrada en empates)"""
+    if window >= len(profile):
+        return 0
+    centered = (len(profile) - window) // 2
+    total = sum(profile[:window])
+    best_start, best_key = 0, (total, -centered)
+    for start in range(1, len(profile) - window + 1):
+        total += profile[start + window - 1] - profile[start - 1]
+        key = (total, -abs(start - centered))
+        if key > best_key:
+            best_start, best_key = start, key
+    return best_start
+
+
+def _smart_crop(image, ratio: float) -> Tuple[object, str]:
+    """
+    Recorta la imagen hacia la relación de aspecto pedida y rellena lo que falte.
+
+    El recorte conserva la zona con más detalle y nunca descarta más de
+    IMAGE_MAX_CROP_FRACTION de la imagen; si con eso no alcanza la relación
+    pedida, la imagen se centra sobre una versión ampliada y difuminada de
+    sí misma.
+
+    Returns:
+        Tuple[Image, str]: Imagen con la relación pedida y ajuste aplicado
+        ("none", "crop", "pad" o "crop+pad")
+    """
+    width, height = image.size
+    if abs(width / height - ratio) < 0.01:
+        return image, "none"
+
+    kept = max(0.0, 1.0 - IMAGE_MAX_CROP_FRACTION)
+    if width / height > ratio:
+        crop_width = max(round(height * ratio), round(width * kept))
+        left = _best_window(_interest_profile(image, axis=0), crop_width)
+        cropped = image.crop((left, 0, left + crop_width, height))
+    else:
+        crop_height = max(round(width / ratio), round(height * kept))
+        top = _best_window(_interest_profile(image, axis=1), crop_height)
+        cropped = image.crop((0, top, width, top + crop_height))
+
+    fit = "crop" if cropped.size != image.size else ""
+    if abs(cropped.width / cropped.height - ratio) < 0.01:
+        return cropped, fit
+
+    if cropped.width / cropped.height > ratio:
+        canvas_size = (cropped.width, round(cropped.width / ratio))
+    else:
+        canvas_size = (round(cropped.height * ratio), cropped.height)
+    background = ImageOps.fit(cropped, canvas_size, method=Image.BILINEAR).filter(
+        ImageFilter.GaussianBlur(radius=max(canvas_size) / 40)
+    )
+    background.paste(
+        cropped,
+        ((canvas_size[0] - cropped.width) // 2, (canvas_size[1] - cropped.height) // 2),
+    )
+    return background, f"{fit}+pad" if fit else "pad"
+
+
+def process_image(data: bytes, spec: Dict) -> Dict:
+    """
+    Deriva una versión de la imagen con el tamaño, relación de aspecto y formato indicados.
+
+    Se ejecuta en los procesos del pool, por lo que solo recibe y devuelve
+    tipos serializables. La imagen nunca se amplía por encima de su
+    resolución original; sin width ni height conserva su tamaño.
+
+    Args:
+        data (bytes): Imagen maestra
+        spec (Dict): Resultado de image_spec o master_spec (width, height, format, quality)
+
+    Returns:
+        Dict: Imagen procesada (data, content_type, width, height, fit)
+    """
+    with Image.open(BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode in ("RGBA", "LA", "P"):
+            # JPEG no admite transparencia: aplanar sobre fondo blanco
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel("A"))
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+        fit = "none"
+        if spec["width"] and spec["height"]:
+            image, fit = _smart_crop(image, spec["width"] / spec["height"])
+            scale = min(1.0, image.width / spec["width"], image.height / spec["height"])
+            size = (max(1, round(spec["width"] * scale)), max(1, round(spec["height"] * scale)))
+            if size != image.size:
+                image = image.resize(size, Image.LANCZOS)
+
+        output = BytesIO()
+        image.save(
+            output, format=spec["format"], quality=spec["quality"], optimize=True, progressive=True
+        )
+
+    return {
+        "data": output.getvalue(),
+        "content_type": f"image/{spec['format'].lower()}",
+        "width": image.width,
+        "height": image.height,
+        "fit": fit,
+    }
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max(1, IMAGE_PROCESSING_WORKERS))
+        return _pool
+
+
+class ProcessingStats:
+    """Imágenes preparadas y bytes ahorrados frente a los originales"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {
+            "images": 0,
+            "variants": 0,
+            "failed": 0,
+            "skipped": 0,
+            "bytes_in": 0,
+            "bytes_out": 0,
+            "seconds": 0.0,
+        }
+
+    def record(self, event: str, bytes_in: int = 0, bytes_out: int = 0, seconds: float = 0.0):
+        """
+        Args:
+            event (str): "images" (imagen original preparada), "variants" (formato
+                generado), "failed" o "skipped" (sin Pillow o desactivado)
+            bytes_in (int): Bytes de la imagen original
+            bytes_out (int): Bytes de la imagen procesada
+            seconds (float): Tiempo total de preparación (evento "images")
+        """
+        with self._lock:
+            self._counters[event] += 1
+            if event == "variants":
+                self._counters["bytes_in"] += bytes_in
+                self._counters["bytes_out"] += bytes_out
+            self._counters["seconds"] += seconds
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+        counters["seconds"] = round(counters["seconds"], 3)
+        counters["bytes_saved"] = counters["bytes_in"] - counters["bytes_out"]
+        counters["compression_ratio"] = (
+            round(counters["bytes_out"] / counters["bytes_in"], 3) if counters["bytes_in"] else None
+        )
+        return counters
+
+
+class ImageProcessor:
+    """Prepara una imagen para varias plataformas en el pool de procesos"""
+
+    def __init__(self, stats: Optional[ProcessingStats] = None, timeout: float = 60):
+        """
+        Args:
+            stats (Optional[ProcessingStats]): Acumulador de métricas
+            timeout (float): Segundos máximos de procesamiento de cada formato
+        """
+        self.stats = stats
+        self.timeout = timeout
+
+    @property
+    def available(self) -> bool:
+        return is_available()
+
+    def prepare_for_platforms(self, data: bytes, platforms: List[str]) -> Dict[str, Dict]:
+        """
+        Deriva de la imagen maestra la versión que corresponde a cada plataforma.
+
+        Las plataformas con el mismo formato comparten una sola conversión. Si
+        Pillow no está disponible o una conversión falla, esa plataforma recibe
+        la imagen original.
+
+        Args:
+            data (bytes): Imagen maestra
+            platforms (List[str]): Plataformas de destino
+
+        Returns:
+            Dict[str, Dict]: Por plataforma, la imagen (data, content_type,
+            width, height, sha256, variant_key), los bytes originales y los ahorrados
+        """
+        return self.prepare(data, {platform: image_spec(platform) for platform in platforms})
+
+    def prepare_master(self, data: bytes) -> Dict:
+        """Copia de alta calidad de la imagen maestra, de la que se derivan versiones posteriores"""
+        return self.prepare(data, {"master": master_spec()})["master"]
+
+    def prepare(self, data: bytes, specs: Dict[str, Dict]) -> Dict[str, Dict]:
+        """
+        Genera una versión de la imagen por cada formato pedido.
+
+        Args:
+            data (bytes): Imagen maestra
+            specs (Dict[str, Dict]): Formato (image_spec o master_spec) por nombre
+
+        Returns:
+            Dict[str, Dict]: Imagen procesada por nombre (ver prepare_for_platforms)
+        """
+        original = {
+            "data": data,
+            "content_type": guess_content_type(data),
+            "width": None,
+            "height": None,
+            "fit": None,
+            "variant_key": None,
+            "processed": False,
+        }
+        if not self.available:
+            if self.stats is not None:
+                self.stats.record("skipped")
+            return {name: self._describe(original, data) for name in specs}
+
+        started = time.monotonic()
+        pool = _get_pool()
+        futures = {}
+        for spec in specs.values():
+            key = variant_key(spec)
+            if key not in futures:
+                futures[key] = (pool.submit(process_image, data, spec), spec)
+
+        variants = {}
+        for key, (future, spec) in futures.items():
+            try:
+                variant = {**future.result(timeout=self.timeout), "variant_key": key, "processed": True}
+            except Exception as e:
+                logger.warning(f"No se pudo preparar la imagen {key}: {e}")
+                if self.stats is not None:
+                    self.stats.record("failed")
+                variant = original
+            else:
+                if self.stats is not None:
+                    self.stats.record("variants", bytes_in=len(data), bytes_out=len(variant["data"]))
+            variants[key] = self._describe(variant, data)
+
+        if self.stats is not None:
+            self.stats.record("images", seconds=time.monotonic() - started)
+        return {name: variants[variant_key(spec)] for name, spec in specs.items()}
+
+    def _describe(self, variant: Dict, original: bytes) -> Dict:
+        return {
+            **variant,
+            "sha256": hashlib.sha256(variant["data"]).hexdigest(),
+            "bytes": len(variant["data"]),
+            "original_bytes": len(original),
+            "saved_bytes": len(original) - len(variant["data"]),
+        }
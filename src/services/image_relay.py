@@ -0,0 +1,274 @@
+"""
+Reenvío de imágenes entre servicios sin pasar por disco.
+
+Descarga una imagen (por ejemplo, la URL temporal de DALL-E) y la sube a
+otro servicio (por ejemplo, la Graph API de Facebook) en una sola pasada:
+un hilo lee la respuesta de origen por fragmentos hacia un búfer en memoria
+acotado y la subida consume ese búfer como cuerpo multipart. La memoria
+usada no depende del tamaño de la imagen y no quedan archivos temporales.
+"""
+
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Dict, Iterator, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Tamaño máximo aceptado para una imagen reenviada
+IMAGE_RELAY_MAX_BYTES = int(os.getenv("IMAGE_RELAY_MAX_BYTES", str(20 * 1024 * 1024)))
+
+# Fin de la descarga dentro del búfer
+_END = object()
+
+
+class ImageRelayError(Exception):
+    """Error al descargar o reenviar una imagen"""
+
+
+class _MultipartBody:
+    """Cuerpo multipart que se genera a medida que llegan los bytes de la imagen.
+
+    Si se conoce el tamaño de la imagen expone __len__ para que requests envíe
+    Content-Length; si no, la subida usa transferencia por fragmentos.
+    """
+
+    def __init__(
+        self, preamble: bytes, file_chunks: Iterator[bytes], epilogue: bytes, file_size: Optional[int]
+    ):
+        self.preamble = preamble
+        self.file_chunks = file_chunks
+        self.epilogue = epilogue
+        self.file_size = file_size
+
+    def __iter__(self):
+        yield self.preamble
+        yield from self.file_chunks
+        yield self.epilogue
+
+    def __len__(self):
+        return len(self.preamble) + self.file_size + len(self.epilogue)
+
+
+class RelayStats:
+    """Bytes reenviados y tiempo acumulado por etapa"""
+
+    STAGES = ("connect", "transfer", "response")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {"relays": 0, "failed": 0, "bytes": 0, "peak_buffered_bytes": 0}
+        self._stage_seconds = {stage: 0.0 for stage in self.STAGES}
+
+    def record(self, report: Dict):
+        with self._lock:
+            if report.get("error"):
+                self._counters["failed"] += 1
+                return
+            self._counters["relays"] += 1
+            self._counters["bytes"] += report["bytes"]
+            self._counters["peak_buffered_bytes"] = max(
+                self._counters["peak_buffered_bytes"], report["peak_buffered_bytes"]
+            )
+            for stage in self.STAGES:
+                self._stage_seconds[stage] += report["stages"][stage]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            report = dict(self._counters)
+            relays = report["relays"]
+            report["avg_stage_seconds"] = {
+                stage: round(seconds / relays, 3) if relays else None
+                for stage, seconds in self._stage_seconds.items()
+            }
+        return report
+
+
+class ImageRelay:
+    """Descarga una imagen y la sube como multipart sin escribirla en disco"""
+
+    def __init__(
+        self,
+        chunk_size: int = 64 * 1024,
+        buffer_chunks: int = 8,
+        max_bytes: Optional[int] = None,
+        timeout: float = 30,
+        stats: Optional[RelayStats] = None,
+    ):
+        """
+        Args:
+            chunk_size (int): Bytes leídos del origen en cada fragmento
+            buffer_chunks (int): Fragmentos que puede retener el búfer en memoria
+            max_bytes (Optional[int]): Tamaño máximo aceptado (por defecto IMAGE_RELAY_MAX_BYTES)
+            timeout (float): Segundos máximos de espera de cada lectura o escritura
+            stats (Optional[RelayStats]): Acumulador de métricas
+        """
+        self.chunk_size = chunk_size
+        self.buffer_chunks = max(1, buffer_chunks)
+        self.max_bytes = max_bytes or IMAGE_RELAY_MAX_BYTES
+        self.timeout = timeout
+        self.stats = stats
+
+    def relay(
+        self,
+        source_url: str,
+        upload_url: str,
+        fields: Optional[Dict[str, str]] = None,
+        file_field: str = "file",
+        filename: str = "image.png",
+    ) -> Tuple[requests.Response, Dict]:
+        """
+        Reenvía la imagen de source_url a upload_url como multipart/form-data.
+
+        Args:
+            source_url (str): URL de la imagen de origen
+            upload_url (str): URL que recibe la subida
+            fields (Optional[Dict[str, str]]): Campos de formulario adicionales
+            file_field (str): Nombre del campo del archivo
+            filename (str): Nombre de archivo declarado en la subida
+
+        Returns:
+            Tuple[requests.Response, Dict]: Respuesta de la subida y reporte con
+            los bytes reenviados, su SHA-256, el máximo retenido en memoria y los
+            segundos de cada etapa (connect, transfer, response)
+
+        Raises:
+            ImageRelayError: Si la descarga falla o la imagen excede max_bytes
+        """
+        report = {"bytes": 0, "sha256": None, "peak_buffered_bytes": 0, "stages": {}, "error": None}
+        started = time.monotonic()
+        try:
+            response = self._relay(
+                source_url, upload_url, fields or {}, file_field, filename, report, started
+            )
+        except Exception as e:
+            report["error"] = str(e)
+            raise
+        finally:
+            report["total_seconds"] = round(time.monotonic() - started, 3)
+            if self.stats is not None:
+                self.stats.record(report)
+            logger.info(f"Reenvío de imagen: {report}")
+        return response, report
+
+    def _relay(
+        self,
+        source_url: str,
+        upload_url: str,
+        fields: Dict[str, str],
+        file_field: str,
+        filename: str,
+        report: Dict,
+        started: float,
+    ) -> requests.Response:
+        source = requests.get(source_url, stream=True, timeout=self.timeout)
+        try:
+            source.raise_for_status()
+        except requests.HTTPError as e:
+            source.close()
+            raise ImageRelayError(f"Error descargando imagen: {e}")
+        connected = time.monotonic()
+        report["stages"]["connect"] = round(connected - started, 3)
+
+        content_type = source.headers.get("Content-Type", "image/png").split(";")[0].strip()
+        declared_size = source.headers.get("Content-Length")
+        # Con Content-Encoding los bytes recibidos no coinciden con Content-Length
+        file_size = (
+            int(declared_size)
+            if declared_size and declared_size.isdigit() and not source.headers.get("Content-Encoding")
+            else None
+        )
+        if file_size is not None and file_size > self.max_bytes:
+            source.close()
+            raise ImageRelayError(f"La imagen ocupa {file_size} bytes; el máximo es {self.max_bytes}")
+
+        buffer = queue.Queue(maxsize=self.buffer_chunks)
+        stop = threading.Event()
+        producer_state = {"error": None}
+        hasher = hashlib.sha256()
+
+        def produce():
+            try:
+                for chunk in source.iter_content(self.chunk_size):
+                    if not chunk:
+                        continue
+                    report["bytes"] += len(chunk)
+                    hasher.update(chunk)
+                    if report["bytes"] > self.max_bytes:
+                        raise ImageRelayError(f"La imagen excede el máximo de {self.max_bytes} bytes")
+                    if not self._put(buffer, chunk, stop):
+                        return
+                    report["peak_buffered_bytes"] = max(
+                        report["peak_buffered_bytes"], buffer.qsize() * self.chunk_size
+                    )
+            except Exception as e:
+                producer_state["error"] = e
+            finally:
+                source.close()
+                self._put(buffer, _END, stop)
+
+        def file_chunks() -> Iterator[bytes]:
+            while True:
+                try:
+                    chunk = buffer.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise ImageRelayError("La descarga de la imagen se detuvo")
+                if chunk is _END:
+                    break
+                yield chunk
+            if producer_state["error"] is not None:
+                raise ImageRelayError(f"Error descargando imagen: {producer_state['error']}")
+            if file_size is not None and report["bytes"] != file_size:
+                raise ImageRelayError(
+                    f"La imagen se recibió incompleta ({report['bytes']} de {file_size} bytes)"
+                )
+            report["sha256"] = hasher.hexdigest()
+            report["stages"]["transfer"] = round(time.monotonic() - connected, 3)
+
+        boundary = uuid.uuid4().hex
+        preamble = "".join(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+            for name, value in fields.items()
+        )
+        preamble += (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+            f'filename="{filename}"\r\nContent-Type: {content_type}\r\n\r\n'
+        )
+        body = _MultipartBody(
+            preamble.encode("utf-8"), file_chunks(), f"\r\n--{boundary}--\r\n".encode("utf-8"), file_size
+        )
+
+        producer = threading.Thread(target=produce, name="image-relay", daemon=True)
+        producer.start()
+        try:
+            response = requests.post(
+                upload_url,
+                data=body if file_size is not None else iter(body),
+                headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+                timeout=self.timeout,
+            )
+        finally:
+            stop.set()
+
+        if producer_state["error"] is not None:
+            raise ImageRelayError(f"Error descargando imagen: {producer_state['error']}")
+        report["stages"]["response"] = round(
+            time.monotonic() - connected - report["stages"].get("transfer", 0), 3
+        )
+        return response
+
+    def _put(self, buffer: queue.Queue, item, stop: threading.Event) -> bool:
+        """Encola respetando el límite del búfer; False si la subida ya terminó"""
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
@@ -3,43 +3,102 @@ Servicio inteligente que procesa comandos en lenguaje natural para generar conte
 crear imágenes con DALL-E y publicar automáticamente en redes sociales.
 """
 
-import json
 import logging
 import re
 import requests
 import tempfile
 import os
 import base64
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import datetime
-from pathlib import Path
-import openai
-from openai import OpenAI
 from urllib.parse import urlparse
 
-from src.services.llm_adapter import LLMAdapter
+from src.services.asset_store import (
+    AssetStore,
+    content_hash,
+    facebook_photo_url,
+    get_default_asset_store,
+    strip_access_token,
+)
+from src.services.command_parser import SUPPORTED_PLATFORMS, CommandParserStats, parse_command
+from src.services.image_processing import ImageProcessor, ProcessingStats, image_spec, variant_key
+from src.services.image_relay import IMAGE_RELAY_MAX_BYTES, ImageRelay, RelayStats
+from src.services.llm_adapter import PROMPT_REGISTRY, TOKEN_BUDGETER, LLMAdapter, run_coroutine_sync
+from src.services.json_extractor import extract_json
 from src.services.instagram_service import instagram_create_media, instagram_publish_media
 from src.services.facebook_service import facebook_post_text, facebook_post_image
 from src.services.linkedin_service import linkedin_post_text, linkedin_post_image
+from src.services.publish_dispatcher import ensure_published, get_publish_timeout
+from src.services.run_store import (
+    INSTAGRAM_CREATION_STAGE,
+    RunCheckpoints,
+    RunConflictError,
+    RunStore,
+    get_default_run_store,
+)
+from src.services.stage_executor import COMPLETED, DISABLED, SKIPPED, Stage, StageExecutor, StageStats, stage_policy
 
 logger = logging.getLogger(__name__)
 
 
+# Comandos analizados localmente frente a los que requirieron al LLM
+COMMAND_STATS = CommandParserStats()
+
+# Bytes y tiempos de las imágenes reenviadas de DALL-E a Facebook
+RELAY_STATS = RelayStats()
+
+# Bytes ahorrados al adaptar las imágenes a cada plataforma
+PROCESSING_STATS = ProcessingStats()
+
+# Ejecuciones, fallos y duración de cada etapa del pipeline
+STAGE_STATS = StageStats()
+
+
 class IntelligentPublisher:
     """Servicio que procesa comandos en lenguaje natural y ejecuta automáticamente"""
     
-    def __init__(self, openai_api_key: str):
+    # Confianza mínima del analizador local para omitir la llamada al LLM
+    FAST_PATH_MIN_CONFIDENCE = float(os.getenv("COMMAND_FAST_PATH_MIN_CONFIDENCE", "0.7"))
+    
+    # Modo de una sola llamada: análisis del comando y publicaciones en la misma respuesta
+    ONE_SHOT_ENABLED = os.getenv("SMART_PUBLISH_ONE_SHOT", "false").lower() in ("1", "true", "yes")
+    
+    # Tokens de salida reservados para los campos del análisis en el modo de una sola llamada
+    ONE_SHOT_ANALYSIS_TOKENS = 500
+    
+    # Tiempo límite (segundos) y reintentos por tipo de etapa; la publicación
+    # usa los límites de publish_dispatcher y no se reintenta. Las etapas que
+    # llaman al LLM o generan la imagen tampoco: un intento que excede el
+    # tiempo límite sigue en curso y reintentarlo pagaría la llamada dos veces
+    STAGE_POLICIES = {
+        "analyze": stage_policy("analyze", 45, retries=0),
+        "content": stage_policy("content", 90, retries=0),
+        "image_generate": stage_policy("image_generate", 120, retries=0),
+        "image_upload": stage_policy("image_upload", 90, retries=1),
+    }
+    
+    def __init__(self, openai_api_key: str, one_shot: Optional[bool] = None):
         """
         Inicializa el publicador inteligente.
         
         Args:
             openai_api_key (str): Clave API de OpenAI
+            one_shot (Optional[bool]): Analizar el comando y redactar las publicaciones
+                en una sola llamada (por defecto SMART_PUBLISH_ONE_SHOT)
         """
-        self.openai_client = OpenAI(api_key=openai_api_key)
+        self.one_shot = self.ONE_SHOT_ENABLED if one_shot is None else one_shot
         self.llm_adapter = LLMAdapter(openai_api_key)
+        # Una sola etapa de contenido para todas las plataformas cuando salen de una misma respuesta
+        self.combined_content = self.one_shot or self.llm_adapter.generation_mode == "combined"
+        self.backend = self.llm_adapter.backend
+        self.image_relay = ImageRelay(stats=RELAY_STATS)
+        self.image_processor = ImageProcessor(stats=PROCESSING_STATS)
+        self.asset_store = get_default_asset_store()
+        self.run_store = get_default_run_store()
         logger.info("IntelligentPublisher inicializado correctamente")
     
-    def process_natural_command(self, command: str) -> Dict:
+    def process_natural_command(self, command: str, run_id: Optional[str] = None) -> Dict:
         """
         Procesa un comando en lenguaje natural y ejecuta todas las acciones necesarias.
         
@@ -48,114 +107,426 @@ class IntelligentPublisher:
                          "Quiero publicar en Instagram sobre nuestro nuevo producto X con una imagen moderna"
                          "Publica en Facebook e Instagram sobre el evento de mañana"
                          "Crea un post para Instagram sobre tecnología con imagen futurista"
+            run_id (Optional[str]): Ejecución anterior del mismo comando a reanudar;
+                sus etapas completadas no se repiten
         
         Returns:
-            Dict: Resultado completo de la operación
+            Dict: Resultado completo de la operación, con la traza de tiempos de cada etapa
         """
-        try:
-            logger.info(f"Procesando comando: {command[:100]}...")
-            
-            # 1. Analizar el comando con GPT para extraer información
-            analysis = self._analyze_command(command)
-            
-            # 2. Generar contenido optimizado para cada plataforma
-            content = self._generate_content(analysis)
-            
-            # 3. Generar imagen si es necesaria
-            image_url = None
-            if analysis.get("needs_image", False):
-                image_url = self._generate_image(analysis.get("image_prompt", ""))
-            
-            # 4. Publicar en las plataformas especificadas
-            publication_results = {}
-            for platform in analysis.get("platforms", []):
-                try:
-                    result = self._publish_to_platform(
-                        platform, 
-                        content.get(platform, {}), 
-                        image_url
-                    )
-                    publication_results[platform] = result
-                except Exception as e:
-                    publication_results[platform] = {
-                        "error": str(e),
-                        "status": "failed"
-                    }
-            
-            return {
-                "success": True,
-                "message": "Comando procesado exitosamente",
-                "analysis": analysis,
-                "generated_content": content,
-                "generated_image": image_url,
-                "publication_results": publication_results,
-                "timestamp": datetime.now().isoformat()
-            }
-            
-        except Exception as e:
-            logger.error(f"Error en process_natural_command: {e}")
-            return {
-                "success": False,
-                "error": str(e),
-                "timestamp": datetime.now().isoformat()
-            }
+        logger.info(f"Procesando comando: {command[:100]}...")
+        result = self._run_pipeline(command, publish=True, run_id=run_id)
+        if result["success"]:
+            result["message"] = "Comando procesado exitosamente"
+        return result
     
-    def process_natural_command_test_mode(self, command: str) -> Dict:
+    def process_natural_command_test_mode(self, command: str, run_id: Optional[str] = None) -> Dict:
         """
         Procesa un comando en lenguaje natural SOLO generando contenido e imagen, sin publicar.
         
+        Ejecuta el mismo grafo de etapas que process_natural_command con las
+        etapas de publicación desactivadas. Con el run_id devuelto,
+        process_natural_command publica el mismo contenido e imagen.
+        
         Args:
             command (str): Comando en lenguaje natural
+            run_id (Optional[str]): Ejecución anterior del mismo comando a reanudar
             
         Returns:
             Dict: Contenido generado sin intentar publicar
         """
-        try:
-            logger.info(f"Procesando comando en modo prueba: {command[:100]}...")
-            
-            # 1. Analizar el comando con GPT para extraer información
-            analysis = self._analyze_command(command)
-            
-            # 2. Generar contenido optimizado para cada plataforma
-            content = self._generate_content(analysis)
-            
-            # 3. Generar imagen si es necesaria
-            image_url = None
-            if analysis.get("needs_image", False):
-                image_url = self._generate_image(analysis.get("image_prompt", ""))
+        logger.info(f"Procesando comando en modo prueba: {command[:100]}...")
+        result = self._run_pipeline(command, publish=False, run_id=run_id)
+        if result["success"]:
+            result["message"] = "Contenido generado exitosamente (modo prueba - sin publicar)"
+        result["publication_results"] = {"note": "Modo prueba - no se publicó automáticamente"}
+        result["instructions"] = {
+            "next_steps": "Usa los endpoints directos para publicar manualmente:",
+            "instagram": "POST /publish/instagram con image_url y caption",
+            "facebook_text": "POST /publish/facebook/text con message",
+            "facebook_image": "POST /publish/facebook/image con image_url y caption",
+            "linkedin_text": "POST /publish/linkedin/text con message",
+            "linkedin_image": "POST /publish/linkedin/image con image_url y message"
+        }
+        return result
+    
+    def _run_pipeline(self, command: str, publish: bool, run_id: Optional[str] = None) -> Dict:
+        """
+        Ejecuta el grafo de etapas del comando y arma el resultado.
+        
+        La salida de cada etapa completada se guarda en el almacén de puntos
+        de control; al reanudar un run_id esas etapas devuelven la salida
+        guardada y solo se ejecutan las que faltan o fallaron.
+        
+        Args:
+            command (str): Comando en lenguaje natural
+            publish (bool): False desactiva las etapas de publicación
+            run_id (Optional[str]): Ejecución a reanudar (por defecto, una nueva)
             
-            return {
-                "success": True,
-                "message": "Contenido generado exitosamente (modo prueba - sin publicar)",
-                "analysis": analysis,
-                "generated_content": content,
-                "generated_image": image_url,
-                "publication_results": {"note": "Modo prueba - no se publicó automáticamente"},
-                "timestamp": datetime.now().isoformat(),
-                "instructions": {
-                    "next_steps": "Usa los endpoints directos para publicar manualmente:",
-                    "instagram": "POST /publish/instagram con image_url y caption",
-                    "facebook_text": "POST /publish/facebook/text con message",
-                    "facebook_image": "POST /publish/facebook/image con image_url y caption",
-                    "linkedin_text": "POST /publish/linkedin/text con message",
-                    "linkedin_image": "POST /publish/linkedin/image con image_url y message"
-                }
-            }
+        Returns:
+            Dict: Análisis, contenido, imágenes, resultados de publicación, traza y run_id
             
+        Raises:
+            RunConflictError: Si run_id pertenece a otra solicitud
+        """
+        try:
+            checkpoints = self._start_run(run_id, command=command, one_shot=self.one_shot)
+            stages = self._checkpointed(self._build_stages(command, publish, checkpoints), checkpoints)
+            run = StageExecutor(stats=STAGE_STATS).run(stages)
+        except RunConflictError:
+            raise
         except Exception as e:
-            logger.error(f"Error en process_natural_command_test_mode: {e}")
+            logger.error(f"Error en el pipeline de publicación: {e}")
             return {
                 "success": False,
                 "error": str(e),
+                "run_id": run_id,
                 "timestamp": datetime.now().isoformat()
             }
+        
+        results = run["results"]
+        analysis = results.get("analyze", {}).get("analysis", {})
+        if self.combined_content:
+            content = dict(results.get("content") or {})
+        else:
+            content = {
+                platform: results[f"content:{platform}"]
+                for platform in SUPPORTED_PLATFORMS
+                if f"content:{platform}" in results
+            }
+        content = {platform: content[platform] for platform in analysis.get("platforms", []) if platform in content}
+        image_urls = self._image_urls(results.get("image:upload") or {})
+        
+        publication_results = {}
+        for entry in run["trace"]:
+            if not entry["stage"].startswith("publish:") or entry["status"] in (SKIPPED, DISABLED):
+                continue
+            platform = entry["stage"].split(":", 1)[1]
+            if platform not in analysis.get("platforms", []):
+                continue
+            if entry["status"] == COMPLETED:
+                publication_results[platform] = {**results[entry["stage"]], "elapsed_seconds": entry["seconds"]}
+            else:
+                publication_results[platform] = {
+                    "status": entry["status"],
+                    "error": entry["error"],
+                    "elapsed_seconds": entry["seconds"],
+                }
+        if publish:
+            for platform in analysis.get("platforms", []):
+                if platform not in SUPPORTED_PLATFORMS:
+                    publication_results[platform] = {
+                        "status": "failed",
+                        "error": f"Plataforma no soportada: {platform}",
+                        "elapsed_seconds": None,
+                    }
+        
+        # Los fallos de publicación se informan por plataforma; los de generación, en "error"
+        generation_errors = {
+            stage: error for stage, error in run["errors"].items() if not stage.startswith("publish:")
+        }
+        result = {
+            "success": not generation_errors,
+            "analysis": analysis,
+            "generated_content": content,
+            "generated_image": next(iter(image_urls.values()), None),
+            "platform_images": image_urls,
+            "publication_results": publication_results,
+            "stage_trace": run["trace"],
+            "run_id": checkpoints.run_id,
+            "resumed_stages": checkpoints.reused,
+            "timestamp": datetime.now().isoformat()
+        }
+        if generation_errors:
+            result["error"] = "; ".join(f"{stage}: {error}" for stage, error in generation_errors.items())
+        return result
+    
+    def _start_run(self, run_id: Optional[str], **request) -> RunCheckpoints:
+        """
+        Registra la ejecución en el almacén de puntos de control o retoma run_id.
+        
+        Raises:
+            RunConflictError: Si run_id pertenece a otra solicitud
+        """
+        if self.run_store is None:
+            return RunCheckpoints(None, run_id, {})
+        return self.run_store.start(run_id or RunStore.new_run_id(), "smart_publish", **request)
+    
+    def _checkpointed(self, stages: List[Stage], checkpoints: RunCheckpoints) -> List[Stage]:
+        """
+        Hace que cada etapa reutilice su salida guardada o guarde la nueva al completarse.
+        
+        Las etapas fallidas no se guardan, por lo que un reintento las repite.
+        La imagen generada solo se guarda cuando su subida se completó y sin
+        la URL temporal de DALL-E, que caduca antes que el punto de control.
+        """
+        for stage in stages:
+            def run(inputs: Dict, name: str = stage.name, original: Callable = stage.run):
+                if name in checkpoints:
+                    return checkpoints.reuse(name)
+                output = original(inputs)
+                if name == "image:generate" and output is not None and output.get("dalle_url"):
+                    return output
+                checkpoints.save(name, output)
+                if name == "image:upload" and "image:generate" not in checkpoints:
+                    checkpoints.save("image:generate", {**inputs["image:generate"], "dalle_url": None})
+                return output
+            
+            stage.run = run
+        return stages
+    
+    def _build_stages(
+        self, command: str, publish: bool, checkpoints: Optional[RunCheckpoints] = None
+    ) -> List[Stage]:
+        """
+        Construye el grafo analyze → {contenido por plataforma, imagen → subida} → publicación.
+        
+        Cada etapa empieza en cuanto están listas sus entradas: la imagen se
+        genera mientras se redacta el contenido y cada plataforma se publica
+        apenas tiene su texto y su imagen. Las etapas de plataformas que el
+        análisis no pidió se omiten. En modo de una sola llamada o con
+        LLM_GENERATION_MODE=combined hay una única etapa de contenido que
+        redacta todas las plataformas en una misma respuesta.
+        
+        Args:
+            command (str): Comando en lenguaje natural
+            publish (bool): False desactiva las etapas de publicación (modo prueba)
+            checkpoints (Optional[RunCheckpoints]): Puntos de control de la ejecución,
+                usados para no recrear el contenedor de Instagram al reintentar
+            
+        Returns:
+            List[Stage]: Etapas del grafo
+        """
+        def analysis_of(inputs: Dict) -> Dict:
+            return inputs["analyze"]["analysis"]
+        
+        def requested(platform: str) -> Callable[[Dict], bool]:
+            return lambda inputs: platform in analysis_of(inputs).get("platforms", [])
+        
+        policies = self.STAGE_POLICIES
+        stages = [
+            Stage("analyze", lambda inputs: self._analyze_stage(command), **policies["analyze"]),
+            Stage(
+                "image:generate",
+                lambda inputs: self._request_image(
+                    analysis_of(inputs).get("image_prompt", ""), analysis_of(inputs).get("platforms", [])
+                ),
+                deps=["analyze"],
+                condition=lambda inputs: bool(analysis_of(inputs).get("needs_image", False)),
+                **policies["image_generate"],
+            ),
+            Stage(
+                "image:upload",
+                lambda inputs: self._upload_image(
+                    inputs["image:generate"], analysis_of(inputs).get("platforms", [])
+                ),
+                deps=["analyze", "image:generate"],
+                condition=lambda inputs: inputs["image:generate"] is not None,
+                **policies["image_upload"],
+            ),
+        ]
+        
+        if self.combined_content:
+            # Todas las publicaciones salen de la misma respuesta
+            stages.append(
+                Stage(
+                    "content",
+                    lambda inputs: self._content_stage(inputs["analyze"]),
+                    deps=["analyze"],
+                    **policies["content"],
+                )
+            )
+        
+        for platform in SUPPORTED_PLATFORMS:
+            content_stage = "content" if self.combined_content else f"content:{platform}"
+            if not self.combined_content:
+                stages.append(
+                    Stage(
+                        content_stage,
+                        lambda inputs, platform=platform: self._platform_content_stage(
+                            inputs["analyze"], platform
+                        ),
+                        deps=["analyze"],
+                        condition=requested(platform),
+                        **policies["content"],
+                    )
+                )
+            stages.append(
+                Stage(
+                    f"publish:{platform}",
+                    lambda inputs, platform=platform, content_stage=content_stage: self._publish_to_platform(
+                        platform,
+                        self._content_for(inputs[content_stage], platform),
+                        self._image_urls(inputs["image:upload"] or {}).get(platform),
+                        checkpoints,
+                    ),
+                    deps=["analyze", content_stage, "image:upload"],
+                    condition=requested(platform),
+                    enabled=publish,
+                    # Publicar no es idempotente: no se reintenta
+                    timeout=get_publish_timeout(platform),
+                    retries=0,
+                )
+            )
+        return stages
+    
+    def _content_for(self, stage_result: Dict, platform: str) -> Dict:
+        """Contenido de una plataforma a partir del resultado de su etapa de contenido"""
+        if self.combined_content:
+            if platform not in (stage_result or {}):
+                raise Exception(f"No hay contenido generado para {platform}")
+            return stage_result[platform]
+        return stage_result
+    
+    def _analyze_stage(self, command: str) -> Dict:
+        """
+        Analiza el comando; en modo de una sola llamada también redacta las publicaciones.
+        
+        Los comandos que el analizador local no resuelve se analizan y redactan
+        con una única respuesta estructurada; si la respuesta no es válida se
+        usa el análisis habitual.
+        
+        Returns:
+            Dict: {"analysis": análisis, "content": publicaciones ya redactadas por plataforma}
+        """
+        if self.one_shot and self._basic_analysis(command)["confidence"] < self.FAST_PATH_MIN_CONFIDENCE:
+            one_shot_result = self._one_shot_analysis(command)
+            if one_shot_result is not None:
+                analysis, content = one_shot_result
+                return {"analysis": analysis, "content": content}
+        return {"analysis": self._analyze_command(command), "content": {}}
+    
+    def _content_stage(self, analyzed: Dict) -> Dict:
+        """
+        Completa en una sola llamada combinada las publicaciones que el análisis no trajo.
+        
+        Raises:
+            Exception: Si alguna plataforma pedida queda sin contenido
+        """
+        analysis = analyzed["analysis"]
+        content = dict(analyzed["content"])
+        missing = [platform for platform in analysis.get("platforms", []) if platform not in content]
+        if missing:
+            content.update(self._generate_content({**analysis, "platforms": missing}))
+        still_missing = [platform for platform in missing if platform not in content]
+        if still_missing:
+            raise Exception(f"No se pudo generar contenido para: {', '.join(still_missing)}")
+        return content
+    
+    def _platform_content_stage(self, analyzed: Dict, platform: str) -> Dict:
+        """
+        Genera la publicación de una plataforma.
+        
+        Raises:
+            Exception: Si no se pudo generar el contenido
+        """
+        if platform in analyzed["content"]:
+            return analyzed["content"][platform]
+        content = self._generate_content({**analyzed["analysis"], "platforms": [platform]})
+        if platform not in content:
+            raise Exception(f"No se pudo generar contenido para {platform}")
+        return content[platform]
     
 
+    def _one_shot_analysis(self, command: str) -> Optional[Tuple[Dict, Dict]]:
+        """
+        Analiza el comando y redacta las publicaciones con una sola respuesta JSON.
+        
+        El análisis se valida con la misma estructura que _analyze_command y cada
+        publicación con el mismo ajuste que transform_for_platform; las
+        plataformas sin una publicación válida las completa la etapa de contenido.
+        
+        Returns:
+            Optional[Tuple[Dict, Dict]]: Análisis y contenido por plataforma, o
+            None si la llamada falla o el análisis no es válido
+        """
+        platforms = list(SUPPORTED_PLATFORMS)
+        tier = max(
+            (self.llm_adapter.select_model_tier(platform, command) for platform in platforms),
+            key=LLMAdapter.MODEL_TIER_ORDER.index,
+        )
+        try:
+            response = run_coroutine_sync(
+                self.llm_adapter.acreate_completion(
+                    "one_shot",
+                    tier,
+                    messages=PROMPT_REGISTRY.build_one_shot_messages(command, platforms),
+                    temperature=0.5,
+                    max_tokens=min(
+                        self.ONE_SHOT_ANALYSIS_TOKENS
+                        + sum(TOKEN_BUDGETER.budget(platform) for platform in platforms),
+                        LLMAdapter.COMBINED_MAX_TOKENS,
+                    ),
+                    response_format={"type": "json_object"},
+                )
+            )
+            result = extract_json(response.choices[0].message.content)
+            analysis = self._validate_analysis(result)
+        except Exception as e:
+            logger.error(f"Error en análisis de una sola llamada, usando el flujo habitual: {e}")
+            return None
+        
+        COMMAND_STATS.record("one_shot")
+        content = self.llm_adapter.parse_platform_sections(result.get("posts"), analysis["platforms"])
+        
+        logger.info(f"Análisis y contenido en una sola llamada: {analysis}")
+        return analysis, content
+    
+    def _validate_analysis(self, result: Dict, source: str = "one_shot") -> Dict:
+        """
+        Valida que un análisis tenga la estructura que produce _analyze_command.
+        
+        Args:
+            result: Análisis devuelto por el LLM
+            source: Valor de "analysis_source" del análisis validado
+        
+        Raises:
+            ValueError: Si faltan campos o no hay plataformas soportadas
+        """
+        platforms = result.get("platforms")
+        if not isinstance(platforms, list):
+            raise ValueError("El análisis no incluye la lista de plataformas")
+        platforms = list(dict.fromkeys(
+            platform.strip().lower() for platform in platforms
+            if isinstance(platform, str) and platform.strip().lower() in SUPPORTED_PLATFORMS
+        ))
+        if not platforms:
+            raise ValueError("El análisis no incluye ninguna plataforma soportada")
+        
+        for field in ("title", "content"):
+            if not isinstance(result.get(field), str) or not result[field].strip():
+                raise ValueError(f"El análisis no incluye '{field}'")
+        
+        needs_image = result.get("needs_image")
+        if isinstance(needs_image, str):
+            needs_image = needs_image.strip().lower() in ("true", "si", "sí", "yes")
+        image_prompt = result.get("image_prompt")
+        image_prompt = image_prompt.strip() if isinstance(image_prompt, str) else ""
+        if needs_image and not image_prompt:
+            raise ValueError("El análisis pide una imagen sin 'image_prompt'")
+        
+        return {
+            "platforms": platforms,
+            "title": result["title"].strip(),
+            "content": result["content"].strip(),
+            "needs_image": bool(needs_image),
+            "image_prompt": image_prompt,
+            "analysis_source": source,
+        }
     
     def _analyze_command(self, command: str) -> Dict:
         """
         Analiza el comando en lenguaje natural para extraer información estructurada.
+        
+        Los comandos que el analizador local entiende con suficiente confianza
+        no llegan al LLM.
         """
+        analysis = self._basic_analysis(command)
+        if analysis["confidence"] >= self.FAST_PATH_MIN_CONFIDENCE:
+            COMMAND_STATS.record("fast_path")
+            analysis["analysis_source"] = "fast_path"
+            logger.info(f"Análisis local completado (confianza {analysis['confidence']}): {analysis}")
+            return analysis
+        
         system_prompt = """Eres un asistente que analiza comandos para publicación en redes sociales.
         
 Tu tarea es analizar el comando del usuario y extraer:
@@ -183,49 +554,39 @@ Ejemplos de análisis:
 """
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": command}
-                ],
-                temperature=0.3,
-                max_tokens=500
+            response = run_coroutine_sync(
+                self.llm_adapter.acreate_completion(
+                    "analyze_command",
+                    model=self.backend.chat_model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": command}
+                    ],
+                    temperature=0.3,
+                    max_tokens=500
+                )
             )
             
-            result = json.loads(response.choices[0].message.content)
+            result = self._validate_analysis(extract_json(response.choices[0].message.content), "llm")
+            COMMAND_STATS.record("llm")
             logger.info(f"Análisis completado: {result}")
             return result
             
         except Exception as e:
             logger.error(f"Error analizando comando: {e}")
-            # Fallback: análisis básico por palabras clave
-            return self._basic_analysis(command)
+            # Fallback: análisis local aunque su confianza sea baja
+            COMMAND_STATS.record("fallback")
+            analysis["analysis_source"] = "fallback"
+            return analysis
     
     def _basic_analysis(self, command: str) -> Dict:
-        """Análisis básico por palabras clave como fallback."""
-        platforms = []
-        
-        if "instagram" in command.lower() or "insta" in command.lower():
-            platforms.append("instagram")
-        if "facebook" in command.lower() or "fb" in command.lower():
-            platforms.append("facebook")
-        if "linkedin" in command.lower():
-            platforms.append("linkedin")
-        
-        # Detectar "todas las redes" o "redes sociales"
-        if "todas las redes" in command.lower() or "all platforms" in command.lower():
-            platforms = ["facebook", "instagram", "linkedin"]
-        elif not platforms:
-            platforms = ["facebook", "instagram"]  # Por defecto Facebook e Instagram
+        """
+        Análisis local por palabras clave, sinónimos y expresiones regulares.
         
-        return {
-            "platforms": platforms,
-            "title": "Publicación en redes sociales",
-            "content": command,
-            "needs_image": "instagram" in platforms or "linkedin" in platforms,
-            "image_prompt": "imagen moderna y atractiva para redes sociales"
-        }
+        Returns:
+            Dict: Análisis con la estructura del LLM más "confidence" (0 a 1)
+        """
+        return parse_command(command)
     
     def _generate_content(self, analysis: Dict) -> Dict:
         """
@@ -234,148 +595,337 @@ Ejemplos de análisis:
         return self.llm_adapter.transform_for_multiple_platforms(
             heading=analysis.get("title", ""),
             material=analysis.get("content", ""),
-            target_platforms=analysis.get("platforms", [])
+            target_platforms=analysis.get("platforms", []),
+            # En modo de una sola llamada todas las publicaciones salen de una respuesta
+            generation_mode="combined" if self.one_shot else None
         )
     
-    def _generate_image(self, image_prompt: str) -> Optional[str]:
+    def _request_image(self, image_prompt: str, platforms: List[str]) -> Dict:
         """
-        Genera una imagen usando DALL-E 3, la descarga y la hace públicamente accesible.
+        Genera una imagen usando DALL-E 3.
+        
+        Si el mismo prompt ya generó una imagen vigente en el almacén de
+        imágenes, no se vuelve a generar y se devuelve el registro guardado.
         
         Args:
             image_prompt (str): Prompt para generar la imagen
+            platforms (List[str]): Plataformas donde se publicará la imagen
             
         Returns:
-            Optional[str]: URL de la imagen accesible públicamente
+            Dict: {"prompt_hash", "asset": registro reutilizable o None,
+            "dalle_url": URL temporal de DALL-E o None}
         """
-        logger.info(f"🎨 Generando imagen con DALL-E para: {image_prompt}")
-        
         # Mejorar el prompt para DALL-E
         enhanced_prompt = f"""{image_prompt}. 
         Estilo: moderno, profesional, colores vibrantes, alta calidad, 
         formato cuadrado 1:1 ideal para redes sociales, 
         sin texto superpuesto, imagen limpia y atractiva"""
+        generation_params = {"size": "1024x1024", "quality": "standard"}
         
-        response = self.openai_client.images.generate(
-            model="dall-e-3",
-            prompt=enhanced_prompt,
-            size="1024x1024",
-            quality="standard",
-            n=1
+        prompt_hash = AssetStore.prompt_hash(
+            prompt=enhanced_prompt, model=self.backend.image_model, **generation_params
+        )
+        asset = self.asset_store.find_by_prompt(prompt_hash) if self.asset_store is not None else None
+        reusable_ref = "master_photo_id" if self.image_processor.available else "facebook_photo_id"
+        if asset is not None and asset["refs"].get(reusable_ref):
+            logger.info(f"♻️ Imagen reutilizada del almacén para: {image_prompt}")
+            return {"prompt_hash": prompt_hash, "asset": asset, "dalle_url": None}
+        
+        logger.info(f"🎨 Generando imagen con DALL-E para: {image_prompt}")
+        response = self.backend.generate_image(
+            enhanced_prompt,
+            n=1,
+            **generation_params
         )
         
-        dalle_url = response.data[0].url
         logger.info(f"✅ Imagen DALL-E generada exitosamente")
+        return {"prompt_hash": prompt_hash, "asset": None, "dalle_url": response.data[0].url}
+    
+    def _upload_image(self, image: Dict, platforms: List[str]) -> Dict[str, str]:
+        """
+        Hace públicamente accesible para cada plataforma la imagen de _request_image.
+        
+        Si Pillow está disponible, de la imagen generada (la maestra) se deriva
+        una versión por plataforma con su tamaño, relación de aspecto y formato
+        recomendados; si no, se reenvía sin cambios y todas usan la misma foto.
+        Con una imagen reutilizada del almacén se aprovechan las versiones ya
+        subidas y las que falten se derivan de la copia guardada de la maestra.
+        
+        Args:
+            image (Dict): Resultado de _request_image
+            platforms (List[str]): Plataformas donde se publicará la imagen
+            
+        Returns:
+            Dict[str, str]: ID de la foto en Facebook por plataforma; la URL se
+            arma con el token vigente al publicar (ver _image_urls)
+        """
+        platforms = platforms or ["facebook"]
+        asset = image["asset"]
+        if asset is not None:
+            if self.image_processor.available:
+                return self._derive_platform_images(
+                    asset["sha256"], asset["refs"], platforms, master_photo_id=asset["refs"]["master_photo_id"]
+                )
+            return {platform: asset["refs"]["facebook_photo_id"] for platform in platforms}
         
         # Descargar y convertir a URL pública accesible
         logger.info("🔄 Procesando imagen para redes sociales...")
-        public_url = self._make_image_publicly_accessible(dalle_url)
+        if self.image_processor.available:
+            photo_ids = self._prepare_and_upload_images(image["dalle_url"], platforms, image["prompt_hash"])
+        else:
+            photo_id = self._make_image_publicly_accessible(image["dalle_url"], prompt_hash=image["prompt_hash"])
+            photo_ids = {platform: photo_id for platform in platforms}
         
-        logger.info(f"🎉 Imagen lista para publicación: {public_url}")
-        return public_url
+        logger.info(f"🎉 Imagen lista para publicación: {photo_ids}")
+        return photo_ids
     
-    def _download_and_save_dalle_image(self, dalle_url: str) -> str:
+    def _image_urls(self, photo_ids: Dict[str, str]) -> Dict[str, str]:
+        """
+        URL pública de la foto de cada plataforma con el token de página vigente.
+        
+        El token no se guarda en el almacén de imágenes ni en los puntos de
+        control: rotarlo no invalida las fotos ya subidas.
         """
-        Descarga la imagen de DALL-E y la guarda localmente.
+        from src.config import PAGE_ACCESS_TOKEN
+        
+        return {
+            platform: facebook_photo_url(photo_id, PAGE_ACCESS_TOKEN)
+            for platform, photo_id in photo_ids.items()
+        }
+    
+    def _download_image(self, image_url: str) -> bytes:
+        """
+        Descarga una imagen en memoria respetando IMAGE_RELAY_MAX_BYTES.
+        
+        Raises:
+            Exception: Si la descarga falla o la imagen excede el tamaño máximo
+        """
+        response = requests.get(image_url, stream=True, timeout=self.image_relay.timeout)
+        try:
+            response.raise_for_status()
+            chunks, size = [], 0
+            for chunk in response.iter_content(self.image_relay.chunk_size):
+                size += len(chunk)
+                if size > IMAGE_RELAY_MAX_BYTES:
+                    raise Exception(f"La imagen excede el máximo de {IMAGE_RELAY_MAX_BYTES} bytes")
+                chunks.append(chunk)
+        finally:
+            response.close()
+        return b"".join(chunks)
+    
+    def _prepare_and_upload_images(
+        self, dalle_url: str, platforms: List[str], prompt_hash: Optional[str] = None
+    ) -> Dict[str, str]:
+        """
+        Deriva de la imagen de DALL-E una versión por plataforma y sube cada una a Facebook.
+        
+        Con el almacén de imágenes activo también se sube, en paralelo, una copia
+        de alta calidad de la imagen maestra: de ella se derivan más adelante los
+        formatos de otras plataformas sin volver a generar la imagen.
         
         Args:
             dalle_url (str): URL temporal de DALL-E
+            platforms (List[str]): Plataformas de destino
+            prompt_hash (Optional[str]): Prompt que generó la imagen
+            
+        Returns:
+            Dict[str, str]: ID de la foto en Facebook de la versión de cada plataforma
+        """
+        image_bytes = self._download_image(dalle_url)
+        master_hash = content_hash(image_bytes)
+        if self.asset_store is None:
+            return self._derive_platform_images(master_hash, {}, platforms, master_bytes=image_bytes)
+        
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            master_future = executor.submit(self._upload_master_image, image_bytes, prompt_hash)
+            photo_ids = self._derive_platform_images(
+                master_hash, {}, platforms, master_bytes=image_bytes
+            )
+            try:
+                master_future.result()
+            except Exception as e:
+                # Las versiones ya están publicadas; solo se pierde la derivación futura
+                logger.warning(f"No se pudo guardar la imagen maestra: {e}")
+        finally:
+            executor.shutdown(wait=False)
+        return photo_ids
+    
+    def _upload_master_image(self, image_bytes: bytes, prompt_hash: Optional[str] = None):
+        """Sube la copia de la imagen maestra y la registra en el almacén bajo su hash"""
+        master = self.image_processor.prepare_master(image_bytes)
+        photo_id = self._upload_image_bytes_to_facebook(master["data"], master["content_type"])
+        self.asset_store.save(
+            content_hash(image_bytes),
+            {"master_photo_id": photo_id},
+            prompt_hash=prompt_hash,
+            size_bytes=len(image_bytes),
+        )
+    
+    def _derive_platform_images(
+        self,
+        master_hash: str,
+        refs: Dict,
+        platforms: List[str],
+        master_bytes: Optional[bytes] = None,
+        master_photo_id: Optional[str] = None,
+    ) -> Dict[str, str]:
+        """
+        Obtiene la versión de la imagen maestra de cada plataforma.
+        
+        Las versiones ya registradas bajo el hash de la maestra se reutilizan;
+        las que faltan se derivan (recorte y relleno), se suben a Facebook y se
+        registran bajo ese mismo hash. Las plataformas con el mismo formato
+        comparten una sola versión.
+        
+        Args:
+            master_hash (str): SHA-256 de la imagen maestra
+            refs (Dict): Referencias guardadas de la maestra (versiones ya subidas)
+            platforms (List[str]): Plataformas de destino
+            master_bytes (Optional[bytes]): Imagen maestra, si ya está en memoria
+            master_photo_id (Optional[str]): ID de la copia de la maestra, para descargarla
             
         Returns:
-            str: Ruta local del archivo descargado
+            Dict[str, str]: ID de la foto en Facebook de la versión de cada plataforma
         """
-        logger.info(f"📥 Descargando imagen DALL-E...")
+        stored = refs.get("variants", {})
+        photo_ids = {}
+        missing = []
+        for platform in platforms:
+            stored_variant = stored.get(variant_key(image_spec(platform)))
+            if stored_variant and stored_variant.get("facebook_photo_id"):
+                photo_ids[platform] = stored_variant["facebook_photo_id"]
+            else:
+                missing.append(platform)
+        if not missing:
+            return photo_ids
         
-        # Descargar la imagen de DALL-E
-        response = requests.get(dalle_url, timeout=30)
-        response.raise_for_status()
+        if master_bytes is None:
+            from src.config import PAGE_ACCESS_TOKEN
+            
+            master_bytes = self._download_image(facebook_photo_url(master_photo_id, PAGE_ACCESS_TOKEN))
         
-        # Crear directorio temporal si no existe
-        temp_dir = Path("temp_images")
-        temp_dir.mkdir(exist_ok=True)
+        uploaded = {}
+        new_variants = {}
+        for platform, variant in self.image_processor.prepare_for_platforms(master_bytes, missing).items():
+            if variant["sha256"] not in uploaded:
+                photo_id = self._upload_image_bytes_to_facebook(variant["data"], variant["content_type"])
+                uploaded[variant["sha256"]] = photo_id
+                logger.info(
+                    f"📐 Imagen para {platform} ({variant['fit']}): {variant['original_bytes']} → "
+                    f"{variant['bytes']} bytes ({variant['saved_bytes']} bytes ahorrados)"
+                )
+                if variant["processed"]:
+                    new_variants[variant["variant_key"]] = {
+                        "facebook_photo_id": photo_id,
+                        "sha256": variant["sha256"],
+                        "bytes": variant["bytes"],
+                    }
+                if self.asset_store is not None:
+                    self.asset_store.save(
+                        variant["sha256"],
+                        {"facebook_photo_id": photo_id},
+                        size_bytes=variant["bytes"],
+                    )
+            photo_ids[platform] = uploaded[variant["sha256"]]
         
-        # Generar nombre único para el archivo
-        import uuid
-        filename = f"dalle_image_{uuid.uuid4().hex[:8]}.png"
-        filepath = temp_dir / filename
+        if self.asset_store is not None and new_variants:
+            self.asset_store.save(master_hash, {"variants": new_variants}, size_bytes=len(master_bytes))
+        logger.info(
+            f"🖼️ {len(platforms) - len(missing)} plataformas con versión reutilizada, "
+            f"{len(missing)} derivadas de la imagen maestra"
+        )
+        return {platform: photo_ids[platform] for platform in platforms}
+    
+    def _upload_image_bytes_to_facebook(self, image_bytes: bytes, content_type: str) -> str:
+        """
+        Sube una imagen en memoria a Facebook API sin publicarla.
         
-        # Guardar la imagen localmente
-        with open(filepath, 'wb') as f:
-            f.write(response.content)
+        Returns:
+            str: ID de la foto subida
+        """
+        from src.config import PAGE_ID, PAGE_ACCESS_TOKEN
         
-        logger.info(f"✅ Imagen descargada: {filepath}")
-        return str(filepath.absolute())
+        extension = content_type.split("/")[-1].replace("jpeg", "jpg")
+        response = requests.post(
+            f"https://graph.facebook.com/v19.0/{PAGE_ID}/photos",
+            data={"access_token": PAGE_ACCESS_TOKEN, "published": "false"},
+            files={"file": (f"image.{extension}", image_bytes, content_type)},
+            timeout=self.image_relay.timeout,
+        )
+        result = response.json()
+        
+        if "id" not in result:
+            raise Exception(f"Error en API de Facebook: {result}")
+        return result["id"]
     
-    def _upload_image_to_facebook_api(self, image_path: str) -> str:
+    def _upload_image_to_facebook_api(self, image_url: str, prompt_hash: Optional[str] = None) -> str:
         """
-        Sube una imagen local a Facebook API y retorna la URL pública.
+        Reenvía una imagen a Facebook API y retorna el ID de la foto.
+        
+        La imagen se transmite directamente de la URL de origen a la subida
+        multipart a través de un búfer en memoria acotado, sin archivos temporales.
+        El ID de la foto se registra en el almacén de imágenes.
         
         Args:
-            image_path (str): Ruta local de la imagen
+            image_url (str): URL de la imagen de origen (por ejemplo, la URL temporal de DALL-E)
+            prompt_hash (Optional[str]): Prompt que generó la imagen, para reutilizarla
             
         Returns:
-            str: URL pública de la imagen subida
+            str: ID de la foto subida
         """
         from src.config import PAGE_ID, PAGE_ACCESS_TOKEN
         
-        logger.info(f"📤 Subiendo imagen a Facebook API...")
+        logger.info(f"📤 Reenviando imagen a Facebook API...")
         
-        try:
-            # Leer la imagen como bytes
-            with open(image_path, 'rb') as f:
-                image_data = f.read()
-            
-            # Subir imagen a Facebook
-            upload_url = f"https://graph.facebook.com/v19.0/{PAGE_ID}/photos"
-            
-            files = {
-                'file': ('image.png', image_data, 'image/png')
-            }
-            
-            data = {
-                'access_token': PAGE_ACCESS_TOKEN,
-                'published': 'false'  # No publicar, solo subir
-            }
-            
-            response = requests.post(upload_url, files=files, data=data)
-            result = response.json()
-            
-            if 'id' in result:
-                # Obtener URL de la imagen subida
-                photo_url = f"https://graph.facebook.com/v19.0/{result['id']}/picture?access_token={PAGE_ACCESS_TOKEN}"
-                logger.info(f"✅ Imagen subida exitosamente a Facebook")
-                return photo_url
-            else:
-                raise Exception(f"Error en API de Facebook: {result}")
-                
-        finally:
-            # Limpiar archivo temporal
-            try:
-                if os.path.exists(image_path):
-                    os.remove(image_path)
-                    logger.info(f"🗑️ Archivo temporal eliminado")
-            except Exception as e:
-                logger.warning(f"No se pudo eliminar archivo temporal: {e}")
+        upload_url = f"https://graph.facebook.com/v19.0/{PAGE_ID}/photos"
+        data = {
+            'access_token': PAGE_ACCESS_TOKEN,
+            'published': 'false'  # No publicar, solo subir
+        }
+        
+        response, relay_report = self.image_relay.relay(image_url, upload_url, fields=data)
+        result = response.json()
+        
+        if 'id' in result:
+            logger.info(
+                f"✅ Imagen subida exitosamente a Facebook "
+                f"({relay_report['bytes']} bytes en {relay_report['total_seconds']}s)"
+            )
+            if self.asset_store is not None and relay_report["sha256"]:
+                self.asset_store.save(
+                    relay_report["sha256"],
+                    {"facebook_photo_id": result["id"]},
+                    prompt_hash=prompt_hash,
+                    size_bytes=relay_report["bytes"],
+                )
+            return result["id"]
+        else:
+            raise Exception(f"Error en API de Facebook: {result}")
     
-    def _make_image_publicly_accessible(self, dalle_url: str) -> str:
+    def _make_image_publicly_accessible(self, dalle_url: str, prompt_hash: Optional[str] = None) -> str:
         """
-        Convierte una imagen de DALL-E en una URL pública descargándola y subiéndola.
+        Convierte una imagen de DALL-E en una URL pública reenviándola a Facebook.
         
         Args:
             dalle_url (str): URL temporal de DALL-E
+            prompt_hash (Optional[str]): Prompt que generó la imagen
             
         Returns:
-            str: URL pública accesible
+            str: ID de la foto en Facebook (ver _image_urls)
         """
-        # 1. Descargar imagen de DALL-E localmente
-        local_path = self._download_and_save_dalle_image(dalle_url)
+        photo_id = self._upload_image_to_facebook_api(dalle_url, prompt_hash=prompt_hash)
         
-        # 2. Subir imagen a Facebook API para obtener URL pública
-        public_url = self._upload_image_to_facebook_api(local_path)
-        
-        logger.info(f"✅ Imagen DALL-E convertida a URL pública: {public_url}")
-        return public_url
+        logger.info(f"✅ Imagen DALL-E convertida en la foto de Facebook {photo_id}")
+        return photo_id
     
-    def _publish_to_platform(self, platform: str, content: Dict, image_url: Optional[str]) -> Dict:
+    def _publish_to_platform(
+        self,
+        platform: str,
+        content: Dict,
+        image_url: Optional[str],
+        checkpoints: Optional[RunCheckpoints] = None
+    ) -> Dict:
         """
         Publica en una plataforma específica usando llamadas HTTP directas.
         """
@@ -390,6 +940,7 @@ Ejemplos de análisis:
                 else:
                     logger.info("Publicando texto en Facebook")
                     result = facebook_post_text(text)
+                ensure_published("facebook", result)
                 
                 return {
                     "status": "published",
@@ -402,7 +953,7 @@ Ejemplos de análisis:
                 if not image_url:
                     raise ValueError("Instagram requiere una imagen")
                 
-                result = self._direct_instagram_publish(image_url, text)
+                result = self._direct_instagram_publish(image_url, text, checkpoints)
                 
                 return {
                     "status": "published",
@@ -418,6 +969,7 @@ Ejemplos de análisis:
                 else:
                     logger.info("Publicando texto en LinkedIn")
                     result = linkedin_post_text(text)
+                ensure_published("linkedin", result)
                 
                 return {
                     "status": "published",
@@ -433,31 +985,45 @@ Ejemplos de análisis:
             logger.error(f"Error publicando en {platform}: {e}")
             raise
     
-    def _direct_instagram_publish(self, image_url: str, caption: str) -> Dict:
+    def _direct_instagram_publish(
+        self, image_url: str, caption: str, checkpoints: Optional[RunCheckpoints] = None
+    ) -> Dict:
         """
         Publica directamente en Instagram usando llamadas HTTP para evitar problemas de contexto.
+        
+        El contenedor creado se guarda en los puntos de control de la ejecución:
+        si media_publish falla, el reintento publica el mismo contenedor sin
+        volver a crearlo.
         """
         try:
             from src.config import IG_USER_ID, PAGE_ACCESS_TOKEN
             
             logger.info(f"Publicación directa Instagram - ID: {IG_USER_ID}, Token: {PAGE_ACCESS_TOKEN[:20]}...")
             
-            # 1. Crear contenedor de media
-            create_url = f"https://graph.facebook.com/v19.0/{IG_USER_ID}/media"
-            create_params = {
-                "image_url": image_url,
-                "caption": caption,
-                "access_token": PAGE_ACCESS_TOKEN
-            }
-            
-            logger.info(f"Creando media con params: {create_params}")
-            create_response = requests.post(create_url, params=create_params)
-            create_result = create_response.json()
-            
-            logger.info(f"Resultado creación: {create_result}")
-            
-            if "id" not in create_result:
-                raise Exception(f"Error creando media: {create_result}")
+            # 1. Crear contenedor de media (o reutilizar el de un intento anterior)
+            # El checkpoint guarda la URL sin el token de acceso
+            creation = {"image_url": strip_access_token(image_url), "caption": caption}
+            saved = checkpoints.outputs.get(INSTAGRAM_CREATION_STAGE) if checkpoints is not None else None
+            if saved and all(saved.get(key) == value for key, value in creation.items()):
+                create_result = checkpoints.reuse(INSTAGRAM_CREATION_STAGE)["response"]
+            else:
+                create_url = f"https://graph.facebook.com/v19.0/{IG_USER_ID}/media"
+                create_params = {
+                    "image_url": image_url,
+                    "caption": caption,
+                    "access_token": PAGE_ACCESS_TOKEN
+                }
+                
+                logger.info(f"Creando media con params: {create_params}")
+                create_response = requests.post(create_url, params=create_params)
+                create_result = create_response.json()
+                
+                logger.info(f"Resultado creación: {create_result}")
+                
+                if "id" not in create_result:
+                    raise Exception(f"Error creando media: {create_result}")
+                if checkpoints is not None:
+                    checkpoints.save(INSTAGRAM_CREATION_STAGE, {**creation, "response": create_result})
             
             creation_id = create_result["id"]
             
@@ -474,6 +1040,9 @@ Ejemplos de análisis:
             
             logger.info(f"Resultado publicación: {publish_result}")
             
+            if "id" not in publish_result:
+                raise Exception(f"Error publicando media {creation_id}: {publish_result}")
+            
             return {
                 "creation_id": creation_id,
                 "creation_response": create_result,
@@ -485,6 +1054,6 @@ Ejemplos de análisis:
             raise Exception(f"Error en publicación directa Instagram: {str(e)}")
 
 
-def create_intelligent_publisher(openai_api_key: str) -> IntelligentPublisher:
+def create_intelligent_publisher(openai_api_key: str, one_shot: Optional[bool] = None) -> IntelligentPublisher:
     """Factory function para crear un IntelligentPublisher"""
-    return IntelligentPublisher(openai_api_key)
\ No newline at end of file
+    return IntelligentPublisher(openai_api_key, one_shot=one_shot)
\ No newline at end of file
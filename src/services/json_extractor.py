@@ -0,0 +1,359 @@
+"""
+Extractor incremental de JSON para respuestas de LLM.
+
+Recibe la respuesta completa o por fragmentos (streaming), localiza el primer
+objeto JSON balanceado ignorando texto y bloques markdown alrededor, corrige
+errores habituales de los modelos (comas finales, comillas tipográficas,
+saltos de línea literales dentro de cadenas, cadenas sin cerrar al agotar
+max_tokens) y permite consultar los campos parciales antes de que termine la
+respuesta.
+"""
+
+import json
+import re
+from typing import Dict, List, Optional
+
+# Comillas tipográficas que los modelos usan a veces como delimitadores
+SMART_QUOTE_OPEN = "“"
+SMART_QUOTE_CLOSE = "”"
+
+WHITESPACE = " \t\r\n"
+
+# Caracteres con los que puede empezar el siguiente elemento de un arreglo
+ARRAY_VALUE_START = '"{[]-0123456789tfn' + SMART_QUOTE_OPEN + SMART_QUOTE_CLOSE
+
+# Prefijo más largo de un número JSON completo
+NUMBER_PREFIX = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?")
+
+
+class JSONExtractionError(json.JSONDecodeError):
+    """No se pudo extraer un objeto JSON válido de la respuesta"""
+
+    def __init__(self, message: str, document: str = "", position: int = 0):
+        super().__init__(message, document, position)
+
+
+class IncrementalJSONExtractor:
+    """Localiza y repara el primer objeto JSON de un texto recibido por fragmentos"""
+
+    def __init__(self):
+        self._output: List[str] = []  # Objeto normalizado hasta el momento
+        self._raw_length = 0
+        self._started = False
+        self._complete = False
+
+        # Pila de contenedores: cada elemento es {"type": "{" o "[", "state", "member_start"}
+        self._stack: List[Dict] = []
+        self._in_string = False
+        self._string_close = '"'
+        self._string_role = "value"
+        self._escape = False
+        self._in_literal = False
+        self._literal_start = 0
+
+        # Una comilla de cierre solo se confirma si la sigue un delimitador JSON;
+        # si el delimitador es una coma, además debe seguirle el siguiente miembro
+        self._pending_close = False
+        self._pending_quote = '"'
+        self._pending_whitespace: List[str] = []
+        self._pending_comma = False
+        self._pending_tail: List[str] = []
+
+    @property
+    def is_complete(self) -> bool:
+        """Indica si ya se cerró el primer objeto JSON"""
+        return self._complete
+
+    @property
+    def started(self) -> bool:
+        """Indica si ya se encontró la llave de apertura del objeto"""
+        return self._started
+
+    def feed(self, chunk: str) -> Dict:
+        """
+        Procesa un nuevo fragmento de la respuesta.
+
+        Args:
+            chunk (str): Fragmento de texto recibido del modelo
+
+        Returns:
+            Dict: Campos parciales disponibles hasta el momento
+        """
+        for char in chunk:
+            if self._complete:
+                break
+            self._raw_length += 1
+            self._consume(char)
+        return self.partial()
+
+    def _consume(self, char: str):
+        """Avanza la máquina de estados con un carácter"""
+        if not self._started:
+            if char == "{":
+                self._started = True
+                self._open_container("{")
+            return
+
+        if self._pending_comma:
+            if char in WHITESPACE:
+                self._pending_tail.append(char)
+                return
+            self._pending_comma = False
+            if self._starts_next_member(char):
+                self._pending_close = False
+                self._finish_string()
+                self._output.extend(self._pending_whitespace)
+                self._pending_whitespace = []
+                tail, self._pending_tail = self._pending_tail, []
+                for pending_char in tail + [char]:
+                    self._consume(pending_char)
+            else:
+                # La comilla y la coma eran parte del contenido
+                self._reject_pending_close()
+                for pending_char in self._pending_tail:
+                    self._append_string_char(pending_char)
+                self._pending_tail = []
+                self._consume_string_char(char)
+            return
+
+        if self._pending_close:
+            if char in WHITESPACE:
+                self._pending_whitespace.append(char)
+                return
+            if char == "," and self._string_role == "value":
+                # Solo cierra si después de la coma empieza otro miembro
+                self._pending_comma = True
+                self._pending_tail = [char]
+                return
+            self._pending_close = False
+            if char in (",}]:" if self._string_role == "key" else "}]"):
+                self._finish_string()
+                self._output.extend(self._pending_whitespace)
+                self._pending_whitespace = []
+            else:
+                # La comilla era parte del contenido: se escapa y la cadena continúa
+                self._reject_pending_close()
+                self._consume_string_char(char)
+                return
+
+        if self._in_string:
+            self._consume_string_char(char)
+            return
+
+        if self._in_literal and (char in ",}]:" or char in WHITESPACE):
+            self._in_literal = False
+            self._value_finished()
+
+        if char in WHITESPACE:
+            self._output.append(char)
+        elif char in ('"', SMART_QUOTE_OPEN, SMART_QUOTE_CLOSE):
+            self._start_string(char)
+        elif char in "{[":
+            self._open_container(char)
+        elif char in "}]":
+            self._close_container(char)
+        elif char == ",":
+            self._output.append(char)
+            top = self._stack[-1]
+            top["state"] = "key" if top["type"] == "{" else "value"
+            top["member_start"] = len(self._output)
+        elif char == ":":
+            self._output.append(char)
+            self._stack[-1]["state"] = "value"
+        else:
+            # Números y literales true/false/null
+            if not self._in_literal:
+                self._literal_start = len(self._output)
+            self._in_literal = True
+            self._output.append(char)
+
+    def _starts_next_member(self, char: str) -> bool:
+        """Indica si char puede iniciar el miembro que sigue a una coma"""
+        if self._stack[-1]["type"] == "{":
+            return char in ('"', SMART_QUOTE_OPEN, SMART_QUOTE_CLOSE, "}")
+        return char in ARRAY_VALUE_START
+
+    def _reject_pending_close(self):
+        """La comilla pendiente era contenido: se escapa y la cadena continúa"""
+        self._pending_close = False
+        self._output.append('\\"' if self._pending_quote == '"' else self._pending_quote)
+        for pending_char in self._pending_whitespace:
+            self._append_string_char(pending_char)
+        self._pending_whitespace = []
+
+    def _consume_string_char(self, char: str):
+        """Procesa un carácter dentro de una cadena"""
+        if self._escape:
+            self._escape = False
+            self._output.append(char)
+            return
+
+        if char == "\\":
+            self._escape = True
+            self._output.append(char)
+            return
+
+        # Una cadena abierta con comilla tipográfica también puede cerrarse con una recta
+        if char == self._string_close or (self._string_close == SMART_QUOTE_CLOSE and char == '"'):
+            self._pending_close = True
+            self._pending_quote = char
+            return
+
+        self._append_string_char(char)
+
+    def _append_string_char(self, char: str):
+        """Agrega un carácter de contenido escapando los caracteres de control"""
+        if char == "\n":
+            self._output.append("\\n")
+        elif char == "\r":
+            self._output.append("\\r")
+        elif char == "\t":
+            self._output.append("\\t")
+        else:
+            self._output.append(char)
+
+    def _finish_string(self):
+        self._in_string = False
+        self._output.append('"')
+        if self._string_role == "key":
+            self._stack[-1]["state"] = "colon"
+        else:
+            self._value_finished()
+
+    def _start_string(self, char: str):
+        top = self._stack[-1]
+        self._in_string = True
+        self._escape = False
+        self._string_close = SMART_QUOTE_CLOSE if char != '"' else '"'
+        self._string_role = "key" if top["type"] == "{" and top["state"] == "key" else "value"
+        self._output.append('"')
+
+    def _open_container(self, char: str):
+        if self._stack:
+            self._stack[-1]["state"] = "in_child"
+        self._output.append(char)
+        self._stack.append(
+            {
+                "type": char,
+                "state": "key" if char == "{" else "value",
+                "member_start": len(self._output),
+            }
+        )
+
+    def _close_container(self, char: str):
+        # Eliminar coma final antes del cierre
+        self._strip_trailing(",")
+        self._output.append("}" if self._stack[-1]["type"] == "{" else "]")
+        self._stack.pop()
+        if not self._stack:
+            self._complete = True
+        else:
+            self._value_finished()
+
+    def _value_finished(self):
+        if self._stack:
+            self._stack[-1]["state"] = "comma"
+
+    def _strip_trailing(self, token: str):
+        """Elimina un token final (ignorando espacios) del objeto normalizado"""
+        index = len(self._output) - 1
+        while index >= 0 and self._output[index] in WHITESPACE:
+            index -= 1
+        if index >= 0 and self._output[index] == token:
+            del self._output[index:]
+
+    def _repaired_text(self) -> str:
+        """Cierra cadenas y contenedores abiertos para obtener un JSON válido"""
+        output = list(self._output)
+        stack = [dict(level) for level in self._stack]
+
+        if (self._pending_close or self._pending_comma) and self._string_role == "value":
+            output.append('"')
+            stack[-1]["state"] = "comma"
+        elif self._in_string:
+            if self._string_role == "key":
+                del output[stack[-1]["member_start"]:]
+            else:
+                text = "".join(output)
+                # Descartar secuencias de escape incompletas al final
+                backslash = text.rfind("\\")
+                if backslash != -1 and backslash >= len(text) - 6:
+                    escape = text[backslash:]
+                    complete_unicode = escape.startswith("\\u") and len(escape) == 6
+                    if len(escape) == 1 or (escape[1] == "u" and not complete_unicode):
+                        text = text[:backslash]
+                output = list(text) + ['"']
+                stack[-1]["state"] = "comma"
+        elif self._in_literal and NUMBER_PREFIX.match("".join(output[self._literal_start:])):
+            # Número incompleto: se conserva la parte ya leída que forma un número válido
+            number = NUMBER_PREFIX.match("".join(output[self._literal_start:])).group()
+            output = output[:self._literal_start] + [number]
+        elif self._in_literal or (stack and stack[-1]["state"] in ("colon", "value")):
+            # Miembro incompleto: se descarta hasta su inicio
+            if stack and (stack[-1]["type"] == "{" or self._in_literal):
+                del output[stack[-1]["member_start"]:]
+
+        text = "".join(output).rstrip()
+        while text.endswith(",") or text.endswith(":"):
+            text = text[:-1].rstrip()
+
+        closers = "".join("}" if level["type"] == "{" else "]" for level in reversed(stack))
+        return text + closers
+
+    def partial(self) -> Dict:
+        """
+        Devuelve los campos disponibles hasta el momento.
+
+        Las cadenas sin terminar se incluyen truncadas; los miembros sin valor
+        se omiten.
+        """
+        if not self._started:
+            return {}
+        try:
+            parsed = json.loads(self._repaired_text(), strict=False)
+        except json.JSONDecodeError:
+            return {}
+        return parsed if isinstance(parsed, dict) else {}
+
+    def result(self) -> Dict:
+        """
+        Devuelve el objeto final, reparándolo si la respuesta quedó truncada.
+
+        Raises:
+            JSONExtractionError: Si no se encontró ningún objeto o no se pudo reparar
+        """
+        if not self._started:
+            raise JSONExtractionError("No se encontró ningún objeto JSON en la respuesta")
+
+        text = "".join(self._output) if self._complete else self._repaired_text()
+        try:
+            parsed = json.loads(text, strict=False)
+        except json.JSONDecodeError as e:
+            raise JSONExtractionError(f"JSON inválido tras la reparación: {e.msg}", text, e.pos)
+
+        if not isinstance(parsed, dict):
+            raise JSONExtractionError("La respuesta no contiene un objeto JSON", text)
+        return parsed
+
+    @property
+    def was_truncated(self) -> bool:
+        """Indica si el objeto tuvo que cerrarse artificialmente"""
+        return self._started and not self._complete
+
+
+def extract_json(text: Optional[str]) -> Dict:
+    """
+    Extrae y repara el primer objeto JSON de una respuesta completa.
+
+    Args:
+        text (Optional[str]): Respuesta del modelo
+
+    Returns:
+        Dict: Objeto JSON extraído
+
+    Raises:
+        JSONExtractionError: Si no se pudo obtener un objeto válido
+    """
+    extractor = IncrementalJSONExtractor()
+    extractor.feed(text or "")
+    return extractor.result()
@@ -5,6 +5,7 @@ import tempfile
 from urllib.parse import quote
 from typing import Optional, Dict, Any
 from src.config import LINKEDIN_ACCESS_TOKEN, LINKEDIN_PERSONAL_ID, LINKEDIN_ORG_ID
+from src.services.asset_store import content_hash, get_default_asset_store, perceptual_hash
 
 
 class LinkedInService:
@@ -13,6 +14,11 @@ class LinkedInService:
         self.personal_id = LINKEDIN_PERSONAL_ID
         self.org_id = LINKEDIN_ORG_ID
         self.base_url = "https://api.linkedin.com/v2"
+    
+    @property
+    def asset_store(self):
+        """Almacén de imágenes compartido (se crea al usarse por primera vez)"""
+        return get_default_asset_store()
         
     def get_headers(self) -> Dict[str, str]:
         """Obtiene los headers para las peticiones a LinkedIn API"""
@@ -22,14 +28,61 @@ class LinkedInService:
             "X-Restli-Protocol-Version": "2.0.0"
         }
     
+    def _find_uploaded_asset(self, person_id: str, *lookups) -> Optional[str]:
+        """Busca en el almacén de imágenes un asset ya subido por esta persona"""
+        if self.asset_store is None:
+            return None
+        for lookup in lookups:
+            asset = lookup()
+            urn = asset and asset["refs"].get("linkedin_asset_urns", {}).get(person_id)
+            if urn:
+                return urn
+        return None
+    
     def upload_image(self, image_url: str, person_id: str) -> Optional[str]:
         """
-        Sube una imagen a LinkedIn y retorna el asset ID
+        Sube una imagen a LinkedIn y retorna el asset ID.
+        
+        Si la misma imagen (por URL, bytes o hash perceptual) ya se subió antes,
+        reutiliza su asset sin registrar ni subir de nuevo.
         """
         try:
             print(f"[LINKEDIN] Iniciando subida de imagen: {image_url}")
             
-            # Paso 1: Registrar el upload
+            cached_asset = self._find_uploaded_asset(
+                person_id, lambda: self.asset_store.find_by_url(image_url)
+            )
+            if cached_asset:
+                print(f"[LINKEDIN] Imagen ya subida, reutilizando asset: {cached_asset}")
+                return cached_asset
+            
+            # Paso 1: Descargar la imagen
+            print(f"[LINKEDIN] Descargando imagen desde: {image_url}")
+            image_response = requests.get(image_url)
+            if image_response.status_code != 200:
+                print(f"[LINKEDIN] Error descargando imagen: {image_response.status_code}")
+                return None
+            
+            image_bytes = image_response.content
+            image_sha256 = content_hash(image_bytes)
+            image_phash = perceptual_hash(image_bytes)
+            
+            cached_asset = self._find_uploaded_asset(
+                person_id,
+                lambda: self.asset_store.find_by_content(image_sha256),
+                lambda: self.asset_store.find_similar(image_phash),
+            )
+            if cached_asset:
+                print(f"[LINKEDIN] Mismos bytes ya subidos, reutilizando asset: {cached_asset}")
+                self.asset_store.save(
+                    image_sha256,
+                    {"linkedin_asset_urns": {person_id: cached_asset}},
+                    phash=image_phash,
+                    urls=[image_url],
+                )
+                return cached_asset
+            
+            # Paso 2: Registrar el upload
             register_url = f"{self.base_url}/assets?action=registerUpload"
             register_data = {
                 "registerUploadRequest": {
@@ -63,13 +116,6 @@ class LinkedInService:
             upload_url = upload_mechanism["com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest"]["uploadUrl"]
             asset = register_response["value"]["asset"]
             
-            # Paso 2: Descargar la imagen
-            print(f"[LINKEDIN] Descargando imagen desde: {image_url}")
-            image_response = requests.get(image_url)
-            if image_response.status_code != 200:
-                print(f"[LINKEDIN] Error descargando imagen: {image_response.status_code}")
-                return None
-                
             # Paso 3: Subir la imagen binaria
             print(f"[LINKEDIN] Subiendo imagen a LinkedIn...")
             upload_headers = {
@@ -80,7 +126,7 @@ class LinkedInService:
             upload_response = requests.post(
                 upload_url,
                 headers=upload_headers,
-                data=image_response.content
+                data=image_bytes
             )
             
             if upload_response.status_code not in [200, 201]:
@@ -89,6 +135,14 @@ class LinkedInService:
                 return None
                 
             print(f"[LINKEDIN] Imagen subida exitosamente")
+            if self.asset_store is not None:
+                self.asset_store.save(
+                    image_sha256,
+                    {"linkedin_asset_urns": {person_id: asset}},
+                    phash=image_phash,
+                    size_bytes=len(image_bytes),
+                    urls=[image_url],
+                )
             return asset
             
         except Exception as e:
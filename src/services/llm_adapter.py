@@ -1,10 +1,11 @@
-import openai
+import asyncio
 import json
 import logging
-import re
 import os
 import sys
-from typing import Dict, List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, List, Optional
 
 # Cargar variables de entorno desde .env
 try:
@@ -14,6 +15,39 @@ try:
 except ImportError:
     pass
 
+# Permitir la ejecución directa del módulo (python src/services/llm_adapter.py)
+if __package__ in (None, ""):
+    sys.path.insert(
+        0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    )
+
+from src.services.content_fitter import fit_content
+from src.services.hedging import create_default_hedger
+from src.services.json_extractor import IncrementalJSONExtractor, extract_json
+from src.services.llm_backend import (
+    DEFAULT_CHAT_MODEL,
+    LLMBackend,
+    aclose_loop_clients,
+    create_backend,
+)
+from src.services.material_digest import (
+    DIGEST_MAX_TOKENS,
+    DIGEST_VERSION,
+    DigestStats,
+    build_digest_messages,
+    build_reduce_messages,
+    merge_digests,
+    parse_digest,
+    render_digest,
+    split_into_chunks,
+)
+from src.services.model_tiers import TierStats
+from src.services.prompt_registry import PROMPT_TEMPLATE_VERSION, PromptRegistry
+from src.services.response_cache import ResponseCache, get_default_cache
+from src.services.single_flight import SingleFlight
+from src.services.token_budget import TokenBudgeter
+from src.services.token_estimator import estimate_tokens
+
 # Configuración de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -40,157 +74,613 @@ class LLMAdapter:
         "whatsapp": 0.6,
     }
 
-    def __init__(self, api_key: str):
+    # Modelo de cada nivel; "standard" es el modelo configurado en el backend
+    MODEL_TIERS = {
+        "fast": os.getenv("LLM_MODEL_FAST", "gpt-4o-mini"),
+        "standard": DEFAULT_CHAT_MODEL,
+        "quality": os.getenv("LLM_MODEL_QUALITY", "gpt-4o"),
+    }
+    MODEL_TIER_ORDER = ("fast", "standard", "quality")
+
+    # Nivel por red social: (material corto, material largo)
+    MODEL_ROUTING = {
+        "facebook": ("fast", "standard"),
+        "instagram": ("fast", "standard"),
+        "linkedin": ("standard", "quality"),
+        "tiktok": ("fast", "standard"),
+        "whatsapp": ("fast", "fast"),
+    }
+
+    # Caracteres de material a partir de los cuales se usa el nivel de material largo
+    LONG_MATERIAL_CHARS = int(os.getenv("LLM_LONG_MATERIAL_CHARS", "1500"))
+
+    # Preferencias: "latency" baja un nivel y "quality" sube uno
+    MODEL_PREFERENCES = ("latency", "balanced", "quality")
+    DEFAULT_MODEL_PREFERENCE = os.getenv("LLM_MODEL_PREFERENCE", "balanced")
+
+    # Resumen compartido del material largo antes de transformarlo por plataforma
+    DIGEST_ENABLED = os.getenv("LLM_DIGEST_ENABLED", "true").lower() in ("1", "true", "yes")
+    DIGEST_MIN_CHARS = int(os.getenv("LLM_DIGEST_MIN_CHARS", "3000"))
+
+    # Tokens máximos por fragmento al resumir documentos largos por partes
+    CHUNK_MAX_TOKENS = int(os.getenv("LLM_CHUNK_MAX_TOKENS", "3000"))
+
+    # Máximo de transformaciones simultáneas contra la API
+    DEFAULT_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "5"))
+
+    # Modos de generación: una llamada por plataforma o una sola llamada combinada
+    GENERATION_MODES = ("per_platform", "combined")
+    DEFAULT_GENERATION_MODE = os.getenv("LLM_GENERATION_MODE", "per_platform")
+
+    # Tokens de salida máximos para la llamada combinada
+    COMBINED_MAX_TOKENS = 4000
+
+    # Versión de las plantillas de prompt; cambiarla invalida la caché de respuestas
+    PROMPT_TEMPLATE_VERSION = PROMPT_TEMPLATE_VERSION
+
+    def __init__(
+        self,
+        api_key: str,
+        max_concurrency: Optional[int] = None,
+        generation_mode: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        backend: Optional[LLMBackend] = None,
+        preference: Optional[str] = None,
+    ):
         """Inicializa el transformador de contenido"""
-        self.ai_client = openai.OpenAI(api_key=api_key)
+        self.api_key = api_key
+        self.backend = backend or create_backend(api_key)
+        self.model = self.backend.chat_model
+        self.model_tiers = {**self.MODEL_TIERS, "standard": self.model}
+        self.preference = self._resolve_preference(preference)
+        self.cache = cache if cache is not None else get_default_cache()
+        self.max_concurrency = max(1, max_concurrency or self.DEFAULT_MAX_CONCURRENCY)
+        self.generation_mode = self._resolve_generation_mode(generation_mode)
         logger.info("LLMAdapter inicializado correctamente")
 
-    def get_platform_instructions(self, platform: str) -> str:
-        """Obtiene las instrucciones específicas para cada plataforma social"""
-        platform_guides = {
-            "facebook": """
-Eres un especialista en marketing digital para Facebook. Transforma el contenido para maximizar engagement con estas directrices:
-- Estilo: Conversacional y cercano, manteniendo credibilidad
-- Extensión: Óptimo 500 caracteres para mejor alcance
-- Emojis: Moderado uso (1-3 por publicación)
-- Etiquetas: Máximo 5, relevantes y con alto engagement
-- Objetivo: Impulsar interacción y comentarios
-- Estructura: Texto fluido con saltos naturales de línea
-""",
-            "instagram": """
-Eres un creador de contenido especializado en Instagram. Optimiza el material para máximo impacto visual con estas pautas:
-- Estilo: Inspirador, visual y contemporáneo
-- Extensión: Máximo 2200 caracteres
-- Emojis: Uso abundante para enriquecer visualmente
-- Etiquetas: Entre 5-10, combinando populares y específicas
-- Objetivo: Contar historias visuales y generar engagement
-- Estructura: Párrafos cortos, optimizados para móviles
-- Visual: Incluir suggested_image_prompt con descripción detallada para contenido gráfico atractivo
-- Elementos: Estética, paleta de colores, composición que capture atención
-""",
-            "linkedin": """
-Eres un consultor en comunicación empresarial para LinkedIn. Desarrolla contenido que genere valor profesional con estas especificaciones:
-- Estilo: Profesional, informativo y con insights valiosos
-- Extensión: Máximo 3000 caracteres
-- Emojis: Uso mínimo, únicamente para énfasis estratégico
-- Etiquetas: Máximo 3-5, enfocadas en sector profesional
-- Objetivo: Compartir conocimiento, networking, valor corporativo
-- Estructura: Organización clara con viñetas cuando sea necesario
-""",
-            "tiktok": """
-Eres un creador de contenido viral especializado en TikTok. Transforma el material para máximo potencial viral con estas características:
-- Estilo: Dinámico, entretenido y siguiendo tendencias
-- Extensión: Máximo 4000 caracteres
-- Emojis: Uso expresivo y abundante
-- Etiquetas: Entre 3-8, incluyendo tendencias y challenges actuales
-- Objetivo: Entretenimiento, viralidad, seguir trends
-- Estructura: Ritmo acelerado, llamadas a la acción directas
-- Audiovisual: Incluir suggested_video_prompt con descripción detallada para contenido viral
-- Elementos: Transiciones, efectos, música trending, ganchos visuales
-""",
-            "whatsapp": """
-Eres un comunicador especializado en mensajería directa para WhatsApp. Adapta el contenido para comunicación personal efectiva con estas pautas:
-- Estilo: Personal, directo y como conversación natural
-- Extensión: Máximo 4000 caracteres, preferiblemente conciso
-- Emojis: Uso natural como en conversaciones reales
-- Etiquetas: Evitar o usar muy pocas (1-2 máximo)
-- Objetivo: Comunicación directa, información práctica
-- Estructura: Como mensaje personal, fácil de compartir
-""",
-        }
-        return platform_guides.get(platform, platform_guides["facebook"])
-
-    def build_transformation_request(self, heading: str, material: str, platform: str) -> str:
-        """Construye la solicitud específica para la transformación del contenido"""
-        # Crear estructura JSON base
-        response_format = {
-            "text": "contenido transformado aquí",
-            "hashtags": ["#etiqueta1", "#etiqueta2"],
-            "character_count": "número_de_caracteres",
-            "tone": "descripción_del_estilo",
-        }
+    async def acreate_completion(self, operation: str, tier: str = "standard", **request_params):
+        """
+        Solicita una respuesta completa al modelo, con solicitud duplicada si se retrasa.
+
+        Args:
+            operation (str): Nombre de la operación para las métricas de latencia
+            tier (str): Nivel de modelo elegido, para las métricas por nivel
+            **request_params: Parámetros de chat.completions.create
+
+        Returns:
+            Respuesta de chat.completions.create
+        """
+        request_params.setdefault("model", self.model_tiers[tier])
+        started = time.monotonic()
+        ai_response = await HEDGER.run(
+            operation,
+            lambda: self.backend.achat_completion(**request_params),
+        )
+        self._record_tier_usage(tier, request_params["model"], time.monotonic() - started, ai_response)
+        return ai_response
+
+    def _should_digest(self, material: str, use_digest: Optional[bool]) -> bool:
+        """Indica si el material debe resumirse antes de transformarlo.
+
+        El material que excede CHUNK_MAX_TOKENS se resume siempre salvo que
+        use_digest sea False, porque completo no cabe en cada prompt.
+        """
+        if use_digest is False:
+            return False
+        if estimate_tokens(material) > self.CHUNK_MAX_TOKENS:
+            return True
+        enabled = self.DIGEST_ENABLED if use_digest is None else use_digest
+        return enabled and len(material) >= self.DIGEST_MIN_CHARS
+
+    def _digest_key(self, kind: str, heading: str, material: str) -> str:
+        return ResponseCache.build_key(
+            kind=kind,
+            heading=heading,
+            material=material,
+            model=self.model_tiers["fast"],
+            digest_version=DIGEST_VERSION,
+        )
+
+    async def aget_material_digest(
+        self,
+        heading: str,
+        material: str,
+        progress_callback: Optional[Callable[[Dict], None]] = None,
+    ) -> Optional[str]:
+        """
+        Obtiene el resumen estructurado del material, generándolo una sola vez.
+
+        El resumen se guarda en caché por el hash del contenido y se comparte
+        entre solicitudes concurrentes. Si el material excede CHUNK_MAX_TOKENS
+        se resume por fragmentos en paralelo y los resúmenes parciales se
+        combinan en uno.
+
+        Args:
+            heading (str): Encabezado del contenido
+            material (str): Material original
+            progress_callback (Optional[Callable[[Dict], None]]): Recibe un evento
+                {"event": "digest_chunk", "index", "completed", "total", "cached"}
+                por cada fragmento resumido
+
+        Returns:
+            Optional[str]: Resumen listo para usarse como MATERIAL, o None si falló
+        """
+        key = self._digest_key("material_digest", heading, material)
+        digest = self.cache.get(key) if self.cache is not None else None
+        if digest is not None:
+            rendered = render_digest(digest)
+            DIGEST_STATS.record("reused", len(material), len(rendered))
+            logger.info("Resumen del material obtenido de caché")
+            return rendered
+
+        try:
+            digest = await SINGLE_FLIGHT.ado(
+                key,
+                lambda: self._agenerate_material_digest(heading, material, key, progress_callback),
+            )
+        except Exception as e:
+            DIGEST_STATS.record("failed")
+            logger.warning(f"No se pudo resumir el material, se usará completo: {e}")
+            return None
+        return render_digest(digest)
+
+    async def _agenerate_material_digest(
+        self,
+        heading: str,
+        material: str,
+        key: str,
+        progress_callback: Optional[Callable[[Dict], None]] = None,
+    ) -> Dict:
+        """Llama al LLM para resumir el material y guarda el resumen en caché"""
+        chunks = split_into_chunks(material, self.CHUNK_MAX_TOKENS)
+        if len(chunks) <= 1:
+            logger.info(f"Resumiendo material de {len(material)} caracteres")
+            digest = await self._asummarize("digest", build_digest_messages(heading, material))
+        else:
+            logger.info(
+                f"Resumiendo material de {len(material)} caracteres en {len(chunks)} fragmentos"
+            )
+            partial_digests = await self._adigest_chunks(heading, chunks, progress_callback)
+            digest = await self._areduce_digests(heading, partial_digests)
+
+        if self.cache is not None:
+            self.cache.set(key, digest)
+        DIGEST_STATS.record("generated", len(material), len(render_digest(digest)))
+        return digest
+
+    async def _asummarize(self, operation: str, messages: List[Dict]) -> Dict:
+        """Solicita un resumen al nivel rápido y lo normaliza"""
+        ai_response = await self.acreate_completion(
+            operation,
+            "fast",
+            messages=messages,
+            temperature=0.2,
+            max_tokens=DIGEST_MAX_TOKENS,
+        )
+        return parse_digest(ai_response.choices[0].message.content)
+
+    async def _adigest_chunks(
+        self,
+        heading: str,
+        chunks: List[str],
+        progress_callback: Optional[Callable[[Dict], None]] = None,
+    ) -> List[Dict]:
+        """Resume cada fragmento en paralelo reutilizando los que ya están en caché"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        completed = 0
+
+        async def generate_chunk(chunk: str, key: str) -> Dict:
+            async with semaphore:
+                digest = await self._asummarize("digest_chunk", build_digest_messages(heading, chunk))
+            if self.cache is not None:
+                self.cache.set(key, digest)
+            return digest
+
+        async def digest_chunk(index: int, chunk: str) -> Dict:
+            nonlocal completed
+            key = self._digest_key("material_digest_chunk", heading, chunk)
+            digest = self.cache.get(key) if self.cache is not None else None
+            cached = digest is not None
+            if not cached:
+                digest = await SINGLE_FLIGHT.ado(key, lambda: generate_chunk(chunk, key))
+            DIGEST_STATS.record("chunks_reused" if cached else "chunks_generated")
+
+            completed += 1
+            if progress_callback is not None:
+                progress_callback(
+                    {
+                        "event": "digest_chunk",
+                        "index": index,
+                        "completed": completed,
+                        "total": len(chunks),
+                        "cached": cached,
+                    }
+                )
+            return digest
+
+        return await asyncio.gather(
+            *(digest_chunk(index, chunk) for index, chunk in enumerate(chunks))
+        )
+
+    async def _areduce_digests(self, heading: str, digests: List[Dict]) -> Dict:
+        """
+        Combina los resúmenes parciales en uno.
+
+        Agrupa los resúmenes en lotes que caben en CHUNK_MAX_TOKENS y los
+        combina por niveles hasta obtener uno solo.
+        """
+        while len(digests) > 1:
+            groups, current, current_tokens = [], [], 0
+            for digest in digests:
+                tokens = estimate_tokens(render_digest(digest))
+                if current and current_tokens + tokens > self.CHUNK_MAX_TOKENS:
+                    groups.append(current)
+                    current, current_tokens = [], 0
+                current.append(digest)
+                current_tokens += tokens
+            groups.append(current)
+
+            if len(groups) == len(digests):
+                # Ningún par de resúmenes cabe junto: combinarlos sin el modelo
+                return merge_digests(digests)
+            digests = await asyncio.gather(
+                *(self._areduce_group(heading, group) for group in groups)
+            )
+        return digests[0]
+
+    async def _areduce_group(self, heading: str, digests: List[Dict]) -> Dict:
+        if len(digests) == 1:
+            return digests[0]
+        DIGEST_STATS.record("reduce_calls")
+        try:
+            return await self._asummarize(
+                "digest_reduce",
+                build_reduce_messages(heading, [render_digest(digest) for digest in digests]),
+            )
+        except Exception as e:
+            logger.warning(f"No se pudieron combinar los resúmenes con el modelo: {e}")
+            return merge_digests(digests)
+
+    def _resolve_preference(self, preference: Optional[str]) -> str:
+        """Valida la preferencia de calidad o latencia, usando la preferencia por defecto si no se indica"""
+        preference = preference or getattr(self, "preference", None) or self.DEFAULT_MODEL_PREFERENCE
+        if preference not in self.MODEL_PREFERENCES:
+            raise ValueError(
+                f"Preferencia '{preference}' no válida. Opciones: {', '.join(self.MODEL_PREFERENCES)}"
+            )
+        return preference
+
+    def select_model_tier(self, platform: str, material: str, preference: Optional[str] = None) -> str:
+        """
+        Elige el nivel de modelo para una llamada.
+
+        Args:
+            platform (str): Plataforma destino
+            material (str): Material de entrada; si es largo se usa el nivel superior de la plataforma
+            preference (Optional[str]): "latency", "balanced" o "quality"
+
+        Returns:
+            str: Nivel de MODEL_TIERS
+        """
+        short_tier, long_tier = self.MODEL_ROUTING.get(platform, ("standard", "standard"))
+        tier = long_tier if len(material) >= self.LONG_MATERIAL_CHARS else short_tier
+
+        shift = {"latency": -1, "balanced": 0, "quality": 1}[self._resolve_preference(preference)]
+        index = self.MODEL_TIER_ORDER.index(tier) + shift
+        return self.MODEL_TIER_ORDER[max(0, min(len(self.MODEL_TIER_ORDER) - 1, index))]
+
+    def _record_tier_usage(self, tier: str, model: str, seconds: float, ai_response):
+        """Registra latencia y tokens de una llamada en las métricas por nivel"""
+        usage = getattr(ai_response, "usage", None)
+        TIER_STATS.record(
+            tier,
+            model,
+            seconds,
+            getattr(usage, "prompt_tokens", None),
+            getattr(usage, "completion_tokens", None),
+        )
+
+    def _resolve_generation_mode(self, generation_mode: Optional[str]) -> str:
+        """Valida el modo de generación, usando el modo por defecto si no se indica"""
+        mode = generation_mode or self.DEFAULT_GENERATION_MODE
+        if mode not in self.GENERATION_MODES:
+            raise ValueError(
+                f"Modo de generación '{mode}' no válido. Opciones: {', '.join(self.GENERATION_MODES)}"
+            )
+        return mode
+
+    def _finalize_platform_content(self, transformed_content: Dict, platform: str) -> Dict:
+        """Corrige el conteo de caracteres y ajusta localmente el contenido a los límites"""
+        limit = self.PLATFORM_LIMITS[platform]
+        original_length = len(transformed_content["text"])
+
+        # Recortar texto y etiquetas sin otra llamada al LLM; actualiza character_count
+        transformed_content = fit_content(transformed_content, platform, limit)
 
-        # Agregar campos específicos por plataforma
-        if platform == "instagram":
-            response_format["suggested_image_prompt"] = (
-                "descripción para contenido visual sugerido"
+        if original_length > limit:
+            logger.warning(
+                f"Contenido excede límite para {platform}: {original_length}, "
+                f"ajustado localmente a {transformed_content['character_count']}"
             )
-        elif platform == "tiktok":
-            response_format["suggested_video_prompt"] = "descripción para contenido audiovisual sugerido"
+        if transformed_content.get("needs_regeneration"):
+            logger.warning(f"El ajuste local para {platform} perdió demasiado contenido; requiere regeneración")
+
+        return transformed_content
+
+    def _parse_transformation_response(self, raw_response: str, platform: str) -> Dict:
+        """Limpia la respuesta del modelo, la convierte a JSON y valida límites"""
+        transformed_content = extract_json(raw_response)
+        return self._finalize_platform_content(transformed_content, platform)
+
+    def _parse_combined_response(self, raw_response: str, platforms: List[str]) -> Dict:
+        """Separa la respuesta combinada en el formato por plataforma.
+
+        Las plataformas cuya sección falta o no es válida se omiten del
+        resultado para que el llamador las regenere individualmente.
+        """
+        try:
+            combined_content = extract_json(raw_response)
+        except json.JSONDecodeError as e:
+            logger.error(f"Error parsing JSON response combinada: {e}")
+            return {}
+
+        return self.parse_platform_sections(combined_content, platforms)
+
+    def parse_platform_sections(self, sections: Dict, platforms: List[str]) -> Dict:
+        """Valida las secciones por plataforma de una respuesta con varias publicaciones.
+
+        Cada sección válida recibe el mismo ajuste que transform_for_platform;
+        las que faltan o no tienen texto se omiten.
+        """
+        parsed_sections = {}
+        for platform in platforms:
+            section = sections.get(platform) if isinstance(sections, dict) else None
+            if not isinstance(section, dict) or not isinstance(section.get("text"), str):
+                logger.warning(f"Sección inválida o ausente para {platform} en respuesta combinada")
+                continue
+            parsed_sections[platform] = self._finalize_platform_content(section, platform)
+
+        return parsed_sections
+
+    def _build_request_params(self, heading: str, material: str, platform: str, tier: str) -> Dict:
+        """Construye los parámetros de la llamada de chat completion"""
+        creativity_level = self.CREATIVITY_CONFIG.get(platform, 0.7)
+
+        return {
+            "model": self.model_tiers[tier],
+            "messages": PROMPT_REGISTRY.build_messages(heading, material, platform),
+            "temperature": creativity_level,
+            "max_tokens": TOKEN_BUDGETER.budget(platform),
+        }
 
-        # Convertir a string JSON para mostrar en el prompt
-        format_example = json.dumps(response_format, indent=4, ensure_ascii=False)
+    def _build_combined_request_params(
+        self, heading: str, material: str, platforms: List[str], tier: str
+    ) -> Dict:
+        """Construye los parámetros de la llamada combinada para varias plataformas"""
+        creativity_level = sum(
+            self.CREATIVITY_CONFIG.get(platform, 0.7) for platform in platforms
+        ) / len(platforms)
+
+        return {
+            "model": self.model_tiers[tier],
+            "messages": PROMPT_REGISTRY.build_combined_messages(heading, material, platforms),
+            "temperature": round(creativity_level, 2),
+            "max_tokens": min(
+                sum(TOKEN_BUDGETER.budget(platform) for platform in platforms),
+                self.COMBINED_MAX_TOKENS,
+            ),
+        }
 
-        return f"""
-Transforma el siguiente material para {platform}:
+    def _cache_key(
+        self, heading: str, material: str, platform: str, preference: str, tier: Optional[str] = None
+    ) -> str:
+        """Clave de caché derivada del contenido y de los parámetros de generación.
+
+        tier es el nivel con el que se generó el contenido; por defecto, el que
+        select_model_tier elige para la plataforma.
+        """
+        return ResponseCache.build_key(
+            heading=heading,
+            material=material,
+            platform=platform,
+            model=self.model_tiers[tier or self.select_model_tier(platform, material, preference)],
+            temperature=self.CREATIVITY_CONFIG.get(platform, 0.7),
+            prompt_version=self.PROMPT_TEMPLATE_VERSION,
+        )
 
-ENCABEZADO: {heading}
-MATERIAL: {material}
+    def _flight_key(self, heading: str, material: str, platform: str, preference: str) -> str:
+        """Clave de agrupación de solicitudes en vuelo.
 
-Genera ÚNICAMENTE un objeto JSON con esta estructura exacta:
-{format_example}
+        Normaliza espacios para que solicitudes que solo difieren en ellos
+        compartan la misma generación.
+        """
+        return self._cache_key(
+            " ".join(heading.split()), " ".join(material.split()), platform, preference
+        )
 
-CRÍTICO:
-- El texto debe estar optimizado para {platform}
-- Respeta el límite de {self.PLATFORM_LIMITS[platform]} caracteres
-- El character_count debe ser preciso (número entero)
-- NO incluyas explicaciones adicionales, solo el JSON
-- Responde exclusivamente con el JSON válido
-"""
+    def _get_cached(
+        self, heading: str, material: str, platform: str, preference: str, tier: Optional[str] = None
+    ) -> Optional[Dict]:
+        """Busca una transformación previa en la caché"""
+        if self.cache is None:
+            return None
+        cached_content = self.cache.get(self._cache_key(heading, material, platform, preference, tier))
+        if cached_content is not None:
+            logger.info(f"Contenido para {platform} obtenido de caché")
+        return cached_content
+
+    def _store_cached(
+        self,
+        heading: str,
+        material: str,
+        platform: str,
+        preference: str,
+        content: Dict,
+        tier: Optional[str] = None,
+    ):
+        """Guarda una transformación en la caché"""
+        # No reutilizar contenido que el ajuste local marcó para regenerar
+        if self.cache is not None and not content.get("needs_regeneration"):
+            self.cache.set(self._cache_key(heading, material, platform, preference, tier), content)
+
+    def _record_token_usage(self, platform: str, budget: int, ai_response) -> bool:
+        """Registra los tokens consumidos frente a los presupuestados.
+
+        Returns:
+            bool: True si la respuesta se truncó por max_tokens
+        """
+        usage = getattr(ai_response, "usage", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        finish_reason = ai_response.choices[0].finish_reason if ai_response.choices else None
+        TOKEN_BUDGETER.record(platform, budget, completion_tokens, finish_reason)
+        if finish_reason == "length":
+            logger.warning(f"Respuesta para {platform} truncada con max_tokens={budget}")
+        return finish_reason == "length"
+
+    def _boosted_request(self, platform: str, request_params: Dict) -> Optional[Dict]:
+        """Parámetros para reintentar una respuesta truncada con el presupuesto ampliado.
+
+        TOKEN_BUDGETER amplía el presupuesto al registrar la respuesta truncada;
+        si ya estaba en su máximo no hay reintento (None).
+        """
+        boosted_budget = TOKEN_BUDGETER.budget(platform)
+        if boosted_budget <= request_params["max_tokens"]:
+            return None
+        logger.info(f"Reintentando {platform} con max_tokens={boosted_budget}")
+        return {**request_params, "max_tokens": boosted_budget}
+
+    def _mark_truncated(self, content: Dict, platform: str) -> Dict:
+        """Marca para regenerar (y no guardar en caché) una publicación truncada"""
+        logger.warning(f"La respuesta para {platform} siguió truncada; requiere regeneración")
+        return {**content, "needs_regeneration": True}
+
+    def transform_for_platform(
+        self,
+        heading: str,
+        material: str,
+        platform: str,
+        use_cache: bool = True,
+        preference: Optional[str] = None,
+    ) -> Dict:
+        """Transforma contenido para una plataforma social específica.
+
+        Con use_cache=False se omite la lectura de caché, pero el resultado
+        nuevo se almacena igualmente. Las solicitudes idénticas concurrentes
+        comparten una sola llamada al LLM. El modelo se elige según la
+        plataforma, la extensión del material y la preferencia.
+        """
+        preference = self._resolve_preference(preference)
+        if use_cache:
+            cached_content = self._get_cached(heading, material, platform, preference)
+            if cached_content is not None:
+                return cached_content
+
+        return SINGLE_FLIGHT.do(
+            self._flight_key(heading, material, platform, preference),
+            lambda: self._generate_for_platform(heading, material, platform, preference),
+        )
 
-    def transform_for_platform(self, heading: str, material: str, platform: str) -> Dict:
-        """Transforma contenido para una plataforma social específica"""
+    def _generate_for_platform(
+        self, heading: str, material: str, platform: str, preference: str
+    ) -> Dict:
+        """Llama al LLM para una plataforma y guarda el resultado en caché"""
         try:
-            logger.info(f"Transformando contenido para {platform}")
-
-            platform_instructions = self.get_platform_instructions(platform)
-            transformation_request = self.build_transformation_request(heading, material, platform)
-            creativity_level = self.CREATIVITY_CONFIG.get(platform, 0.7)
-
-            ai_response = self.ai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": platform_instructions},
-                    {"role": "user", "content": transformation_request},
-                ],
-                temperature=creativity_level,
-                max_tokens=1000,
+            tier = self.select_model_tier(platform, material, preference)
+            logger.info(f"Transformando contenido para {platform} (nivel: {tier})")
+
+            request_params = self._build_request_params(heading, material, platform, tier)
+            started = time.monotonic()
+            ai_response = self.backend.chat_completion(**request_params)
+            self._record_tier_usage(
+                tier, request_params["model"], time.monotonic() - started, ai_response
             )
+            truncated = self._record_token_usage(platform, request_params["max_tokens"], ai_response)
+            boosted_params = self._boosted_request(platform, request_params) if truncated else None
+            if boosted_params is not None:
+                started = time.monotonic()
+                ai_response = self.backend.chat_completion(**boosted_params)
+                self._record_tier_usage(
+                    tier, boosted_params["model"], time.monotonic() - started, ai_response
+                )
+                truncated = self._record_token_usage(platform, boosted_params["max_tokens"], ai_response)
 
             # Extraer y limpiar respuesta JSON
-            raw_response = ai_response.choices[0].message.content.strip()
-
-            # Limpiar markdown si existe
-            if "```json" in raw_response:
-                start_idx = raw_response.find("```json") + 7
-                end_idx = raw_response.find("```", start_idx)
-                raw_response = raw_response[
-                    start_idx : end_idx if end_idx != -1 else len(raw_response)
-                ].strip()
-            elif "```" in raw_response:
-                start_idx = raw_response.find("```") + 3
-                end_idx = raw_response.find("```", start_idx)
-                raw_response = raw_response[
-                    start_idx : end_idx if end_idx != -1 else len(raw_response)
-                ].strip()
-
-            # Buscar JSON válido
-            json_match = re.search(r"\{.*\}", raw_response, re.DOTALL)
-            if json_match:
-                raw_response = json_match.group(0)
-
-            transformed_content = json.loads(raw_response)
-
-            # Validar y corregir conteo de caracteres
-            actual_length = len(transformed_content["text"])
-            transformed_content["character_count"] = actual_length
-
-            # Validar límite de caracteres
-            if transformed_content["character_count"] > self.PLATFORM_LIMITS[platform]:
-                logger.warning(
-                    f"Contenido excede límite para {platform}: {transformed_content['character_count']}"
-                )
+            transformed_content = self._parse_transformation_response(
+                ai_response.choices[0].message.content, platform
+            )
+            if truncated:
+                transformed_content = self._mark_truncated(transformed_content, platform)
+
+            self._store_cached(heading, material, platform, preference, transformed_content)
+            logger.info(f"Contenido transformado exitosamente para {platform}")
+            return transformed_content
+
+        except json.JSONDecodeError as e:
+            logger.error(f"Error parsing JSON response for {platform}: {e}")
+            raise Exception(f"Error parsing AI response for {platform}")
+
+        except Exception as e:
+            logger.error(f"Error transformando contenido para {platform}: {e}")
+            raise Exception(f"Error en transformación para {platform}: {str(e)}")
+
+    async def atransform_for_platform(
+        self,
+        heading: str,
+        material: str,
+        platform: str,
+        use_cache: bool = True,
+        preference: Optional[str] = None,
+        prompt_material: Optional[str] = None,
+    ) -> Dict:
+        """Versión asíncrona de transform_for_platform usando el backend asíncrono.
+
+        prompt_material reemplaza al material en el prompt (por ejemplo, su
+        resumen); la caché y la elección de modelo siguen usando el material
+        original.
+        """
+        preference = self._resolve_preference(preference)
+        if use_cache:
+            cached_content = self._get_cached(heading, material, platform, preference)
+            if cached_content is not None:
+                return cached_content
+
+        return await SINGLE_FLIGHT.ado(
+            self._flight_key(heading, material, platform, preference),
+            lambda: self._agenerate_for_platform(
+                heading, material, platform, preference, prompt_material
+            ),
+        )
 
+    async def _agenerate_for_platform(
+        self,
+        heading: str,
+        material: str,
+        platform: str,
+        preference: str,
+        prompt_material: Optional[str] = None,
+    ) -> Dict:
+        """Versión asíncrona de _generate_for_platform"""
+        try:
+            tier = self.select_model_tier(platform, material, preference)
+            logger.info(f"Transformando contenido para {platform} (async, nivel: {tier})")
+
+            request_params = self._build_request_params(
+                heading, prompt_material or material, platform, tier
+            )
+            ai_response = await self.acreate_completion(platform, tier, **request_params)
+            truncated = self._record_token_usage(platform, request_params["max_tokens"], ai_response)
+            boosted_params = self._boosted_request(platform, request_params) if truncated else None
+            if boosted_params is not None:
+                ai_response = await self.acreate_completion(platform, tier, **boosted_params)
+                truncated = self._record_token_usage(platform, boosted_params["max_tokens"], ai_response)
+
+            transformed_content = self._parse_transformation_response(
+                ai_response.choices[0].message.content, platform
+            )
+            if truncated:
+                transformed_content = self._mark_truncated(transformed_content, platform)
+
+            self._store_cached(heading, material, platform, preference, transformed_content)
             logger.info(f"Contenido transformado exitosamente para {platform}")
             return transformed_content
 
@@ -202,26 +692,369 @@ CRÍTICO:
             logger.error(f"Error transformando contenido para {platform}: {e}")
             raise Exception(f"Error en transformación para {platform}: {str(e)}")
 
+    async def astream_for_platform(
+        self,
+        heading: str,
+        material: str,
+        platform: str,
+        use_cache: bool = True,
+        preference: Optional[str] = None,
+        prompt_material: Optional[str] = None,
+    ) -> AsyncIterator[Dict]:
+        """Genera el contenido de una plataforma emitiendo los fragmentos a medida que llegan.
+
+        Emite eventos {"event": "delta", "platform", "text"} con el texto nuevo de
+        la publicación a medida que se genera y un evento final
+        {"event": "platform_complete", "platform", "content"} con el JSON
+        validado (incluye character_count y hashtags).
+        """
+        preference = self._resolve_preference(preference)
+        if use_cache:
+            cached_content = self._get_cached(heading, material, platform, preference)
+            if cached_content is not None:
+                yield {"event": "platform_complete", "platform": platform, "content": cached_content}
+                return
+
+        tier = self.select_model_tier(platform, material, preference)
+        logger.info(f"Transformando contenido para {platform} (streaming, nivel: {tier})")
+
+        request_params = self._build_request_params(
+            heading, prompt_material or material, platform, tier
+        )
+        started = time.monotonic()
+        stream = await self.backend.achat_completion(**request_params, stream=True)
+
+        extractor = IncrementalJSONExtractor()
+        streamed_text = ""
+        raw_chunks = []
+        finish_reason = None
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            finish_reason = chunk.choices[0].finish_reason or finish_reason
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            raw_chunks.append(delta)
+            if extractor.is_complete:
+                continue
+
+            partial_text = extractor.feed(delta).get("text")
+            if isinstance(partial_text, str) and len(partial_text) > len(streamed_text):
+                yield {
+                    "event": "delta",
+                    "platform": platform,
+                    "text": partial_text[len(streamed_text):],
+                }
+                streamed_text = partial_text
+
+        # El streaming no informa el uso de tokens: se estima localmente
+        completion_tokens = estimate_tokens("".join(raw_chunks), request_params["model"])
+        TOKEN_BUDGETER.record(platform, request_params["max_tokens"], completion_tokens, finish_reason)
+        TIER_STATS.record(
+            tier,
+            request_params["model"],
+            time.monotonic() - started,
+            sum(estimate_tokens(m["content"], request_params["model"]) for m in request_params["messages"]),
+            completion_tokens,
+        )
+
+        truncated = finish_reason == "length"
+        boosted_params = self._boosted_request(platform, request_params) if truncated else None
+        try:
+            if boosted_params is not None:
+                # Los fragmentos ya emitidos quedan incompletos: platform_complete trae la versión completa
+                ai_response = await self.acreate_completion(platform, tier, **boosted_params)
+                truncated = self._record_token_usage(platform, boosted_params["max_tokens"], ai_response)
+                transformed_content = self._parse_transformation_response(
+                    ai_response.choices[0].message.content, platform
+                )
+            else:
+                transformed_content = self._finalize_platform_content(extractor.result(), platform)
+        except json.JSONDecodeError as e:
+            logger.error(f"Error parsing JSON response for {platform}: {e}")
+            raise Exception(f"Error parsing AI response for {platform}")
+        if truncated:
+            transformed_content = self._mark_truncated(transformed_content, platform)
+
+        self._store_cached(heading, material, platform, preference, transformed_content)
+        logger.info(f"Contenido transformado exitosamente para {platform}")
+        yield {"event": "platform_complete", "platform": platform, "content": transformed_content}
+
+    async def astream_for_multiple_platforms(
+        self,
+        heading: str,
+        material: str,
+        target_platforms: List[str],
+        use_cache: bool = True,
+        preference: Optional[str] = None,
+        use_digest: Optional[bool] = None,
+    ) -> AsyncIterator[Dict]:
+        """Genera contenido para varias plataformas en paralelo intercalando sus eventos.
+
+        Además de los eventos de astream_for_platform emite
+        {"event": "platform_error", "platform", "error"} por cada plataforma fallida
+        y, si el material se resume por fragmentos, un evento "digest_chunk"
+        por fragmento antes de empezar a generar.
+        """
+        queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        finished = object()
+
+        prompt_material = None
+        if self._should_digest(material, use_digest):
+            digest_task = asyncio.create_task(
+                self.aget_material_digest(heading, material, progress_callback=queue.put_nowait)
+            )
+            digest_task.add_done_callback(lambda _: queue.put_nowait(finished))
+            try:
+                while (event := await queue.get()) is not finished:
+                    yield event
+            finally:
+                digest_task.cancel()
+            prompt_material = digest_task.result()
+
+        async def stream_platform(platform: str):
+            try:
+                if platform not in self.PLATFORM_LIMITS:
+                    raise Exception(f"Plataforma '{platform}' no está soportada")
+                async with semaphore:
+                    async for event in self.astream_for_platform(
+                        heading,
+                        material,
+                        platform,
+                        use_cache=use_cache,
+                        preference=preference,
+                        prompt_material=prompt_material,
+                    ):
+                        await queue.put(event)
+            except Exception as e:
+                logger.error(f"Error transformando para {platform}: {e}")
+                await queue.put({"event": "platform_error", "platform": platform, "error": str(e)})
+            finally:
+                await queue.put(finished)
+
+        platforms = list(dict.fromkeys(target_platforms))
+        tasks = [asyncio.create_task(stream_platform(platform)) for platform in platforms]
+
+        try:
+            remaining = len(tasks)
+            while remaining:
+                event = await queue.get()
+                if event is finished:
+                    remaining -= 1
+                    continue
+                yield event
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def atransform_combined(
+        self,
+        heading: str,
+        material: str,
+        platforms: List[str],
+        preference: Optional[str] = None,
+        prompt_material: Optional[str] = None,
+    ) -> Dict:
+        """Transforma contenido para varias plataformas con una única llamada.
+
+        La llamada usa el nivel de modelo más alto que requiera alguna de las
+        plataformas.
+
+        Returns:
+            Dict: Contenido por plataforma; solo incluye las secciones válidas
+        """
+        preference = self._resolve_preference(preference)
+        return await SINGLE_FLIGHT.ado(
+            self._flight_key(heading, material, ",".join(sorted(platforms)), preference),
+            lambda: self._agenerate_combined(
+                heading, material, platforms, preference, prompt_material
+            ),
+        )
+
+    def _combined_tier(self, material: str, platforms: List[str], preference: str) -> str:
+        """Nivel de una llamada combinada: el más alto que requiera alguna plataforma"""
+        return max(
+            (self.select_model_tier(platform, material, preference) for platform in platforms),
+            key=self.MODEL_TIER_ORDER.index,
+        )
+
+    async def _agenerate_combined(
+        self,
+        heading: str,
+        material: str,
+        platforms: List[str],
+        preference: str,
+        prompt_material: Optional[str] = None,
+    ) -> Dict:
+        """Llama al LLM una vez para varias plataformas y guarda cada sección en caché.
+
+        Las secciones se guardan con el nivel de la llamada combinada, no con
+        el que tendría cada plataforma por separado.
+        """
+        tier = self._combined_tier(material, platforms, preference)
+        logger.info(f"Transformando contenido combinado para: {', '.join(platforms)} (nivel: {tier})")
+
+        ai_response = await self.acreate_completion(
+            "combined",
+            tier,
+            **self._build_combined_request_params(
+                heading, prompt_material or material, platforms, tier
+            ),
+        )
+
+        parsed_sections = self._parse_combined_response(
+            ai_response.choices[0].message.content, platforms
+        )
+        for platform, content in parsed_sections.items():
+            self._store_cached(heading, material, platform, preference, content, tier=tier)
+        return parsed_sections
+
     def transform_for_multiple_platforms(
-        self, heading: str, material: str, target_platforms: List[str]
+        self,
+        heading: str,
+        material: str,
+        target_platforms: List[str],
+        generation_mode: Optional[str] = None,
+        use_cache: bool = True,
+        preference: Optional[str] = None,
+        use_digest: Optional[bool] = None,
+        progress_callback: Optional[Callable[[Dict], None]] = None,
+    ) -> Dict:
+        """Transforma contenido para múltiples plataformas sociales.
+
+        Envoltorio síncrono de atransform_for_multiple_platforms: todas las
+        plataformas se procesan en paralelo, por lo que la latencia total es
+        aproximadamente la de la plataforma más lenta.
+        """
+        return run_coroutine_sync(
+            self.atransform_for_multiple_platforms(
+                heading,
+                material,
+                target_platforms,
+                generation_mode=generation_mode,
+                use_cache=use_cache,
+                preference=preference,
+                use_digest=use_digest,
+                progress_callback=progress_callback,
+            )
+        )
+
+    async def atransform_for_multiple_platforms(
+        self,
+        heading: str,
+        material: str,
+        target_platforms: List[str],
+        generation_mode: Optional[str] = None,
+        use_cache: bool = True,
+        preference: Optional[str] = None,
+        use_digest: Optional[bool] = None,
+        progress_callback: Optional[Callable[[Dict], None]] = None,
     ) -> Dict:
-        """Transforma contenido para múltiples plataformas sociales"""
+        """Transforma contenido para múltiples plataformas de forma concurrente.
+
+        En modo "combined" se solicita una única respuesta para todas las
+        plataformas y solo se regeneran individualmente las secciones que no
+        se pudieron interpretar. Las plataformas presentes en caché no se
+        vuelven a generar salvo que use_cache sea False. preference
+        ("latency", "balanced" o "quality") ajusta el nivel de modelo. Si el
+        material supera DIGEST_MIN_CHARS se resume una sola vez y cada
+        plataforma recibe el resumen en lugar del texto completo
+        (use_digest=False lo desactiva); progress_callback recibe un evento por
+        cada fragmento cuando el material se resume por partes.
+        """
         output_results = {}
         processing_errors = {}
+        generation_mode = (
+            self._resolve_generation_mode(generation_mode) if generation_mode else self.generation_mode
+        )
+        preference = self._resolve_preference(preference)
+
+        logger.info(
+            f"Iniciando transformación para {len(target_platforms)} plataformas "
+            f"(modo: {generation_mode}, concurrencia máxima: {self.max_concurrency})"
+        )
 
-        logger.info(f"Iniciando transformación para {len(target_platforms)} plataformas")
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        prompt_material = None
+
+        async def transform_with_limit(platform: str) -> Dict:
+            async with semaphore:
+                return await self.atransform_for_platform(
+                    heading,
+                    material,
+                    platform,
+                    use_cache=False,
+                    preference=preference,
+                    prompt_material=prompt_material,
+                )
 
+        combined_tier = None
+        if generation_mode == "combined":
+            supported = [p for p in dict.fromkeys(target_platforms) if p in self.PLATFORM_LIMITS]
+            if len(supported) > 1:
+                combined_tier = self._combined_tier(material, supported, preference)
+
+        pending_platforms = []
         for platform in target_platforms:
             if platform not in self.PLATFORM_LIMITS:
                 logger.warning(f"Plataforma no soportada: {platform}")
                 processing_errors[platform] = f"Plataforma '{platform}' no está soportada"
                 continue
+            if platform in pending_platforms or platform in output_results:
+                continue
 
+            cached_content = (
+                self._get_cached(heading, material, platform, preference) if use_cache else None
+            )
+            if cached_content is None and use_cache and combined_tier is not None:
+                # Sección de una respuesta combinada anterior
+                cached_content = self._get_cached(heading, material, platform, preference, combined_tier)
+            if cached_content is not None:
+                output_results[platform] = cached_content
+            else:
+                pending_platforms.append(platform)
+
+        if pending_platforms and self._should_digest(material, use_digest):
+            prompt_material = await self.aget_material_digest(
+                heading, material, progress_callback=progress_callback
+            )
+
+        if generation_mode == "combined" and len(pending_platforms) > 1:
             try:
-                output_results[platform] = self.transform_for_platform(heading, material, platform)
+                output_results.update(
+                    await self.atransform_combined(
+                        heading,
+                        material,
+                        pending_platforms,
+                        preference=preference,
+                        prompt_material=prompt_material,
+                    )
+                )
             except Exception as e:
-                logger.error(f"Error transformando para {platform}: {e}")
-                processing_errors[platform] = str(e)
+                logger.error(f"Error en transformación combinada: {e}")
+
+            pending_platforms = [p for p in pending_platforms if p not in output_results]
+            if pending_platforms:
+                logger.info(
+                    f"Regenerando individualmente: {', '.join(pending_platforms)}"
+                )
+
+        results = await asyncio.gather(
+            *(transform_with_limit(platform) for platform in pending_platforms),
+            return_exceptions=True,
+        )
+
+        for platform, result in zip(pending_platforms, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Error transformando para {platform}: {result}")
+                processing_errors[platform] = str(result)
+            else:
+                output_results[platform] = result
+
+        # Mantener el orden solicitado de plataformas
+        output_results = {p: output_results[p] for p in target_platforms if p in output_results}
 
         # Solo agregar errores si los hay, sin otros metadatos
         if processing_errors:
@@ -236,6 +1069,51 @@ CRÍTICO:
         return output_results
 
 
+# Plantillas de prompt precompiladas al importar el módulo
+PROMPT_REGISTRY = PromptRegistry(LLMAdapter.PLATFORM_LIMITS)
+
+# Presupuesto de tokens de salida compartido por todas las instancias del proceso
+TOKEN_BUDGETER = TokenBudgeter(LLMAdapter.PLATFORM_LIMITS)
+
+# Generaciones en vuelo compartidas entre solicitudes idénticas concurrentes
+SINGLE_FLIGHT = SingleFlight()
+
+# Solicitudes duplicadas para las llamadas que superan la latencia habitual
+HEDGER = create_default_hedger()
+
+# Latencia y costo observados por nivel de modelo
+TIER_STATS = TierStats()
+
+# Resúmenes de material generados y reutilizados
+DIGEST_STATS = DigestStats()
+
+
+def run_coroutine_sync(coroutine):
+    """Ejecuta una corrutina desde código síncrono.
+
+    Si el hilo actual ya tiene un event loop en ejecución, la corrutina se
+    ejecuta en un hilo auxiliar con su propio loop, porque asyncio no permite
+    anidar loops. Aun así el hilo llamador espera el resultado, así que ese
+    loop queda bloqueado hasta que la corrutina termina; desde código
+    asíncrono deben usarse directamente los métodos a* del adaptador.
+    """
+
+    async def run_and_close_clients():
+        # Los clientes HTTP asíncronos deben cerrarse antes de que termine su loop
+        try:
+            return await coroutine
+        finally:
+            await aclose_loop_clients()
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(run_and_close_clients())
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, run_and_close_clients()).result()
+
+
 def validate_input_data(data: Dict) -> bool:
     """Valida que la entrada tenga la estructura correcta"""
     required_fields = ["encabezado", "material", "target_platforms"]
@@ -256,7 +1134,9 @@ def validate_input_data(data: Dict) -> bool:
     return True
 
 
-def process_content(input_data: Dict) -> Dict:
+def process_content(
+    input_data: Dict, progress_callback: Optional[Callable[[Dict], None]] = None
+) -> Dict:
     # Validar entrada
     if not validate_input_data(input_data):
         raise ValueError("Formato de entrada inválido")
@@ -276,6 +1156,11 @@ def process_content(input_data: Dict) -> Dict:
         heading=input_data["encabezado"],
         material=input_data["material"],
         target_platforms=input_data["target_platforms"],
+        generation_mode=input_data.get("generation_mode"),
+        use_cache=input_data.get("use_cache", True),
+        preference=input_data.get("preference"),
+        use_digest=input_data.get("use_digest"),
+        progress_callback=progress_callback,
     )
 
     return results
@@ -0,0 +1,120 @@
+"""
+Backends de modelos de lenguaje e imágenes.
+
+El resto del código no crea clientes de OpenAI directamente: usa un
+LLMBackend, que expone chat completions (síncronas, asíncronas y en
+streaming) y generación de imágenes con respuestas con la misma forma que
+las del SDK de OpenAI. OpenAIBackend acepta una base_url, lo que permite
+apuntar a cualquier servidor compatible, incluido el servidor local de
+pruebas de src/services/standin_server.py.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import weakref
+from typing import Optional
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHAT_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+DEFAULT_IMAGE_MODEL = os.getenv("OPENAI_IMAGE_MODEL", "dall-e-3")
+
+# Clientes asíncronos creados en cada event loop, para cerrarlos antes que el loop
+_loop_clients = weakref.WeakKeyDictionary()
+_loop_clients_lock = threading.Lock()
+
+
+async def aclose_loop_clients():
+    """Cierra los clientes asíncronos creados en el event loop actual"""
+    with _loop_clients_lock:
+        clients = list(_loop_clients.pop(asyncio.get_running_loop(), ()))
+    for client in clients:
+        await client.close()
+
+
+class LLMBackend:
+    """Interfaz común de los proveedores de chat completions e imágenes"""
+
+    chat_model: str = DEFAULT_CHAT_MODEL
+    image_model: str = DEFAULT_IMAGE_MODEL
+
+    def chat_completion(self, **request_params):
+        """Solicita una chat completion y espera la respuesta completa"""
+        raise NotImplementedError
+
+    async def achat_completion(self, **request_params):
+        """
+        Versión asíncrona de chat_completion.
+
+        Con stream=True devuelve un iterador asíncrono de fragmentos.
+        """
+        raise NotImplementedError
+
+    def generate_image(self, prompt: str, **request_params):
+        """Genera una imagen; la respuesta incluye data[0].url"""
+        raise NotImplementedError
+
+
+class OpenAIBackend(LLMBackend):
+    """Backend sobre la API de OpenAI o cualquier servidor compatible"""
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        chat_model: Optional[str] = None,
+        image_model: Optional[str] = None,
+    ):
+        """
+        Args:
+            api_key (str): Clave API de OpenAI
+            base_url (Optional[str]): URL base de un servidor compatible (por defecto la de OpenAI)
+            chat_model (Optional[str]): Modelo para chat completions
+            image_model (Optional[str]): Modelo para generación de imágenes
+        """
+        self.api_key = api_key
+        self.base_url = base_url
+        self.chat_model = chat_model or DEFAULT_CHAT_MODEL
+        self.image_model = image_model or DEFAULT_IMAGE_MODEL
+        self.client = openai.OpenAI(api_key=api_key, base_url=base_url)
+        self._async_client = None
+        self._async_client_loop = None
+
+    def _get_async_client(self) -> openai.AsyncOpenAI:
+        """Obtiene un cliente asíncrono ligado al event loop actual"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
+            self._async_client_loop = loop
+            with _loop_clients_lock:
+                _loop_clients.setdefault(loop, weakref.WeakSet()).add(self._async_client)
+        return self._async_client
+
+    def chat_completion(self, **request_params):
+        request_params.setdefault("model", self.chat_model)
+        return self.client.chat.completions.create(**request_params)
+
+    async def achat_completion(self, **request_params):
+        request_params.setdefault("model", self.chat_model)
+        return await self._get_async_client().chat.completions.create(**request_params)
+
+    def generate_image(self, prompt: str, **request_params):
+        request_params.setdefault("model", self.image_model)
+        return self.client.images.generate(prompt=prompt, **request_params)
+
+
+def create_backend(api_key: str) -> LLMBackend:
+    """
+    Crea el backend configurado por variables de entorno.
+
+    OPENAI_BASE_URL redirige todas las llamadas a un servidor compatible,
+    por ejemplo el servidor local de pruebas.
+    """
+    base_url = os.getenv("OPENAI_BASE_URL") or None
+    if base_url:
+        logger.info(f"Usando backend compatible con OpenAI en {base_url}")
+    return OpenAIBackend(api_key, base_url=base_url)
@@ -0,0 +1,297 @@
+"""
+Resumen estructurado del material compartido entre plataformas.
+
+Cuando el material es largo, enviarlo completo en cada prompt por plataforma
+multiplica los tokens de entrada por el número de plataformas. En su lugar
+se genera una sola vez un resumen compacto (datos clave, entidades, llamada
+a la acción y fechas), se guarda en caché por el hash del contenido y se
+envía ese resumen a cada transformación.
+
+Los documentos que no caben en una sola llamada se dividen en fragmentos
+acotados por tokens con límites definidos por el contenido: cada fragmento
+se resume por separado (y se guarda en caché por su propio contenido, de
+modo que editar una sección solo vuelve a procesar esa sección) y los
+resúmenes parciales se combinan en uno.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from typing import Dict, List
+
+from src.services.json_extractor import extract_json
+from src.services.token_estimator import estimate_tokens
+
+# Incrementar al modificar el prompt o el formato: invalida los resúmenes en caché
+DIGEST_VERSION = "1"
+
+DIGEST_MAX_TOKENS = 700
+
+DIGEST_FORMAT = {
+    "summary": "resumen en 2-3 oraciones",
+    "key_facts": ["dato concreto 1", "dato concreto 2"],
+    "entities": ["organizaciones, personas, productos o lugares"],
+    "call_to_action": "acción que se pide al lector, o cadena vacía",
+    "dates": ["fechas, horarios o plazos relevantes"],
+    "tone": "tono del material original",
+}
+
+DIGEST_SYSTEM_PROMPT = f"""Eres un editor que prepara material para un equipo de redes sociales.
+Resume el material que envíe el usuario (ENCABEZADO y MATERIAL) conservando todo dato
+que pueda necesitar una publicación: cifras, nombres, lugares, precios, enlaces y fechas.
+
+Genera ÚNICAMENTE un objeto JSON con esta estructura exacta:
+{json.dumps(DIGEST_FORMAT, indent=4, ensure_ascii=False)}
+
+CRÍTICO:
+- No inventes información que no esté en el material
+- Máximo 12 datos clave, cada uno en una sola oración
+- Responde exclusivamente con el JSON válido"""
+
+
+REDUCE_SYSTEM_PROMPT = f"""Eres un editor que prepara material para un equipo de redes sociales.
+El usuario envía el ENCABEZADO y varios RESÚMENES PARCIALES de fragmentos consecutivos
+de un mismo documento. Combínalos en un único resumen del documento completo,
+eliminando repeticiones y conservando cifras, nombres, lugares, precios, enlaces y fechas.
+
+Genera ÚNICAMENTE un objeto JSON con esta estructura exacta:
+{json.dumps(DIGEST_FORMAT, indent=4, ensure_ascii=False)}
+
+CRÍTICO:
+- No inventes información que no esté en los resúmenes parciales
+- Máximo 12 datos clave, priorizando los más relevantes para una publicación
+- Responde exclusivamente con el JSON válido"""
+
+# Separadores de oraciones: los fragmentos solo se cortan en estos límites
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?¡¿:;])\s+")
+
+# Caracteres finales de cada oración que deciden si allí termina un fragmento
+_CUT_ANCHOR_CHARS = 32
+
+
+def build_digest_messages(heading: str, material: str) -> List[Dict]:
+    """Mensajes de chat para resumir el material"""
+    return [
+        {"role": "system", "content": DIGEST_SYSTEM_PROMPT},
+        {"role": "user", "content": f"ENCABEZADO: {heading}\nMATERIAL: {material}"},
+    ]
+
+
+def build_reduce_messages(heading: str, partial_digests: List[str]) -> List[Dict]:
+    """Mensajes de chat para combinar los resúmenes de varios fragmentos"""
+    partials = "\n\n".join(
+        f"[FRAGMENTO {index}]\n{partial}" for index, partial in enumerate(partial_digests, 1)
+    )
+    return [
+        {"role": "system", "content": REDUCE_SYSTEM_PROMPT},
+        {"role": "user", "content": f"ENCABEZADO: {heading}\nRESÚMENES PARCIALES:\n{partials}"},
+    ]
+
+
+def _split_sentences(text: str, max_tokens: int) -> List[str]:
+    """
+    Divide un párrafo en oraciones y, las que exceden max_tokens, por caracteres.
+
+    Cada oración conserva el espacio que la sigue, de modo que unirlas
+    reproduce el párrafo original.
+    """
+    sentences, start = [], 0
+    for boundary in _SENTENCE_BOUNDARY.finditer(text):
+        sentences.append(text[start:boundary.end()])
+        start = boundary.end()
+    sentences.append(text[start:])
+
+    pieces = []
+    for sentence in sentences:
+        tokens = estimate_tokens(sentence)
+        if tokens <= max_tokens:
+            pieces.append(sentence)
+            continue
+        # Oración sin separadores utilizables: cortar en tramos proporcionales
+        step = max(1, len(sentence) * max_tokens // tokens)
+        pieces.extend(sentence[start:start + step] for start in range(0, len(sentence), step))
+    return pieces
+
+
+def _cut_score(unit: str, paragraph_end: bool) -> float:
+    """
+    Puntaje de corte de una oración: cuanto menor, más probable que un fragmento termine en ella.
+
+    Depende solo de la oración (un hash de sus últimos caracteres dividido
+    por sus tokens), no de su posición: editar una sección no mueve los
+    cortes de las demás y los otros fragmentos conservan su contenido y su
+    caché. Los finales de párrafo pesan el doble para preferirlos como límite.
+    """
+    weight = estimate_tokens(unit) * (2 if paragraph_end else 1)
+    anchor = unit.strip()[-_CUT_ANCHOR_CHARS:].encode("utf-8")
+    draw = int.from_bytes(hashlib.sha256(anchor).digest()[:8], "big") / 2**64
+    return draw / max(1, weight)
+
+
+def split_into_chunks(material: str, max_tokens: int) -> List[str]:
+    """
+    Divide el material en fragmentos de hasta max_tokens tokens.
+
+    Los cortes se definen por contenido y caen siempre en fin de oración o
+    de párrafo: un fragmento termina en cada oración cuyo puntaje de corte
+    (ver _cut_score) queda bajo 1 / (max_tokens / 2), lo que da fragmentos
+    de unos max_tokens / 2 tokens en promedio. Si un fragmento llegaría a
+    exceder max_tokens se corta en su oración de menor puntaje. Así, una
+    edición en una sección cambia el fragmento que la contiene y los demás
+    quedan idénticos.
+
+    Args:
+        material (str): Texto completo
+        max_tokens (int): Tokens máximos estimados por fragmento
+
+    Returns:
+        List[str]: Fragmentos en el orden original
+    """
+    if max_tokens <= 0:
+        raise ValueError("max_tokens debe ser mayor que 0")
+
+    threshold = 1 / max(1, max_tokens // 2)
+    units = []
+    for paragraph in re.split(r"\n\s*\n", material.strip()):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        pieces = _split_sentences(paragraph, max_tokens)
+        for index, piece in enumerate(pieces):
+            units.append(
+                {
+                    "text": ("\n\n" if index == 0 else "") + piece,
+                    "tokens": estimate_tokens(piece),
+                    "score": _cut_score(piece, paragraph_end=index == len(pieces) - 1),
+                }
+            )
+
+    chunks = []
+    current = []
+
+    def emit(count: int):
+        chunks.append("".join(unit["text"] for unit in current[:count]).strip())
+        del current[:count]
+
+    for unit in units:
+        while current and sum(item["tokens"] for item in current) + unit["tokens"] > max_tokens:
+            best = min(range(len(current)), key=lambda index: current[index]["score"])
+            emit(best + 1)
+        current.append(unit)
+        if unit["score"] < threshold:
+            emit(len(current))
+    if current:
+        emit(len(current))
+    return [chunk for chunk in chunks if chunk]
+
+
+def _as_list(value) -> List[str]:
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    if isinstance(value, str) and value.strip():
+        return [value.strip()]
+    return []
+
+
+def parse_digest(raw_response: str) -> Dict:
+    """
+    Convierte la respuesta del modelo en un resumen normalizado.
+
+    Raises:
+        ValueError: Si el resumen no contiene ni resumen ni datos clave
+    """
+    parsed = extract_json(raw_response)
+    digest = {
+        "summary": str(parsed.get("summary") or "").strip(),
+        "key_facts": _as_list(parsed.get("key_facts")),
+        "entities": _as_list(parsed.get("entities")),
+        "call_to_action": str(parsed.get("call_to_action") or "").strip(),
+        "dates": _as_list(parsed.get("dates")),
+        "tone": str(parsed.get("tone") or "").strip(),
+    }
+    if not digest["summary"] and not digest["key_facts"]:
+        raise ValueError("El resumen del material está vacío")
+    return digest
+
+
+def render_digest(digest: Dict) -> str:
+    """Texto compacto del resumen que se envía como MATERIAL a cada plataforma"""
+    lines = [f"RESUMEN: {digest['summary']}"] if digest.get("summary") else []
+    if digest.get("key_facts"):
+        lines.append("DATOS CLAVE:")
+        lines.extend(f"- {fact}" for fact in digest["key_facts"])
+    if digest.get("entities"):
+        lines.append(f"ENTIDADES: {', '.join(digest['entities'])}")
+    if digest.get("dates"):
+        lines.append(f"FECHAS: {', '.join(digest['dates'])}")
+    if digest.get("call_to_action"):
+        lines.append(f"LLAMADA A LA ACCIÓN: {digest['call_to_action']}")
+    if digest.get("tone"):
+        lines.append(f"TONO ORIGINAL: {digest['tone']}")
+    return "\n".join(lines)
+
+
+def merge_digests(digests: List[Dict]) -> Dict:
+    """
+    Combina resúmenes parciales sin llamar al modelo.
+
+    Se usa cuando la combinación con el LLM falla: concatena los resúmenes y
+    une las listas eliminando duplicados, conservando el orden del documento.
+    """
+
+    def unique(field: str) -> List[str]:
+        seen = {}
+        for digest in digests:
+            for item in digest.get(field, []):
+                seen.setdefault(item.lower(), item)
+        return list(seen.values())
+
+    return {
+        "summary": " ".join(d["summary"] for d in digests if d.get("summary")),
+        "key_facts": unique("key_facts"),
+        "entities": unique("entities"),
+        "call_to_action": next((d["call_to_action"] for d in digests if d.get("call_to_action")), ""),
+        "dates": unique("dates"),
+        "tone": next((d["tone"] for d in digests if d.get("tone")), ""),
+    }
+
+
+class DigestStats:
+    """Resúmenes generados, reutilizados y compresión obtenida"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {
+            "generated": 0,
+            "reused": 0,
+            "failed": 0,
+            "chunks_generated": 0,
+            "chunks_reused": 0,
+            "reduce_calls": 0,
+            "input_chars": 0,
+            "digest_chars": 0,
+        }
+
+    def record(self, event: str, input_chars: int = 0, digest_chars: int = 0):
+        """
+        Args:
+            event (str): "generated", "reused", "failed", "chunks_generated",
+                "chunks_reused" o "reduce_calls"
+            input_chars (int): Caracteres del material original
+            digest_chars (int): Caracteres del resumen enviado
+        """
+        with self._lock:
+            self._counters[event] += 1
+            if event in ("generated", "reused"):
+                self._counters["input_chars"] += input_chars
+                self._counters["digest_chars"] += digest_chars
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+        input_chars = counters["input_chars"]
+        counters["compression_ratio"] = (
+            round(counters["digest_chars"] / input_chars, 3) if input_chars else None
+        )
+        return counters
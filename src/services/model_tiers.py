@@ -0,0 +1,93 @@
+"""
+Registro de latencia y costo por nivel de modelo.
+
+LLMAdapter elige un nivel (fast, standard, quality) para cada llamada; este
+módulo acumula, por nivel, las llamadas realizadas, su latencia observada y
+el costo estimado a partir de los tokens consumidos.
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+# Precio estimado en USD por cada 1000 tokens: (entrada, salida)
+MODEL_PRICING = {
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4-turbo": (0.01, 0.03),
+}
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """Costo estimado de una llamada, o None si el modelo no tiene precio conocido"""
+    pricing = MODEL_PRICING.get(model)
+    if pricing is None:
+        return None
+    return (prompt_tokens * pricing[0] + completion_tokens * pricing[1]) / 1000
+
+
+class TierStats:
+    """Llamadas, latencia y costo observados por nivel de modelo"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._lock = threading.Lock()
+        self._tiers: Dict[str, Dict] = {}
+
+    def record(
+        self,
+        tier: str,
+        model: str,
+        seconds: float,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+    ):
+        """
+        Registra una llamada completada.
+
+        Args:
+            tier (str): Nivel elegido por la política de enrutamiento
+            model (str): Modelo usado
+            seconds (float): Latencia de la llamada
+            prompt_tokens (Optional[int]): Tokens de entrada
+            completion_tokens (Optional[int]): Tokens de salida
+        """
+        cost = estimate_cost(model, prompt_tokens or 0, completion_tokens or 0)
+        with self._lock:
+            entry = self._tiers.setdefault(
+                tier,
+                {
+                    "calls": 0,
+                    "models": {},
+                    "latencies": deque(maxlen=self.window),
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "estimated_cost_usd": 0.0,
+                },
+            )
+            entry["calls"] += 1
+            entry["models"][model] = entry["models"].get(model, 0) + 1
+            entry["latencies"].append(seconds)
+            entry["prompt_tokens"] += prompt_tokens or 0
+            entry["completion_tokens"] += completion_tokens or 0
+            entry["estimated_cost_usd"] += cost or 0.0
+
+    def stats(self) -> Dict:
+        """Resumen por nivel con latencia media y p95 y costo acumulado"""
+        report = {}
+        with self._lock:
+            for tier, entry in self._tiers.items():
+                latencies = sorted(entry["latencies"])
+                p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+                report[tier] = {
+                    "calls": entry["calls"],
+                    "models": dict(entry["models"]),
+                    "avg_latency_seconds": round(sum(latencies) / len(latencies), 3),
+                    "p95_latency_seconds": round(p95, 3),
+                    "prompt_tokens": entry["prompt_tokens"],
+                    "completion_tokens": entry["completion_tokens"],
+                    "estimated_cost_usd": round(entry["estimated_cost_usd"], 6),
+                    "avg_cost_per_call_usd": round(entry["estimated_cost_usd"] / entry["calls"], 6),
+                }
+        return report
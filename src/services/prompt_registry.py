@@ -0,0 +1,282 @@
+"""
+Registro versionado de plantillas de prompt por plataforma.
+
+Todos los segmentos estáticos (instrucciones de la plataforma, ejemplo del
+formato JSON y reglas de salida) se construyen una sola vez al importar el
+módulo. Los mensajes se organizan con el contenido estático largo primero y
+el contenido variable (encabezado y material) al final, de modo que el
+prefijo de cada solicitud sea idéntico entre llamadas y aproveche la caché
+de prefijos del proveedor.
+"""
+
+import json
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from src.services.token_estimator import estimate_tokens, tokenizer_name
+
+# Incrementar al modificar cualquier plantilla: invalida la caché de respuestas
+PROMPT_TEMPLATE_VERSION = "2"
+
+PLATFORM_GUIDES = {
+    "facebook": """
+Eres un especialista en marketing digital para Facebook. Transforma el contenido para maximizar engagement con estas directrices:
+- Estilo: Conversacional y cercano, manteniendo credibilidad
+- Extensión: Óptimo 500 caracteres para mejor alcance
+- Emojis: Moderado uso (1-3 por publicación)
+- Etiquetas: Máximo 5, relevantes y con alto engagement
+- Objetivo: Impulsar interacción y comentarios
+- Estructura: Texto fluido con saltos naturales de línea
+""",
+    "instagram": """
+Eres un creador de contenido especializado en Instagram. Optimiza el material para máximo impacto visual con estas pautas:
+- Estilo: Inspirador, visual y contemporáneo
+- Extensión: Máximo 2200 caracteres
+- Emojis: Uso abundante para enriquecer visualmente
+- Etiquetas: Entre 5-10, combinando populares y específicas
+- Objetivo: Contar historias visuales y generar engagement
+- Estructura: Párrafos cortos, optimizados para móviles
+- Visual: Incluir suggested_image_prompt con descripción detallada para contenido gráfico atractivo
+- Elementos: Estética, paleta de colores, composición que capture atención
+""",
+    "linkedin": """
+Eres un consultor en comunicación empresarial para LinkedIn. Desarrolla contenido que genere valor profesional con estas especificaciones:
+- Estilo: Profesional, informativo y con insights valiosos
+- Extensión: Máximo 3000 caracteres
+- Emojis: Uso mínimo, únicamente para énfasis estratégico
+- Etiquetas: Máximo 3-5, enfocadas en sector profesional
+- Objetivo: Compartir conocimiento, networking, valor corporativo
+- Estructura: Organización clara con viñetas cuando sea necesario
+""",
+    "tiktok": """
+Eres un creador de contenido viral especializado en TikTok. Transforma el material para máximo potencial viral con estas características:
+- Estilo: Dinámico, entretenido y siguiendo tendencias
+- Extensión: Máximo 4000 caracteres
+- Emojis: Uso expresivo y abundante
+- Etiquetas: Entre 3-8, incluyendo tendencias y challenges actuales
+- Objetivo: Entretenimiento, viralidad, seguir trends
+- Estructura: Ritmo acelerado, llamadas a la acción directas
+- Audiovisual: Incluir suggested_video_prompt con descripción detallada para contenido viral
+- Elementos: Transiciones, efectos, música trending, ganchos visuales
+""",
+    "whatsapp": """
+Eres un comunicador especializado en mensajería directa para WhatsApp. Adapta el contenido para comunicación personal efectiva con estas pautas:
+- Estilo: Personal, directo y como conversación natural
+- Extensión: Máximo 4000 caracteres, preferiblemente conciso
+- Emojis: Uso natural como en conversaciones reales
+- Etiquetas: Evitar o usar muy pocas (1-2 máximo)
+- Objetivo: Comunicación directa, información práctica
+- Estructura: Como mensaje personal, fácil de compartir
+""",
+}
+
+# Campos adicionales que cada plataforma agrega al formato base
+PLATFORM_EXTRA_FIELDS = {
+    "instagram": {"suggested_image_prompt": "descripción para contenido visual sugerido"},
+    "tiktok": {"suggested_video_prompt": "descripción para contenido audiovisual sugerido"},
+}
+
+BASE_RESPONSE_FORMAT = {
+    "text": "contenido transformado aquí",
+    "hashtags": ["#etiqueta1", "#etiqueta2"],
+    "character_count": "número_de_caracteres",
+    "tone": "descripción_del_estilo",
+}
+
+OUTPUT_RULES = """- El character_count debe ser preciso (número entero)
+- NO incluyas explicaciones adicionales, solo el JSON
+- Responde exclusivamente con el JSON válido"""
+
+COMBINED_INTRO = (
+    "Eres un equipo de especialistas en marketing digital. Generarás en una sola "
+    "respuesta una publicación independiente para cada plataforma indicada, "
+    "siguiendo las directrices de cada especialista:"
+)
+
+ONE_SHOT_INTRO = """Eres un asistente que analiza comandos para publicación en redes sociales y, en la misma respuesta, redacta la publicación de cada plataforma.
+
+Del comando del usuario extrae:
+1. Plataformas donde publicar (facebook, instagram, linkedin, o combinaciones)
+2. Título/encabezado del contenido
+3. Tema/contenido principal
+4. Si necesita imagen (true/false)
+5. Descripción para generar la imagen
+
+Si el comando habla de "redes" sin nombrar ninguna, usa facebook e instagram (sin LinkedIn
+a menos que se especifique); "todas las redes" son facebook, instagram y linkedin.
+
+Después escribe en "posts" una publicación independiente para cada plataforma de
+"platforms", siguiendo las directrices de cada especialista:"""
+
+
+class PromptRegistry:
+    """Plantillas de prompt precompiladas y versionadas por plataforma"""
+
+    def __init__(self, platform_limits: Dict[str, int], version: str = PROMPT_TEMPLATE_VERSION):
+        """
+        Construye todas las plantillas estáticas.
+
+        Args:
+            platform_limits (Dict[str, int]): Límite de caracteres por plataforma
+            version (str): Versión de las plantillas
+        """
+        self.version = version
+        self.platform_limits = dict(platform_limits)
+
+        self._response_formats = {
+            platform: {**BASE_RESPONSE_FORMAT, **PLATFORM_EXTRA_FIELDS.get(platform, {})}
+            for platform in self.platform_limits
+        }
+        self._format_examples = {
+            platform: json.dumps(response_format, indent=4, ensure_ascii=False)
+            for platform, response_format in self._response_formats.items()
+        }
+        self._system_prompts = {
+            platform: self._build_system_prompt(platform) for platform in self.platform_limits
+        }
+
+    def _build_system_prompt(self, platform: str) -> str:
+        """Une las instrucciones, el formato y las reglas de salida de una plataforma"""
+        return f"""{self.get_platform_instructions(platform).strip()}
+
+Transformarás el material que envíe el usuario (ENCABEZADO y MATERIAL) para {platform}.
+
+Genera ÚNICAMENTE un objeto JSON con esta estructura exacta:
+{self._format_examples[platform]}
+
+CRÍTICO:
+- El texto debe estar optimizado para {platform}
+- Respeta el límite de {self.platform_limits[platform]} caracteres
+{OUTPUT_RULES}
+"""
+
+    def get_platform_instructions(self, platform: str) -> str:
+        """Obtiene las instrucciones de estilo de una plataforma"""
+        return PLATFORM_GUIDES.get(platform, PLATFORM_GUIDES["facebook"])
+
+    def get_response_format(self, platform: str) -> Dict:
+        """Obtiene una copia de la estructura JSON esperada para una plataforma"""
+        return json.loads(json.dumps(self._response_formats[platform]))
+
+    def get_system_prompt(self, platform: str) -> str:
+        """Obtiene el prompt de sistema estático de una plataforma"""
+        return self._system_prompts[platform]
+
+    @lru_cache(maxsize=64)
+    def get_combined_system_prompt(self, platforms: Tuple[str, ...]) -> str:
+        """Construye (una vez por combinación) el prompt de sistema para varias plataformas"""
+        sections = [COMBINED_INTRO]
+        for platform in platforms:
+            sections.append(f"### {platform.upper()}\n{self.get_platform_instructions(platform).strip()}")
+
+        combined_format = {platform: self._response_formats[platform] for platform in platforms}
+        format_example = json.dumps(combined_format, indent=4, ensure_ascii=False)
+        limits = "\n".join(
+            f"- {platform}: máximo {self.platform_limits[platform]} caracteres" for platform in platforms
+        )
+
+        sections.append(
+            f"""Transformarás el material que envíe el usuario (ENCABEZADO y MATERIAL) para: {', '.join(platforms)}
+
+Genera ÚNICAMENTE un objeto JSON con una clave por plataforma y esta estructura exacta:
+{format_example}
+
+CRÍTICO:
+- Cada texto debe estar optimizado para su plataforma
+- Respeta los límites de caracteres:
+{limits}
+{OUTPUT_RULES}"""
+        )
+        return "\n\n".join(sections)
+
+    @lru_cache(maxsize=8)
+    def get_one_shot_system_prompt(self, platforms: Tuple[str, ...]) -> str:
+        """Prompt de sistema para analizar un comando y redactar sus publicaciones en una llamada"""
+        sections = [ONE_SHOT_INTRO]
+        for platform in platforms:
+            sections.append(f"### {platform.upper()}\n{self.get_platform_instructions(platform).strip()}")
+
+        one_shot_format = {
+            "platforms": list(platforms),
+            "title": "título extraído",
+            "content": "contenido principal",
+            "needs_image": True,
+            "image_prompt": "descripción detallada para generar imagen",
+            "posts": {platform: self._response_formats[platform] for platform in platforms},
+        }
+        format_example = json.dumps(one_shot_format, indent=4, ensure_ascii=False)
+        limits = "\n".join(
+            f"- {platform}: máximo {self.platform_limits[platform]} caracteres" for platform in platforms
+        )
+
+        sections.append(
+            f"""Genera ÚNICAMENTE un objeto JSON con esta estructura exacta:
+{format_example}
+
+CRÍTICO:
+- "posts" debe tener exactamente una clave por cada plataforma de "platforms"
+- Cada texto debe estar optimizado para su plataforma
+- Respeta los límites de caracteres:
+{limits}
+{OUTPUT_RULES}"""
+        )
+        return "\n\n".join(sections)
+
+    @staticmethod
+    def build_user_content(heading: str, material: str) -> str:
+        """Contenido variable de la solicitud; siempre va al final de los mensajes"""
+        return f"ENCABEZADO: {heading}\nMATERIAL: {material}"
+
+    def build_messages(self, heading: str, material: str, platform: str) -> List[Dict]:
+        """Mensajes de chat para transformar el material para una plataforma"""
+        return [
+            {"role": "system", "content": self.get_system_prompt(platform)},
+            {"role": "user", "content": self.build_user_content(heading, material)},
+        ]
+
+    def build_combined_messages(
+        self, heading: str, material: str, platforms: List[str]
+    ) -> List[Dict]:
+        """Mensajes de chat para transformar el material para varias plataformas a la vez"""
+        # Ordenar las plataformas para que el mismo conjunto comparta prefijo
+        return [
+            {"role": "system", "content": self.get_combined_system_prompt(tuple(sorted(platforms)))},
+            {"role": "user", "content": self.build_user_content(heading, material)},
+        ]
+
+    def build_one_shot_messages(self, command: str, platforms: List[str]) -> List[Dict]:
+        """Mensajes de chat para analizar un comando y redactar sus publicaciones a la vez"""
+        return [
+            {"role": "system", "content": self.get_one_shot_system_prompt(tuple(sorted(platforms)))},
+            {"role": "user", "content": command},
+        ]
+
+    def token_report(self, model: str = None) -> Dict:
+        """
+        Reporta el costo en tokens de cada plantilla estática.
+
+        Args:
+            model (str): Modelo para elegir el tokenizador
+
+        Returns:
+            Dict: Versión, método de conteo y tokens/caracteres por plantilla
+        """
+        templates = {}
+        for platform, system_prompt in self._system_prompts.items():
+            templates[f"platform:{platform}"] = {
+                "characters": len(system_prompt),
+                "tokens": estimate_tokens(system_prompt, model),
+            }
+
+        all_platforms = tuple(sorted(self.platform_limits))
+        combined_prompt = self.get_combined_system_prompt(all_platforms)
+        templates["combined:all"] = {
+            "characters": len(combined_prompt),
+            "tokens": estimate_tokens(combined_prompt, model),
+        }
+
+        return {
+            "version": self.version,
+            "tokenizer": tokenizer_name(model),
+            "templates": templates,
+        }
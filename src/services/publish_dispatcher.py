@@ -0,0 +1,127 @@
+"""
+Publicación concurrente en varias redes sociales.
+
+Cada plataforma se publica en su propio hilo con su propio tiempo límite,
+de modo que una subida lenta a LinkedIn no retrasa la publicación en
+Facebook y cada plataforma reporta su propio estado.
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tiempo límite por defecto para publicar en una plataforma (segundos)
+DEFAULT_PUBLISH_TIMEOUT = float(os.getenv("PUBLISH_TIMEOUT_SECONDS", "60"))
+
+# Instagram (crear y publicar contenedor) y LinkedIn (registrar, descargar y subir)
+# hacen varias llamadas, por lo que su límite por defecto es mayor
+PLATFORM_PUBLISH_TIMEOUTS = {
+    "facebook": float(os.getenv("PUBLISH_TIMEOUT_FACEBOOK", DEFAULT_PUBLISH_TIMEOUT)),
+    "instagram": float(os.getenv("PUBLISH_TIMEOUT_INSTAGRAM", DEFAULT_PUBLISH_TIMEOUT * 1.5)),
+    "linkedin": float(os.getenv("PUBLISH_TIMEOUT_LINKEDIN", DEFAULT_PUBLISH_TIMEOUT * 1.5)),
+}
+
+
+def get_publish_timeout(platform: str) -> float:
+    """Tiempo límite de publicación configurado para la plataforma"""
+    return PLATFORM_PUBLISH_TIMEOUTS.get(platform, DEFAULT_PUBLISH_TIMEOUT)
+
+
+def ensure_published(platform: str, response: Dict) -> Dict:
+    """
+    Verifica que la respuesta de la API confirme la publicación.
+
+    Facebook responde con "id" o "post_id" y LinkedIn con {"success": True};
+    cualquier otra respuesta (por ejemplo {"error": ...}) es un fallo. Lanzar
+    la excepción evita que el fallo se guarde como publicación realizada en
+    los puntos de control y que un reintento lo reutilice.
+
+    Args:
+        platform (str): Plataforma publicada
+        response (Dict): Respuesta de facebook_post_* o linkedin_post_*
+
+    Returns:
+        Dict: La misma respuesta
+
+    Raises:
+        Exception: Si la respuesta no confirma la publicación
+    """
+    if isinstance(response, dict) and (response.get("id") or response.get("post_id") or response.get("success")):
+        return response
+    raise Exception(f"Error publicando en {platform}: {response}")
+
+
+def publish_concurrently(
+    platforms: List[str],
+    publish: Callable[[str], Dict],
+    timeouts: Optional[Dict[str, float]] = None,
+) -> Dict[str, Dict]:
+    """
+    Publica en todas las plataformas a la vez.
+
+    Args:
+        platforms (List[str]): Plataformas donde publicar
+        publish (Callable[[str], Dict]): Publica en una plataforma y devuelve su resultado
+        timeouts (Optional[Dict[str, float]]): Límites por plataforma que reemplazan
+            a PLATFORM_PUBLISH_TIMEOUTS
+
+    Returns:
+        Dict[str, Dict]: Resultado por plataforma. Las fallidas tienen
+        {"status": "failed", "error"} y las que exceden su límite
+        {"status": "timeout", "error"}; todas incluyen "elapsed_seconds".
+    """
+    platforms = list(dict.fromkeys(platforms))
+    if not platforms:
+        return {}
+
+    limits = {
+        platform: (timeouts or {}).get(platform, get_publish_timeout(platform))
+        for platform in platforms
+    }
+    started = time.monotonic()
+    elapsed = {}
+
+    def timed_publish(platform: str) -> Dict:
+        try:
+            return publish(platform)
+        finally:
+            elapsed[platform] = round(time.monotonic() - started, 2)
+
+    executor = ThreadPoolExecutor(max_workers=len(platforms), thread_name_prefix="publish")
+    futures = {platform: executor.submit(timed_publish, platform) for platform in platforms}
+
+    results = {}
+    try:
+        # Esperar primero a las plataformas con el límite más corto
+        for platform in sorted(platforms, key=limits.get):
+            future = futures[platform]
+            wait([future], timeout=max(0.0, started + limits[platform] - time.monotonic()))
+
+            if not future.done():
+                logger.error(f"Publicación en {platform} excedió {limits[platform]:g}s")
+                results[platform] = {
+                    "status": "timeout",
+                    "error": (
+                        f"La publicación en {platform} excedió el tiempo límite de "
+                        f"{limits[platform]:g}s; podría completarse más tarde"
+                    ),
+                    "elapsed_seconds": limits[platform],
+                }
+                continue
+
+            try:
+                result = dict(future.result())
+            except Exception as e:
+                logger.error(f"Error publicando en {platform}: {e}")
+                result = {"error": str(e), "status": "failed"}
+            result["elapsed_seconds"] = elapsed.get(platform)
+            results[platform] = result
+    finally:
+        # Los hilos que excedieron su límite no pueden interrumpirse; no se esperan
+        executor.shutdown(wait=False)
+
+    return {platform: results[platform] for platform in platforms}
@@ -0,0 +1,247 @@
+"""
+Caché de respuestas del LLM direccionada por contenido.
+
+Combina un nivel en memoria (LRU acotado por proceso) con un nivel opcional en
+disco (SQLite) que sobrevive a reinicios y es compartido por todos los workers
+de uvicorn que apunten al mismo archivo.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Caché de dos niveles (memoria LRU + SQLite) con TTL por entrada"""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 86400,
+        db_path: Optional[str] = None,
+    ):
+        """
+        Inicializa la caché.
+
+        Args:
+            max_entries (int): Número máximo de entradas en memoria
+            ttl_seconds (float): Tiempo de vida por defecto de cada entrada
+            db_path (Optional[str]): Ruta del archivo SQLite; sin ella solo se usa memoria
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0,
+        }
+
+        if self.db_path:
+            self._init_disk_tier()
+
+        logger.info(
+            f"ResponseCache inicializada (memoria: {self.max_entries} entradas, "
+            f"disco: {self.db_path or 'deshabilitado'})"
+        )
+
+    @staticmethod
+    def build_key(**components) -> str:
+        """Genera una clave SHA-256 estable a partir de los componentes de la solicitud"""
+        serialized = json.dumps(components, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def _init_disk_tier(self):
+        """Crea la tabla de caché en SQLite si no existe"""
+        directory = os.path.dirname(os.path.abspath(self.db_path))
+        os.makedirs(directory, exist_ok=True)
+
+        connection = self._get_connection()
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        connection.commit()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Obtiene una conexión SQLite por hilo"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=5)
+            # WAL permite lecturas concurrentes desde varios procesos
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _increment(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Busca una entrada vigente en memoria y luego en disco.
+
+        Returns:
+            Optional[Dict]: Copia del valor almacenado o None si no existe o expiró
+        """
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._counters["hits"] += 1
+                    self._counters["memory_hits"] += 1
+                    return copy.deepcopy(value)
+                del self._memory[key]
+                self._counters["expired"] += 1
+
+        if self.db_path:
+            value = self._disk_get(key, now)
+            if value is not None:
+                self._increment("hits")
+                self._increment("disk_hits")
+                return copy.deepcopy(value)
+
+        self._increment("misses")
+        return None
+
+    def _disk_get(self, key: str, now: float) -> Optional[Dict]:
+        """Lee una entrada del nivel en disco y la promueve a memoria"""
+        try:
+            connection = self._get_connection()
+            row = connection.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            raw_value, expires_at = row
+            if expires_at <= now:
+                connection.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                connection.commit()
+                self._increment("expired")
+                return None
+
+            value = json.loads(raw_value)
+            self._memory_set(key, value, expires_at)
+            return value
+
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            logger.warning(f"Error leyendo caché en disco: {e}")
+            return None
+
+    def _memory_set(self, key: str, value: Dict, expires_at: float):
+        with self._lock:
+            self._memory[key] = (expires_at, copy.deepcopy(value))
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def set(self, key: str, value: Dict, ttl_seconds: Optional[float] = None):
+        """
+        Almacena un valor en ambos niveles.
+
+        Args:
+            key (str): Clave generada con build_key
+            value (Dict): Valor serializable a JSON
+            ttl_seconds (Optional[float]): TTL específico; por defecto el de la caché
+        """
+        now = time.time()
+        expires_at = now + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+
+        self._memory_set(key, value, expires_at)
+        self._increment("stores")
+
+        if self.db_path:
+            try:
+                connection = self._get_connection()
+                connection.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), expires_at, now),
+                )
+                connection.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Error escribiendo caché en disco: {e}")
+
+    def clear(self):
+        """Elimina todas las entradas de ambos niveles"""
+        with self._lock:
+            self._memory.clear()
+
+        if self.db_path:
+            connection = self._get_connection()
+            connection.execute("DELETE FROM llm_cache")
+            connection.commit()
+
+    def stats(self) -> Dict:
+        """Devuelve los contadores de aciertos y fallos de la caché"""
+        with self._lock:
+            counters = dict(self._counters)
+            memory_entries = len(self._memory)
+
+        lookups = counters["hits"] + counters["misses"]
+        counters.update(
+            {
+                "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+                "memory_entries": memory_entries,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_tier": bool(self.db_path),
+            }
+        )
+        return counters
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[ResponseCache]:
+    """
+    Devuelve la caché compartida del proceso configurada por variables de entorno.
+
+    Returns:
+        Optional[ResponseCache]: None si LLM_CACHE_ENABLED está desactivado
+    """
+    global _default_cache
+
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache(
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512")),
+                ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400")),
+                db_path=os.getenv("LLM_CACHE_DB_PATH") or None,
+            )
+        return _default_cache
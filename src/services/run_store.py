@@ -0,0 +1,270 @@
+"""
+Puntos de control de las ejecuciones de publicación.
+
+Cada ejecución se identifica por un run_id y guarda en SQLite la salida de
+cada etapa completada (análisis, contenido por plataforma, URL de la imagen,
+IDs de creación y publicaciones realizadas). Al reintentar con el mismo
+run_id las etapas completadas se reutilizan y solo se repiten las que
+fallaron, sin volver a pagar el LLM ni DALL-E y sin publicar dos veces.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Punto de control del contenedor de Instagram creado antes de media_publish
+INSTAGRAM_CREATION_STAGE = "instagram:creation"
+
+
+class RunConflictError(ValueError):
+    """El run_id ya pertenece a otra solicitud (error del cliente, no del servidor)"""
+
+
+class RunCheckpoints:
+    """Salidas ya guardadas de una ejecución y acceso para guardar las nuevas"""
+
+    def __init__(self, store: Optional["RunStore"], run_id: Optional[str], outputs: Dict[str, Any]):
+        """
+        Args:
+            store (Optional[RunStore]): Almacén donde guardar (None: sin persistencia)
+            run_id (Optional[str]): Identificador de la ejecución
+            outputs (Dict[str, Any]): Salida de cada etapa ya completada
+        """
+        self.store = store
+        self.run_id = run_id
+        self.outputs = dict(outputs)
+        self.reused = []
+        self._lock = threading.Lock()
+
+    def __contains__(self, stage: str) -> bool:
+        return stage in self.outputs
+
+    def reuse(self, stage: str) -> Any:
+        """Salida guardada de una etapa completada en un intento anterior"""
+        with self._lock:
+            self.reused.append(stage)
+        if self.store is not None:
+            self.store.record_reuse()
+        logger.info(f"Etapa {stage} reutilizada de la ejecución {self.run_id}")
+        return self.outputs[stage]
+
+    def save(self, stage: str, output: Any):
+        """Guarda la salida de una etapa completada"""
+        self.outputs[stage] = output
+        if self.store is not None:
+            self.store.save_stage(self.run_id, stage, output)
+
+
+class RunStore:
+    """Salidas de las etapas completadas por run_id con TTL (SQLite)"""
+
+    def __init__(self, db_path: str, ttl_seconds: float = 3 * 86400):
+        """
+        Args:
+            db_path (str): Ruta del archivo SQLite compartido por los workers
+            ttl_seconds (float): Tiempo durante el que una ejecución puede reanudarse
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {
+            "runs": 0,
+            "resumed_runs": 0,
+            "stages_saved": 0,
+            "stages_reused": 0,
+            "expired": 0,
+        }
+
+        directory = os.path.dirname(os.path.abspath(self.db_path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._get_connection()
+        connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                request_hash TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS run_stages (
+                run_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                output TEXT NOT NULL,
+                saved_at REAL NOT NULL,
+                PRIMARY KEY (run_id, stage)
+            );
+            CREATE INDEX IF NOT EXISTS idx_runs_expires ON runs (expires_at);
+            """
+        )
+        # Las versiones anteriores guardaban URLs con el token de la página: esas
+        # etapas se descartan y se repiten al reanudar
+        connection.execute("DELETE FROM run_stages WHERE output LIKE '%access_token=%'")
+        connection.commit()
+
+        logger.info(f"RunStore inicializado ({self.db_path})")
+
+    @staticmethod
+    def new_run_id() -> str:
+        """Identificador para una ejecución nueva"""
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def request_hash(**request) -> str:
+        """Clave estable de los datos de la solicitud"""
+        serialized = json.dumps(request, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Obtiene una conexión SQLite por hilo"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _increment(self, counter: str, amount: int = 1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def start(self, run_id: str, kind: str, **request) -> RunCheckpoints:
+        """
+        Registra una ejecución o retoma una existente.
+
+        Args:
+            run_id (str): Identificador de la ejecución
+            kind (str): Tipo de ejecución ("smart_publish", "generate_content", ...)
+            **request: Datos de la solicitud; un reintento debe repetirlos
+
+        Returns:
+            RunCheckpoints: Etapas ya completadas (ninguna en una ejecución nueva)
+
+        Raises:
+            RunConflictError: Si el run_id pertenece a otra solicitud
+        """
+        now = time.time()
+        fingerprint = self.request_hash(**request)
+        connection = self._get_connection()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            expired = [
+                row[0] for row in connection.execute("SELECT run_id FROM runs WHERE expires_at <= ?", (now,))
+            ]
+            self._delete(connection, expired)
+
+            row = connection.execute(
+                "SELECT kind, request_hash FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+            if row is not None and (row[0], row[1]) != (kind, fingerprint):
+                connection.rollback()
+                raise RunConflictError(f"El run_id {run_id} pertenece a otra solicitud")
+
+            if row is None:
+                connection.execute(
+                    "INSERT INTO runs (run_id, kind, request_hash, created_at, updated_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (run_id, kind, fingerprint, now, now, now + self.ttl_seconds),
+                )
+                checkpoints = {}
+            else:
+                connection.execute(
+                    "UPDATE runs SET updated_at = ?, expires_at = ? WHERE run_id = ?",
+                    (now, now + self.ttl_seconds, run_id),
+                )
+                checkpoints = {
+                    stage: json.loads(output)
+                    for stage, output in connection.execute(
+                        "SELECT stage, output FROM run_stages WHERE run_id = ?", (run_id,)
+                    )
+                }
+            connection.commit()
+        except (sqlite3.Error, json.JSONDecodeError) as e:
+            if connection.in_transaction:
+                connection.rollback()
+            logger.warning(f"Error leyendo los puntos de control: {e}")
+            return RunCheckpoints(self, run_id, {})
+
+        self._increment("expired", len(expired))
+        self._increment("resumed_runs" if row is not None else "runs")
+        if checkpoints:
+            logger.info(f"Reanudando ejecución {run_id}; etapas completadas: {', '.join(checkpoints)}")
+        return RunCheckpoints(self, run_id, checkpoints)
+
+    def save_stage(self, run_id: str, stage: str, output: Any):
+        """
+        Guarda la salida de una etapa completada.
+
+        Args:
+            run_id (str): Identificador de la ejecución
+            stage (str): Nombre de la etapa
+            output (Any): Salida serializable en JSON
+        """
+        try:
+            connection = self._get_connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO run_stages (run_id, stage, output, saved_at) VALUES (?, ?, ?, ?)",
+                (run_id, stage, json.dumps(output, ensure_ascii=False), time.time()),
+            )
+            connection.commit()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"Error guardando el punto de control {run_id}/{stage}: {e}")
+            return
+        self._increment("stages_saved")
+
+    def record_reuse(self, count: int = 1):
+        """Registra etapas omitidas por estar ya completadas"""
+        self._increment("stages_reused", count)
+
+    def _delete(self, connection: sqlite3.Connection, run_ids):
+        run_ids = [(run_id,) for run_id in run_ids]
+        connection.executemany("DELETE FROM runs WHERE run_id = ?", run_ids)
+        connection.executemany("DELETE FROM run_stages WHERE run_id = ?", run_ids)
+
+    def stats(self) -> Dict:
+        """Ejecuciones nuevas y reanudadas y etapas guardadas y reutilizadas"""
+        with self._lock:
+            counters = dict(self._counters)
+        try:
+            entries = self._get_connection().execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+        counters.update({"entries": entries, "ttl_seconds": self.ttl_seconds})
+        return counters
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_run_store() -> Optional[RunStore]:
+    """
+    Devuelve el almacén de puntos de control compartido del proceso configurado por variables de entorno.
+
+    Returns:
+        Optional[RunStore]: None si RUN_STORE_ENABLED está desactivado
+    """
+    global _default_store
+
+    if os.getenv("RUN_STORE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = RunStore(
+                db_path=os.getenv("RUN_STORE_DB_PATH", ".cache/run_store.sqlite3"),
+                ttl_seconds=float(os.getenv("RUN_STORE_TTL_SECONDS", str(3 * 86400))),
+            )
+        return _default_store
@@ -0,0 +1,127 @@
+"""
+Agrupación de solicitudes idénticas en vuelo (single-flight).
+
+Cuando varias solicitudes piden la misma generación mientras la primera
+todavía está en curso, solo la primera llama al LLM; las demás esperan su
+resultado y reciben una copia. Funciona entre hilos (endpoints síncronos en
+el pool de FastAPI) y entre event loops distintos, porque el resultado se
+comparte mediante un concurrent.futures.Future.
+"""
+
+import asyncio
+import copy
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Tuple
+
+
+class _LeaderCancelled(Exception):
+    """La solicitud que generaba el resultado fue cancelada antes de terminar"""
+
+
+class SingleFlight:
+    """Comparte una única ejecución entre llamadas concurrentes con la misma clave"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self._counters = {"executions": 0, "coalesced": 0}
+
+    def _claim(self, key: str) -> Tuple[Future, bool]:
+        """Obtiene el future en vuelo de la clave o registra uno nuevo como líder"""
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._counters["coalesced"] += 1
+                return future, False
+            future = Future()
+            self._in_flight[key] = future
+            self._counters["executions"] += 1
+            return future, True
+
+    def _release(self, key: str, future: Future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def do(self, key: str, function: Callable[[], Dict]) -> Dict:
+        """
+        Ejecuta function una sola vez para todas las llamadas síncronas concurrentes.
+
+        Args:
+            key (str): Clave normalizada de la operación
+            function (Callable[[], Dict]): Operación a ejecutar si no hay otra en vuelo
+
+        Returns:
+            Dict: Resultado de la operación (copia para las llamadas agrupadas)
+        """
+        while True:
+            future, is_leader = self._claim(key)
+            if not is_leader:
+                try:
+                    return copy.deepcopy(future.result())
+                except _LeaderCancelled:
+                    continue
+
+            try:
+                result = function()
+            except BaseException as e:
+                future.set_exception(e if isinstance(e, Exception) else _LeaderCancelled())
+                raise
+            else:
+                # El líder devuelve su propia copia: el resultado compartido no debe mutarse
+                future.set_result(result)
+                return copy.deepcopy(result)
+            finally:
+                self._release(key, future)
+
+    async def ado(self, key: str, coroutine_function: Callable[[], Awaitable[Dict]]) -> Dict:
+        """
+        Versión asíncrona de do.
+
+        Args:
+            key (str): Clave normalizada de la operación
+            coroutine_function (Callable[[], Awaitable[Dict]]): Crea la corrutina a ejecutar
+
+        Returns:
+            Dict: Resultado de la operación (copia para las llamadas agrupadas)
+        """
+        while True:
+            future, is_leader = self._claim(key)
+            if not is_leader:
+                try:
+                    # shield evita que cancelar a un seguidor cancele el resultado compartido
+                    result = await asyncio.shield(asyncio.wrap_future(future))
+                    return copy.deepcopy(result)
+                except _LeaderCancelled:
+                    continue
+
+            try:
+                result = await coroutine_function()
+            except asyncio.CancelledError:
+                # Los seguidores reintentan y uno de ellos toma el relevo
+                future.set_exception(_LeaderCancelled())
+                raise
+            except BaseException as e:
+                future.set_exception(e if isinstance(e, Exception) else _LeaderCancelled())
+                raise
+            else:
+                # El líder devuelve su propia copia: el resultado compartido no debe mutarse
+                future.set_result(result)
+                return copy.deepcopy(result)
+            finally:
+                self._release(key, future)
+
+    def stats(self) -> Dict:
+        """Ejecuciones reales, llamadas agrupadas y operaciones en vuelo"""
+        with self._lock:
+            executions = self._counters["executions"]
+            coalesced = self._counters["coalesced"]
+            in_flight = len(self._in_flight)
+        total = executions + coalesced
+        return {
+            "executions": executions,
+            "coalesced": coalesced,
+            "in_flight": in_flight,
+            "coalesced_ratio": round(coalesced / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,349 @@
+"""
+Ejecutor de etapas en forma de grafo (DAG).
+
+Cada etapa declara de qué etapas depende, su tiempo límite y cuántas veces
+se reintenta. Una etapa empieza en cuanto terminan todas sus dependencias,
+sin esperar al resto del pipeline, y el fallo de una etapa solo bloquea a
+las que dependen de ella. Cada ejecución produce una traza con los tiempos
+y el estado de cada etapa.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Estados finales de una etapa
+COMPLETED = "completed"
+FAILED = "failed"
+TIMEOUT = "timeout"
+BLOCKED = "blocked"  # una dependencia falló
+SKIPPED = "skipped"  # su condición no se cumplió
+DISABLED = "disabled"  # desactivada al construir el grafo
+
+# Estados que impiden ejecutar a las etapas dependientes
+BLOCKING_STATUSES = (FAILED, TIMEOUT, BLOCKED)
+
+
+def stage_policy(kind: str, timeout: float, retries: int = 0) -> Dict:
+    """
+    Tiempo límite y reintentos de un tipo de etapa, configurables por entorno.
+
+    STAGE_TIMEOUT_<TIPO> y STAGE_RETRIES_<TIPO> reemplazan los valores por
+    defecto (por ejemplo STAGE_TIMEOUT_ANALYZE=20).
+
+    Args:
+        kind (str): Tipo de etapa ("analyze", "content", ...)
+        timeout (float): Segundos máximos por intento
+        retries (int): Reintentos después del primer intento
+
+    Returns:
+        Dict: {"timeout", "retries"}
+    """
+    key = kind.upper().replace(":", "_").replace("-", "_")
+    return {
+        "timeout": float(os.getenv(f"STAGE_TIMEOUT_{key}", timeout)),
+        "retries": int(os.getenv(f"STAGE_RETRIES_{key}", retries)),
+    }
+
+
+class Stage:
+    """Nodo del grafo: una función que recibe los resultados de sus dependencias"""
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[Dict[str, Any]], Any],
+        deps: Iterable[str] = (),
+        timeout: Optional[float] = None,
+        retries: int = 0,
+        retry_delay: float = 0.5,
+        condition: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        enabled: bool = True,
+    ):
+        """
+        Args:
+            name (str): Nombre único de la etapa
+            run (Callable[[Dict[str, Any]], Any]): Recibe {dependencia: resultado}
+                y devuelve el resultado de la etapa
+            deps (Iterable[str]): Etapas que deben terminar antes
+            timeout (Optional[float]): Segundos máximos por intento (None: sin límite)
+            retries (int): Reintentos tras un fallo o un tiempo límite excedido
+            retry_delay (float): Espera antes del primer reintento; se duplica en cada uno
+            condition (Optional[Callable[[Dict[str, Any]], bool]]): Se evalúa con los
+                resultados de las dependencias; si devuelve False la etapa se omite
+            enabled (bool): False desactiva la etapa sin ejecutarla
+
+        Las etapas omitidas o desactivadas entregan None a sus dependientes;
+        las que fallan bloquean a sus dependientes.
+        """
+        self.name = name
+        self.run = run
+        self.deps = list(deps)
+        self.timeout = timeout
+        self.retries = max(0, retries)
+        self.retry_delay = retry_delay
+        self.condition = condition
+        self.enabled = enabled
+
+
+class StageStats:
+    """Ejecuciones, fallos y duración media de cada etapa"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict] = {}
+
+    def record(self, trace: List[Dict]):
+        with self._lock:
+            for entry in trace:
+                if entry["status"] in (SKIPPED, DISABLED):
+                    continue
+                stats = self._stages.setdefault(
+                    entry["stage"],
+                    {"runs": 0, "retries": 0, "seconds": 0.0, **{s: 0 for s in BLOCKING_STATUSES}},
+                )
+                if entry["status"] in BLOCKING_STATUSES:
+                    stats[entry["status"]] += 1
+                else:
+                    stats["runs"] += 1
+                    stats["seconds"] += entry["seconds"] or 0.0
+                stats["retries"] += max(0, entry["attempts"] - 1)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                name: {
+                    **{key: value for key, value in stats.items() if key != "seconds"},
+                    "avg_seconds": round(stats["seconds"] / stats["runs"], 3) if stats["runs"] else None,
+                }
+                for name, stats in self._stages.items()
+            }
+
+
+class StageExecutor:
+    """Ejecuta un grafo de etapas en un pool de hilos"""
+
+    def __init__(self, max_workers: Optional[int] = None, stats: Optional[StageStats] = None):
+        """
+        Args:
+            max_workers (Optional[int]): Hilos máximos (por defecto, uno por intento posible)
+            stats (Optional[StageStats]): Acumulador de métricas
+        """
+        self.max_workers = max_workers
+        self.stats = stats
+
+    @staticmethod
+    def _validate(stages: List[Stage]) -> Dict[str, Stage]:
+        """
+        Raises:
+            ValueError: Si hay nombres repetidos, dependencias desconocidas o ciclos
+        """
+        by_name = {}
+        for stage in stages:
+            if stage.name in by_name:
+                raise ValueError(f"Etapa duplicada: {stage.name}")
+            by_name[stage.name] = stage
+        for stage in stages:
+            unknown = [dep for dep in stage.deps if dep not in by_name]
+            if unknown:
+                raise ValueError(f"La etapa {stage.name} depende de etapas inexistentes: {unknown}")
+
+        visiting, visited = set(), set()
+
+        def visit(name: str):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"El grafo de etapas tiene un ciclo en {name}")
+            visiting.add(name)
+            for dep in by_name[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in by_name:
+            visit(name)
+        return by_name
+
+    def run(self, stages: List[Stage]) -> Dict:
+        """
+        Ejecuta todas las etapas respetando sus dependencias.
+
+        Args:
+            stages (List[Stage]): Etapas del grafo
+
+        Returns:
+            Dict: {"results": {etapa: resultado}, "errors": {etapa: error},
+            "trace": [por etapa: stage, status, attempts, ready_at, started_at,
+            finished_at, seconds y error, con tiempos relativos al inicio]}
+        """
+        by_name = self._validate(stages)
+        started = time.monotonic()
+
+        def offset(moment: Optional[float]) -> Optional[float]:
+            return round(moment - started, 3) if moment is not None else None
+
+        records = {
+            stage.name: {
+                "status": None,
+                "attempts": 0,
+                "ready_at": None,
+                "started_at": None,
+                "finished_at": None,
+                "error": None,
+            }
+            for stage in stages
+        }
+        results: Dict[str, Any] = {}
+        pending = [stage.name for stage in stages]
+        running: Dict[Any, Dict] = {}
+        retry_at: Dict[str, float] = {}
+
+        # Un intento que excede el tiempo límite sigue ocupando su hilo: el pool
+        # por defecto alcanza para todos los intentos, así un reintento no espera
+        # a que termine el intento abandonado
+        executor = ThreadPoolExecutor(
+            max_workers=self.max_workers or max(1, sum(1 + stage.retries for stage in stages)),
+            thread_name_prefix="stage",
+        )
+
+        def finish(name: str, status: str, error: Optional[str] = None):
+            record = records[name]
+            record["status"] = status
+            record["error"] = error
+            record["finished_at"] = time.monotonic()
+
+        def submit(name: str):
+            stage = by_name[name]
+            record = records[name]
+            record["attempts"] += 1
+            inputs = {dep: results.get(dep) for dep in stage.deps}
+
+            def attempt():
+                if record["started_at"] is None:
+                    record["started_at"] = time.monotonic()
+                return stage.run(inputs)
+
+            future = executor.submit(attempt)
+            deadline = time.monotonic() + stage.timeout if stage.timeout else None
+            running[future] = {"name": name, "deadline": deadline}
+
+        def retry_or_finish(name: str, status: str, error: str):
+            stage = by_name[name]
+            record = records[name]
+            if record["attempts"] <= stage.retries:
+                delay = stage.retry_delay * 2 ** (record["attempts"] - 1)
+                logger.warning(
+                    f"Etapa {name} ({status}): {error}; reintento {record['attempts']} en {delay:g}s"
+                )
+                retry_at[name] = time.monotonic() + delay
+            else:
+                logger.error(f"Etapa {name} ({status}): {error}")
+                finish(name, status, error)
+
+        try:
+            while pending or running or retry_at:
+                # Lanzar las etapas cuyas dependencias ya terminaron
+                for name in list(pending):
+                    stage = by_name[name]
+                    dep_statuses = [records[dep]["status"] for dep in stage.deps]
+                    if any(status is None for status in dep_statuses):
+                        continue
+                    pending.remove(name)
+                    records[name]["ready_at"] = time.monotonic()
+                    failed_deps = [
+                        dep for dep in stage.deps if records[dep]["status"] in BLOCKING_STATUSES
+                    ]
+                    if not stage.enabled:
+                        finish(name, DISABLED)
+                    elif failed_deps:
+                        finish(name, BLOCKED, f"Dependencias sin completar: {', '.join(failed_deps)}")
+                    elif stage.condition is not None and not stage.condition(
+                        {dep: results.get(dep) for dep in stage.deps}
+                    ):
+                        finish(name, SKIPPED)
+                    else:
+                        submit(name)
+
+                now = time.monotonic()
+                for name, moment in list(retry_at.items()):
+                    if moment <= now:
+                        del retry_at[name]
+                        submit(name)
+
+                if not running:
+                    if retry_at:
+                        time.sleep(max(0.0, min(retry_at.values()) - time.monotonic()))
+                        continue
+                    if pending:
+                        # Solo quedan etapas cuyas dependencias ya se resolvieron en esta vuelta
+                        continue
+                    break
+
+                wake_times = [run["deadline"] for run in running.values() if run["deadline"]]
+                wake_times.extend(retry_at.values())
+                timeout = max(0.0, min(wake_times) - time.monotonic()) if wake_times else None
+                done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    name = running.pop(future)["name"]
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        retry_or_finish(name, FAILED, str(e))
+                    else:
+                        finish(name, COMPLETED)
+
+                now = time.monotonic()
+                for future, run in list(running.items()):
+                    if run["deadline"] is not None and now >= run["deadline"]:
+                        # El hilo no puede interrumpirse: su resultado se descarta
+                        del running[future]
+                        stage = by_name[run["name"]]
+                        retry_or_finish(
+                            run["name"], TIMEOUT, f"excedió el tiempo límite de {stage.timeout:g}s"
+                        )
+        finally:
+            executor.shutdown(wait=False)
+
+        trace = []
+        for stage in stages:
+            record = records[stage.name]
+            seconds = (
+                record["finished_at"] - record["started_at"]
+                if record["started_at"] is not None and record["finished_at"] is not None
+                else None
+            )
+            trace.append(
+                {
+                    "stage": stage.name,
+                    "status": record["status"],
+                    "attempts": record["attempts"],
+                    "ready_at": offset(record["ready_at"]),
+                    "started_at": offset(record["started_at"]),
+                    "finished_at": offset(record["finished_at"]),
+                    "seconds": round(seconds, 3) if seconds is not None else None,
+                    "error": record["error"],
+                }
+            )
+
+        if self.stats is not None:
+            self.stats.record(trace)
+        summary = ", ".join(
+            f"{entry['stage']}={entry['status']}"
+            + (f" {entry['started_at']}→{entry['finished_at']}s" if entry["started_at"] is not None else "")
+            for entry in trace
+        )
+        logger.info(f"Traza de etapas ({time.monotonic() - started:.2f}s): {summary}")
+        return {
+            "results": {name: results[name] for name in results if records[name]["status"] == COMPLETED},
+            "errors": {
+                entry["stage"]: entry["error"] for entry in trace if entry["status"] in BLOCKING_STATUSES
+            },
+            "trace": trace,
+        }
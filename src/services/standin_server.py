@@ -0,0 +1,369 @@
+"""
+Servidor local que imita los endpoints de OpenAI para pruebas de carga sin red.
+
+Implementa /v1/chat/completions (con y sin streaming) y
+/v1/images/generations con latencias aleatorias según una distribución
+configurable, una tasa de fallos y respuestas JSON predefinidas. Las
+respuestas de chat se construyen a partir del formato JSON que pide el
+propio prompt, por lo que todo el pipeline funciona sin cambios.
+
+Uso:
+    python src/services/standin_server.py --port 8100 --latency lognormal:0.8,0.5 --failure-rate 0.02
+    OPENAI_BASE_URL=http://localhost:8100/v1 OPENAI_API_KEY=local python run_api.py
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import struct
+import sys
+import threading
+import time
+import uuid
+import zlib
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+# Permitir la ejecución directa del módulo (python src/services/standin_server.py)
+if __package__ in (None, ""):
+    sys.path.insert(
+        0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    )
+
+from src.services.json_extractor import JSONExtractionError, extract_json
+from src.services.token_estimator import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    # fixed:<segundos> | uniform:<mín>,<máx> | lognormal:<mediana>,<sigma>
+    "latency": "lognormal:0.8,0.5",
+    "image_latency": "uniform:2,6",
+    "stream_chunk_delay": 0.02,
+    "stream_chunk_size": 16,
+    "failure_rate": 0.0,
+    "failure_statuses": [429, 500, 503],
+    "seed": 42,
+    # Lista de {"match": "texto", "content": str | dict}: la primera coincidencia gana
+    "canned_responses": [],
+}
+
+# Caracteres por token usados para simular el corte por max_tokens
+CHARS_PER_TOKEN = 3.6
+
+
+class LatencyModel:
+    """Distribución de latencias a partir de una especificación de texto"""
+
+    def __init__(self, spec: str, rng: random.Random):
+        self.spec = spec
+        self.rng = rng
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(value) for value in params.split(",") if value]
+
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Distribución de latencia no soportada: {spec}")
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return self.rng.uniform(self.params[0], self.params[1])
+        median, sigma = self.params
+        return self.rng.lognormvariate(math.log(median), sigma)
+
+
+def _solid_png(width: int, height: int, color: tuple) -> bytes:
+    """Genera un PNG de un solo color sin dependencias externas"""
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(data))
+            + kind
+            + data
+            + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+        )
+
+    row = b"\x00" + bytes(color) * width
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(row * height, 9))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _parse_user_content(content: str) -> Dict[str, str]:
+    """Extrae ENCABEZADO y MATERIAL del mensaje del usuario"""
+    heading, _, material = content.partition("\nMATERIAL: ")
+    return {
+        "heading": heading.replace("ENCABEZADO: ", "", 1).strip(),
+        "material": material.strip() or content.strip(),
+    }
+
+
+def _fill_template(template, context: Dict[str, str]):
+    """Rellena el ejemplo de formato del prompt con contenido determinista"""
+    if isinstance(template, dict):
+        filled = {key: _fill_value(key, value, context) for key, value in template.items()}
+        if "text" in filled and "character_count" in filled:
+            filled["character_count"] = len(filled["text"])
+        return filled
+    return template
+
+
+def _fill_value(key: str, value, context: Dict[str, str]):
+    if isinstance(value, dict):
+        return _fill_template(value, context)
+    if key == "text":
+        return f"✨ {context['heading']}\n\n{context['material'][:400]}"
+    if key == "hashtags":
+        return ["#Demo", "#ContenidoDigital", "#Prueba"]
+    if key == "tone":
+        return "informativo"
+    if key == "title":
+        return context["heading"][:80]
+    if key == "content":
+        return context["material"]
+    if isinstance(value, str) and "descripción" in value:
+        return f"Imagen ilustrativa sobre {context['heading']}"
+    return value
+
+
+def build_canned_content(messages: List[Dict], canned_responses: List[Dict]) -> str:
+    """
+    Construye la respuesta del modelo para una conversación.
+
+    Usa la primera respuesta predefinida cuyo "match" aparezca en los
+    mensajes; si no hay, rellena el JSON de ejemplo del prompt de sistema.
+    """
+    system = "\n".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+
+    for rule in canned_responses:
+        if rule.get("match", "") in system + user:
+            content = rule.get("content", "")
+            return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+
+    _, marker, format_section = system.partition("estructura exacta:")
+    try:
+        template = extract_json(format_section if marker else system)
+    except JSONExtractionError:
+        return "OK"
+
+    filled = _fill_template(template, _parse_user_content(user))
+    return json.dumps(filled, ensure_ascii=False)
+
+
+class StandinState:
+    """Configuración y contadores del servidor"""
+
+    def __init__(self, config: Dict):
+        self.config = {**DEFAULT_CONFIG, **config}
+        self.rng = random.Random(self.config["seed"])
+        self.latency = LatencyModel(self.config["latency"], self.rng)
+        self.image_latency = LatencyModel(self.config["image_latency"], self.rng)
+        self.images: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self.counters = {"chat_requests": 0, "image_requests": 0, "failures": 0, "truncated": 0}
+
+    def count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def sample_failure(self) -> Optional[int]:
+        with self._lock:
+            if self.rng.random() < self.config["failure_rate"]:
+                self.counters["failures"] += 1
+                return self.rng.choice(self.config["failure_statuses"])
+        return None
+
+
+def _error_response(status: int) -> JSONResponse:
+    return JSONResponse(
+        status_code=status,
+        content={
+            "error": {
+                "message": f"Fallo simulado por el servidor local ({status})",
+                "type": "rate_limit_error" if status == 429 else "server_error",
+                "code": None,
+            }
+        },
+    )
+
+
+def create_app(config: Optional[Dict] = None) -> FastAPI:
+    """
+    Crea la aplicación del servidor local.
+
+    Args:
+        config (Optional[Dict]): Valores que reemplazan a DEFAULT_CONFIG
+
+    Returns:
+        FastAPI: Aplicación lista para uvicorn
+    """
+    state = StandinState(config or {})
+    app = FastAPI(title="Servidor local compatible con OpenAI")
+    app.state.standin = state
+
+    @app.get("/v1/models")
+    def list_models():
+        return {"object": "list", "data": [{"id": "standin", "object": "model", "owned_by": "local"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        state.count("chat_requests")
+
+        await asyncio.sleep(state.latency.sample())
+        failure_status = state.sample_failure()
+        if failure_status:
+            return _error_response(failure_status)
+
+        model = body.get("model", "standin")
+        messages = body.get("messages", [])
+        content = build_canned_content(messages, state.config["canned_responses"])
+
+        finish_reason = "stop"
+        max_tokens = body.get("max_tokens")
+        if max_tokens and estimate_tokens(content) > max_tokens:
+            content = content[: int(max_tokens * CHARS_PER_TOKEN)]
+            finish_reason = "length"
+            state.count("truncated")
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        if body.get("stream"):
+            return StreamingResponse(
+                _stream_chunks(state, completion_id, created, model, content, finish_reason),
+                media_type="text/event-stream",
+            )
+
+        prompt_tokens = sum(estimate_tokens(m.get("content", "")) for m in messages)
+        completion_tokens = estimate_tokens(content)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": finish_reason,
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    @app.post("/v1/images/generations")
+    async def images_generations(request: Request):
+        body = await request.json()
+        state.count("image_requests")
+
+        await asyncio.sleep(state.image_latency.sample())
+        failure_status = state.sample_failure()
+        if failure_status:
+            return _error_response(failure_status)
+
+        prompt = body.get("prompt", "")
+        width, _, height = body.get("size", "1024x1024").partition("x")
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        image_id = digest.hex()[:16]
+        if image_id not in state.images:
+            state.images[image_id] = _solid_png(int(width), int(height or width), digest[:3])
+
+        return {
+            "created": int(time.time()),
+            "data": [
+                {
+                    "url": f"{str(request.base_url).rstrip('/')}/v1/files/{image_id}.png",
+                    "revised_prompt": prompt,
+                }
+            ],
+        }
+
+    @app.get("/v1/files/{image_id}.png")
+    def image_file(image_id: str):
+        image = state.images.get(image_id)
+        if image is None:
+            return _error_response(404)
+        return Response(content=image, media_type="image/png")
+
+    @app.get("/standin/stats")
+    def stats():
+        return {"config": state.config, "counters": dict(state.counters)}
+
+    return app
+
+
+async def _stream_chunks(
+    state: StandinState, completion_id: str, created: int, model: str, content: str, finish_reason: str
+):
+    """Emite la respuesta como eventos SSE con el formato de chat.completion.chunk"""
+    size = state.config["stream_chunk_size"]
+    delay = state.config["stream_chunk_delay"]
+
+    def event(delta: Dict, finish: Optional[str] = None) -> str:
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+        }
+        return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+
+    yield event({"role": "assistant", "content": ""})
+    for start in range(0, len(content), size):
+        await asyncio.sleep(delay)
+        yield event({"content": content[start:start + size]})
+    yield event({}, finish_reason)
+    yield "data: [DONE]\n\n"
+
+
+def main():
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Servidor local compatible con OpenAI para pruebas de carga")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--config", help="Archivo JSON con valores que reemplazan a DEFAULT_CONFIG")
+    parser.add_argument("--latency", help="Distribución de latencia, ej. lognormal:0.8,0.5")
+    parser.add_argument("--failure-rate", type=float, help="Fracción de solicitudes que fallan")
+    parser.add_argument("--seed", type=int, help="Semilla de latencias y fallos")
+
+    args = parser.parse_args()
+
+    config = {}
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            config.update(json.load(f))
+    if args.latency:
+        config["latency"] = args.latency
+    if args.failure_rate is not None:
+        config["failure_rate"] = args.failure_rate
+    if args.seed is not None:
+        config["seed"] = args.seed
+
+    print(f"🧪 Servidor local en http://{args.host}:{args.port}/v1")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
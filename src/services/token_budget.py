@@ -0,0 +1,159 @@
+"""
+Presupuesto adaptativo de tokens de salida (max_tokens) por plataforma.
+
+El presupuesto inicial se calcula localmente a partir del límite de
+caracteres de la plataforma, la extensión que realmente recomiendan sus
+guías, el idioma y el costo del envoltorio JSON. Después se ajusta con los
+tokens realmente consumidos: se reduce cuando las respuestas usan mucho
+menos de lo presupuestado y se amplía cuando el modelo se corta por longitud.
+"""
+
+import math
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+from src.services.token_estimator import CHARS_PER_TOKEN, DEFAULT_LANGUAGE
+
+# Extensión efectiva según las guías de estilo; el límite duro de Facebook y
+# WhatsApp está muy por encima de lo que se publica en la práctica
+PLATFORM_TARGET_CHARS = {
+    "facebook": 1500,
+    "whatsapp": 800,
+}
+
+# Tokens adicionales de los campos de medios sugeridos
+EXTRA_FIELD_TOKENS = {
+    "instagram": 120,
+    "tiktok": 150,
+}
+
+# Tokens de hashtags, tono y sintaxis JSON alrededor del texto
+JSON_ENVELOPE_TOKENS = 80
+
+
+class TokenBudgeter:
+    """Calcula y ajusta el max_tokens de cada plataforma"""
+
+    def __init__(
+        self,
+        platform_limits: Dict[str, int],
+        languages: Optional[Dict[str, str]] = None,
+        floor: int = 256,
+        ceiling: int = 2000,
+        safety_margin: float = 1.2,
+        window: int = 50,
+        min_samples: int = 10,
+    ):
+        """
+        Args:
+            platform_limits (Dict[str, int]): Límite de caracteres por plataforma
+            languages (Optional[Dict[str, str]]): Idioma del contenido por plataforma
+            floor (int): Presupuesto mínimo
+            ceiling (int): Presupuesto máximo
+            safety_margin (float): Holgura aplicada sobre la estimación y lo observado
+            window (int): Número de respuestas recientes consideradas
+            min_samples (int): Respuestas necesarias antes de ajustar el presupuesto
+        """
+        self.platform_limits = dict(platform_limits)
+        self.languages = languages or {}
+        self.floor = floor
+        self.ceiling = ceiling
+        self.safety_margin = safety_margin
+        self.min_samples = min_samples
+
+        self._lock = threading.Lock()
+        self._observed = {platform: deque(maxlen=window) for platform in self.platform_limits}
+        self._utilization = {platform: deque(maxlen=window) for platform in self.platform_limits}
+        self._truncations = {platform: 0 for platform in self.platform_limits}
+        self._boost = {platform: 1.0 for platform in self.platform_limits}
+        self._static = {platform: self._static_budget(platform) for platform in self.platform_limits}
+
+    def _clamp(self, tokens: float) -> int:
+        return int(min(self.ceiling, max(self.floor, math.ceil(tokens))))
+
+    def _static_budget(self, platform: str) -> int:
+        """Presupuesto calculado solo con límites, idioma y envoltorio JSON"""
+        target_chars = min(
+            self.platform_limits[platform],
+            PLATFORM_TARGET_CHARS.get(platform, self.platform_limits[platform]),
+        )
+        language = self.languages.get(platform, DEFAULT_LANGUAGE)
+        chars_per_token = CHARS_PER_TOKEN.get(language, CHARS_PER_TOKEN[DEFAULT_LANGUAGE])
+
+        text_tokens = target_chars / chars_per_token
+        overhead = JSON_ENVELOPE_TOKENS + EXTRA_FIELD_TOKENS.get(platform, 0)
+        return self._clamp((text_tokens + overhead) * self.safety_margin)
+
+    def budget(self, platform: str) -> int:
+        """
+        Devuelve el max_tokens a usar para la plataforma.
+
+        Con suficientes observaciones se usa el percentil 95 de los tokens
+        consumidos más la holgura, sin superar el presupuesto estático salvo
+        que se hayan detectado respuestas truncadas.
+        """
+        if platform not in self._static:
+            return self.ceiling
+
+        with self._lock:
+            static_budget = self._static[platform] * self._boost[platform]
+            observed = sorted(self._observed[platform])
+
+        if len(observed) < self.min_samples:
+            return self._clamp(static_budget)
+
+        p95 = observed[min(len(observed) - 1, int(len(observed) * 0.95))]
+        return self._clamp(min(static_budget, p95 * self.safety_margin))
+
+    def record(
+        self,
+        platform: str,
+        budget: int,
+        completion_tokens: Optional[int],
+        finish_reason: Optional[str] = None,
+    ):
+        """
+        Registra el consumo real de una respuesta.
+
+        Args:
+            platform (str): Plataforma de la respuesta
+            budget (int): max_tokens enviado
+            completion_tokens (Optional[int]): Tokens de salida consumidos
+            finish_reason (Optional[str]): "length" indica que la respuesta se truncó
+        """
+        if platform not in self._observed:
+            return
+
+        with self._lock:
+            if completion_tokens:
+                self._observed[platform].append(completion_tokens)
+                self._utilization[platform].append(completion_tokens / budget)
+            if finish_reason == "length":
+                self._truncations[platform] += 1
+                # Ampliar el presupuesto y descartar observaciones que lo subestimaban
+                self._boost[platform] = min(
+                    self.ceiling / self._static[platform], self._boost[platform] * 1.25
+                )
+                self._observed[platform].clear()
+
+    def stats(self) -> Dict:
+        """Presupuesto vigente y consumo observado por plataforma"""
+        report = {}
+        for platform in self.platform_limits:
+            with self._lock:
+                observed = list(self._observed[platform])
+                utilization = list(self._utilization[platform])
+                truncations = self._truncations[platform]
+            report[platform] = {
+                "static_budget": self._static[platform],
+                "current_budget": self.budget(platform),
+                "samples": len(observed),
+                "avg_completion_tokens": round(sum(observed) / len(observed), 1) if observed else None,
+                "max_completion_tokens": max(observed) if observed else None,
+                "avg_budget_utilization": (
+                    round(sum(utilization) / len(utilization), 3) if utilization else None
+                ),
+                "truncations": truncations,
+            }
+        return report
@@ -0,0 +1,69 @@
+"""
+Estimación local de tokens sin llamadas a la API.
+
+Usa tiktoken cuando está instalado y, si no, un modelo calibrado de
+caracteres por token según el idioma del texto.
+"""
+
+import logging
+import math
+from functools import lru_cache
+from typing import Optional
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Caracteres promedio por token medidos con cl100k_base
+CHARS_PER_TOKEN = {
+    "es": 3.6,
+    "en": 4.0,
+}
+DEFAULT_LANGUAGE = "es"
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: Optional[str]):
+    """Obtiene el codificador de tiktoken para el modelo, o None si no está disponible"""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # tiktoken descarga los vocabularios la primera vez; sin red se usa la heurística
+        logger.warning(f"No se pudo cargar tiktoken, se usará la estimación heurística: {e}")
+        return None
+
+
+def tokenizer_name(model: Optional[str] = None) -> str:
+    """Indica qué método de conteo se está usando"""
+    encoding = _get_encoding(model)
+    return f"tiktoken:{encoding.name}" if encoding is not None else "heuristic"
+
+
+def estimate_tokens(text: str, model: Optional[str] = None, language: str = DEFAULT_LANGUAGE) -> int:
+    """
+    Estima el número de tokens de un texto.
+
+    Args:
+        text (str): Texto a medir
+        model (Optional[str]): Modelo de OpenAI para elegir el tokenizador
+        language (str): Idioma del texto para la estimación heurística
+
+    Returns:
+        int: Número de tokens (exacto con tiktoken, aproximado sin él)
+    """
+    if not text:
+        return 0
+
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+
+    chars_per_token = CHARS_PER_TOKEN.get(language, CHARS_PER_TOKEN[DEFAULT_LANGUAGE])
+    return math.ceil(len(text) / chars_per_token)
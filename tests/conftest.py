@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Permitir "from src.services..." al ejecutar pytest desde cualquier directorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
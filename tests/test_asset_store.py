@@ -0,0 +1,55 @@
+import json
+import sqlite3
+
+from src.services.asset_store import AssetStore, facebook_photo_url, strip_access_token
+
+
+def test_facebook_photo_url_adds_current_token():
+    assert facebook_photo_url("123") == "https://graph.facebook.com/v19.0/123/picture"
+    assert facebook_photo_url("123", "TOKEN") == "https://graph.facebook.com/v19.0/123/picture?access_token=TOKEN"
+
+
+def test_strip_access_token_keeps_other_parameters():
+    url = "https://example.com/image.png?size=large&access_token=SECRET&v=2"
+
+    assert strip_access_token(url) == "https://example.com/image.png?size=large&v=2"
+    assert strip_access_token(facebook_photo_url("123", "SECRET")) == facebook_photo_url("123")
+
+
+def test_saved_asset_has_no_token_and_is_found_with_any_token(tmp_path):
+    store = AssetStore(str(tmp_path / "assets.sqlite3"))
+    store.save("sha", {"facebook_photo_id": "123"}, prompt_hash="prompt", urls=[facebook_photo_url("123", "OLD")])
+
+    asset = store.find_by_url(facebook_photo_url("123", "ROTATED"))
+    assert asset is not None
+    assert asset["refs"] == {"facebook_photo_id": "123"}
+    assert store.find_by_prompt("prompt")["sha256"] == "sha"
+
+    dump = "\n".join(sqlite3.connect(str(tmp_path / "assets.sqlite3")).iterdump())
+    assert "OLD" not in dump
+
+
+def test_tokens_saved_by_previous_versions_are_purged(tmp_path):
+    path = str(tmp_path / "assets.sqlite3")
+    AssetStore(path)
+    connection = sqlite3.connect(path)
+    refs = {
+        "facebook_photo_id": "123",
+        "public_url": facebook_photo_url("123", "SECRET"),
+        "variants": {"1080x1080": {"url": facebook_photo_url("456", "SECRET"), "facebook_photo_id": "456"}},
+    }
+    connection.execute(
+        "INSERT INTO assets VALUES (?, NULL, NULL, ?, 0, 0, ?)", ("sha", json.dumps(refs), 2**40)
+    )
+    connection.execute(
+        "INSERT INTO asset_aliases VALUES ('url', ?, 'sha')", (facebook_photo_url("123", "SECRET"),)
+    )
+    connection.commit()
+
+    store = AssetStore(path)
+
+    assert store.find_by_content("sha")["refs"] == {
+        "facebook_photo_id": "123",
+        "variants": {"1080x1080": {"facebook_photo_id": "456"}},
+    }
+    assert "SECRET" not in "\n".join(connection.iterdump())
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from src.services.batch_runner import BatchRunner
+
+
+class Killed(BaseException):
+    """Simula la terminación del proceso: no la captura _process_line"""
+
+
+def write_input(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        for index in range(count):
+            f.write(json.dumps({"id": index, "encabezado": f"h{index}", "material": "m"}) + "\n")
+            if index == 3:
+                f.write("\n")
+
+
+def read_output(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def echo(record):
+    if record["id"] == 7:
+        raise ValueError("registro inválido")
+    return {"echo": record["id"]}
+
+
+@pytest.mark.parametrize("concurrency", [1, 3])
+def test_resume_after_kill_processes_every_record_once(tmp_path, concurrency):
+    input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.ndjson"
+    write_input(input_path, 20)
+    calls = []
+
+    def dies_at_twelve(record):
+        calls.append(record["id"])
+        if record["id"] == 12:
+            raise Killed()
+        return echo(record)
+
+    runner = BatchRunner(
+        str(input_path), str(output_path), max_concurrency=concurrency, checkpoint_every=2,
+        processor=dies_at_twelve,
+    )
+    with pytest.raises(Killed):
+        runner.run()
+    # Escritura a medias al morir el proceso
+    with open(output_path, "ab") as f:
+        f.write(b'{"offset": 99, "sta')
+
+    resumed_calls = []
+
+    def resumed(record):
+        resumed_calls.append(record["id"])
+        return echo(record)
+
+    summary = BatchRunner(
+        str(input_path), str(output_path), max_concurrency=concurrency, checkpoint_every=2,
+        processor=resumed,
+    ).run()
+
+    outputs = read_output(output_path)
+    assert sorted(output["id"] for output in outputs) == list(range(20))
+    assert summary == {**summary, "processed": 20, "succeeded": 19, "failed": 1}
+    assert [output for output in outputs if output["status"] == "error"][0]["id"] == 7
+    # Solo se repiten los registros posteriores al último checkpoint
+    assert 0 not in resumed_calls and 12 in resumed_calls
+
+
+def test_restart_ignores_checkpoint(tmp_path):
+    input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.ndjson"
+    write_input(input_path, 5)
+    runner = BatchRunner(str(input_path), str(output_path), checkpoint_every=1, processor=echo)
+    runner.run()
+    summary = runner.run(resume=False)
+    assert summary["processed"] == 5
+    assert len(read_output(output_path)) == 5
+
+
+def test_checkpoint_of_another_input_is_rejected(tmp_path):
+    output_path = tmp_path / "out.ndjson"
+    for name in ("a.jsonl", "b.jsonl"):
+        write_input(tmp_path / name, 2)
+    BatchRunner(str(tmp_path / "a.jsonl"), str(output_path), processor=echo).run()
+    with pytest.raises(Exception, match="otro archivo de entrada"):
+        BatchRunner(str(tmp_path / "b.jsonl"), str(output_path), processor=echo).run()
@@ -0,0 +1,98 @@
+import pytest
+
+from src.services.command_parser import parse_command
+
+FAST_PATH_MIN_CONFIDENCE = 0.7
+
+
+@pytest.mark.parametrize(
+    "command, platforms",
+    [
+        ("Publica en Facebook e Instagram sobre el evento de mañana", ["facebook", "instagram"]),
+        ("Publica sobre el evento de mañana en Instagram y Facebook", ["facebook", "instagram"]),
+        ("Post on LinkedIn about our new office", ["linkedin"]),
+        ("Comparte en fb sobre la nueva carta", ["facebook"]),
+        ("Publica en todas las redes excepto LinkedIn sobre la feria", ["facebook", "instagram"]),
+    ],
+)
+def test_platforms(command, platforms):
+    analysis = parse_command(command)
+
+    assert analysis["platforms"] == platforms
+    assert analysis["confidence"] >= FAST_PATH_MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize(
+    "command, platforms, content",
+    [
+        ("Publica en Facebook sobre cómo usar Instagram para vender", ["facebook"], "cómo usar Instagram para vender"),
+        ("Publica en Facebook sobre nuestro nuevo perfil de LinkedIn", ["facebook"], "nuestro nuevo perfil de LinkedIn"),
+        ("Publica en LinkedIn sobre el evento de ig", ["linkedin"], "el evento de ig"),
+    ],
+)
+def test_platform_inside_topic_is_not_a_target(command, platforms, content):
+    analysis = parse_command(command)
+
+    assert analysis["platforms"] == platforms
+    assert analysis["content"] == content
+    assert analysis["needs_image"] is False
+
+
+def test_platform_only_inside_topic_defers_to_llm():
+    analysis = parse_command("Publica sobre cómo usar Instagram para vender")
+
+    assert analysis["confidence"] < FAST_PATH_MIN_CONFIDENCE
+
+
+def test_topic_ends_at_contrast():
+    analysis = parse_command("Publica en redes sobre la cena, pero no en instagram")
+
+    assert analysis["platforms"] == ["facebook"]
+    assert analysis["content"] == "la cena"
+    assert analysis["image_prompt"] == "Imagen sobre la cena"
+
+
+@pytest.mark.parametrize(
+    "command, platforms, content",
+    [
+        ("Publica sobre el evento en Facebook, no en Instagram", ["facebook"], "el evento"),
+        ("Publica sobre el evento en Facebook y no en Instagram", ["facebook"], "el evento"),
+        ("Post about the summer sale on Facebook, not on Instagram", ["facebook"], "the summer sale"),
+        ("Publica en redes sobre la promo, no en Instagram", ["facebook"], "la promo"),
+    ],
+)
+def test_negated_destination_after_topic(command, platforms, content):
+    analysis = parse_command(command)
+
+    assert analysis["platforms"] == platforms
+    assert analysis["content"] == content
+    assert analysis["needs_image"] is False
+
+
+def test_contrast_without_exclusion_defers_to_llm():
+    analysis = parse_command("Publica en Facebook sobre la cena, pero con música en vivo")
+
+    assert analysis["confidence"] < FAST_PATH_MIN_CONFIDENCE
+
+
+def test_image_clause_and_style():
+    analysis = parse_command("Post on LinkedIn about our new office with a modern photo")
+
+    assert analysis["content"] == "our new office"
+    assert analysis["needs_image"] is True
+    assert analysis["image_prompt"] == "Modern image about our new office"
+    assert analysis["language"] == "en"
+
+
+def test_declined_image_on_instagram_defers_to_llm():
+    analysis = parse_command("Publica en Instagram sobre la feria sin imagen")
+
+    assert analysis["needs_image"] is False
+    assert analysis["confidence"] < FAST_PATH_MIN_CONFIDENCE
+
+
+def test_question_lowers_confidence():
+    question = parse_command("¿Puedes publicar en Facebook sobre la feria?")
+    command = parse_command("Publica en Facebook sobre la feria")
+
+    assert question["confidence"] < command["confidence"]
@@ -0,0 +1,36 @@
+from src.services.content_fitter import fit_content, is_safe_cut, truncate_text
+
+
+def test_post_within_limit_is_unchanged():
+    content = {"text": "Hola #Cafe", "hashtags": ["cafe", "#Cafe", "#uno", "#dos", "#tres", "#cuatro", "#cinco"]}
+    fitted = fit_content(content, "facebook", 100)
+    assert fitted["text"] == content["text"]
+    assert fitted["hashtags"] == content["hashtags"]
+    assert fitted["character_count"] == len(content["text"])
+
+
+def test_trimmed_trailing_hashtags_leave_the_hashtag_list():
+    body = "Nuevo café de especialidad en la tienda del centro. "
+    text = body + "#CafeDeEspecialidad #Random #Centro"
+    content = {"text": text, "hashtags": ["#CafeDeEspecialidad", "#Random", "#Centro", "#Extra"]}
+    fitted = fit_content(content, "facebook", len(body) + 20)
+    assert len(fitted["text"]) <= len(body) + 20
+    inline = {tag for tag in content["hashtags"] if tag in text}
+    for tag in inline:
+        assert (tag in fitted["hashtags"]) == (tag in fitted["text"])
+    assert "#Extra" in fitted["hashtags"]
+    assert fitted["character_count"] == len(fitted["text"])
+
+
+def test_hashtags_capped_per_platform_after_trimming():
+    content = {"text": "palabra " * 100, "hashtags": [f"#tag{i}" for i in range(12)]}
+    fitted = fit_content(content, "linkedin", 200)
+    assert len(fitted["hashtags"]) == 5
+    assert len(fitted["text"]) <= 200
+
+
+def test_truncate_prefers_sentence_end_and_keeps_emoji_sequences():
+    text = "Primera oración completa. Segunda oración que no cabe en el límite"
+    assert truncate_text(text, 40) == "Primera oración completa."
+    family = "👨‍👩‍👧"
+    assert not is_safe_cut("a" + family, 3)
@@ -0,0 +1,79 @@
+import asyncio
+
+from src.services.hedging import HedgeBudget, RequestHedger
+
+
+def make_hedger(max_hedges_per_minute=30):
+    hedger = RequestHedger(enabled=True, percentile=50, max_hedges_per_minute=max_hedges_per_minute, min_samples=5)
+    for _ in range(5):
+        hedger._attempts.record("op", 0.02)
+    return hedger
+
+
+def slow_then_fast():
+    delays = iter([0.5, 0.01, 0.5, 0.01, 0.5, 0.01])
+    calls = []
+
+    async def call():
+        delay = next(delays)
+        calls.append(delay)
+        await asyncio.sleep(delay)
+        return delay
+
+    return call, calls
+
+
+def test_no_hedge_until_enough_samples():
+    hedger = RequestHedger(enabled=True, min_samples=5)
+    assert hedger.hedge_delay("op") is None
+
+    async def call():
+        return "ok"
+
+    assert asyncio.run(hedger.run("op", call)) == "ok"
+    assert hedger.stats()["hedges_sent"] == 0
+
+
+def test_slow_call_is_hedged_and_fastest_result_wins():
+    hedger = make_hedger()
+    call, calls = slow_then_fast()
+    assert asyncio.run(hedger.run("op", call)) == 0.01
+    stats = hedger.stats()
+    assert calls == [0.5, 0.01]
+    assert stats["hedges_sent"] == 1 and stats["hedges_won"] == 1
+    assert stats["extra_cost_ratio"] == 1.0
+
+
+def test_budget_limits_duplicates_per_minute():
+    hedger = make_hedger(max_hedges_per_minute=1)
+    call, calls = slow_then_fast()
+
+    async def two_requests():
+        first = await hedger.run("op", call)
+        second = await hedger.run("op", call)
+        return first, second
+
+    # El segundo duplicado no cabe en el presupuesto: se espera al intento original
+    first, second = asyncio.run(two_requests())
+    assert first == 0.01
+    stats = hedger.stats()
+    assert stats["hedges_sent"] == 1 and stats["budget_exhausted"] == 1
+    assert len(calls) == 3
+
+
+def test_budget_window_releases_after_a_minute(monkeypatch):
+    budget = HedgeBudget(max_per_minute=2)
+    now = [1000.0]
+    monkeypatch.setattr("src.services.hedging.time.monotonic", lambda: now[0])
+    assert budget.try_acquire() and budget.try_acquire()
+    assert not budget.try_acquire()
+    now[0] += 60
+    assert budget.try_acquire()
+
+
+def test_disabled_hedger_never_duplicates():
+    hedger = make_hedger()
+    hedger.enabled = False
+    call, calls = slow_then_fast()
+    assert asyncio.run(hedger.run("op", call)) == 0.5
+    assert calls == [0.5]
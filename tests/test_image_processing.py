@@ -0,0 +1,69 @@
+from io import BytesIO
+
+import pytest
+
+from src.services.image_processing import (
+    ImageProcessor,
+    ProcessingStats,
+    guess_content_type,
+    image_spec,
+    parse_size,
+    process_image,
+    variant_key,
+)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def png(width, height, color=(200, 60, 40)):
+    Image = pytest.importorskip("PIL.Image")
+    output = BytesIO()
+    Image.new("RGB", (width, height), color).save(output, format="PNG")
+    return output.getvalue()
+
+
+@pytest.mark.parametrize("size", ["1200", "0x630", "anchoxalto"])
+def test_invalid_sizes(size):
+    with pytest.raises(ValueError):
+        parse_size(size)
+
+
+def test_platform_specs_are_jpeg_at_the_recommended_size():
+    spec = image_spec("instagram")
+
+    assert (spec["width"], spec["height"], spec["format"]) == (1080, 1080, "JPEG")
+    assert variant_key(image_spec("facebook")) == variant_key(image_spec("linkedin"))
+    assert variant_key(spec) != variant_key(image_spec("facebook"))
+
+
+def test_content_type_from_signature():
+    assert guess_content_type(b"\xff\xd8\xff\xe0") == "image/jpeg"
+    assert guess_content_type(b"RIFF\x00\x00\x00\x00WEBP") == "image/webp"
+    assert guess_content_type(PNG_SIGNATURE) == "image/png"
+
+
+def test_without_pillow_the_original_is_forwarded(monkeypatch):
+    monkeypatch.setenv("IMAGE_PROCESSING_ENABLED", "false")
+    stats = ProcessingStats()
+
+    prepared = ImageProcessor(stats=stats).prepare_for_platforms(PNG_SIGNATURE + b"datos", ["facebook", "instagram"])
+
+    assert set(prepared) == {"facebook", "instagram"}
+    assert prepared["facebook"]["data"] == PNG_SIGNATURE + b"datos"
+    assert prepared["facebook"]["processed"] is False
+    assert prepared["facebook"]["saved_bytes"] == 0
+    assert stats.stats()["skipped"] == 1
+
+
+def test_recompressed_to_jpeg_at_the_platform_size():
+    processed = process_image(png(2048, 1024), image_spec("facebook"))
+
+    assert processed["content_type"] == "image/jpeg"
+    assert processed["data"].startswith(b"\xff\xd8\xff")
+    assert (processed["width"], processed["height"]) == (1200, 630)
+
+
+def test_images_are_never_upscaled():
+    processed = process_image(png(600, 315), image_spec("facebook"))
+
+    assert (processed["width"], processed["height"]) == (600, 315)
@@ -0,0 +1,93 @@
+import hashlib
+import types
+
+import pytest
+
+from src.services import image_relay
+from src.services.image_relay import ImageRelay, ImageRelayError, RelayStats
+
+
+class FakeSource:
+    def __init__(self, payload, headers):
+        self.payload = payload
+        self.headers = headers
+        self.closed = False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for index in range(0, len(self.payload), chunk_size):
+            yield self.payload[index:index + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def upload(monkeypatch):
+    uploads = []
+
+    def post(url, data, headers, timeout):
+        uploads.append({"length": len(data) if hasattr(data, "__len__") else None, "body": b"".join(data)})
+        return types.SimpleNamespace(status_code=200, json=lambda: {"id": "123"})
+
+    def serve(payload, **headers):
+        source = FakeSource(payload, {"Content-Type": "image/png", **headers})
+        monkeypatch.setattr(image_relay.requests, "get", lambda url, stream, timeout: source)
+        return source
+
+    monkeypatch.setattr(image_relay.requests, "post", post)
+    return serve, uploads
+
+
+def test_image_is_streamed_into_the_multipart_body(upload):
+    serve, uploads = upload
+    payload = bytes(range(256)) * 40
+    serve(payload, **{"Content-Length": str(len(payload))})
+    stats = RelayStats()
+
+    response, report = ImageRelay(chunk_size=1024, buffer_chunks=2, stats=stats).relay(
+        "https://origen/img.png", "https://graph/photos", fields={"published": "false"}
+    )
+
+    assert response.status_code == 200
+    assert payload in uploads[0]["body"]
+    assert b'name="published"\r\n\r\nfalse' in uploads[0]["body"]
+    assert uploads[0]["length"] == len(uploads[0]["body"])
+    assert report["bytes"] == len(payload)
+    assert report["sha256"] == hashlib.sha256(payload).hexdigest()
+    assert report["peak_buffered_bytes"] <= 2 * 1024
+    assert stats.stats()["relays"] == 1
+
+
+def test_declared_size_over_the_limit_is_rejected_before_uploading(upload):
+    serve, uploads = upload
+    source = serve(b"x" * 10, **{"Content-Length": "5000"})
+
+    with pytest.raises(ImageRelayError, match="máximo es 4096"):
+        ImageRelay(max_bytes=4096).relay("https://origen/img.png", "https://graph/photos")
+
+    assert uploads == []
+    assert source.closed
+
+
+def test_streamed_size_over_the_limit_aborts_the_upload(upload):
+    serve, uploads = upload
+    serve(b"x" * 5000)
+    stats = RelayStats()
+
+    with pytest.raises(ImageRelayError, match="excede el máximo de 4096"):
+        ImageRelay(chunk_size=1024, max_bytes=4096, stats=stats).relay(
+            "https://origen/img.png", "https://graph/photos"
+        )
+
+    assert stats.stats()["failed"] == 1
+
+
+def test_truncated_download_is_an_error(upload):
+    serve, _ = upload
+    serve(b"x" * 50, **{"Content-Length": "100"})
+
+    with pytest.raises(ImageRelayError, match="incompleta"):
+        ImageRelay().relay("https://origen/img.png", "https://graph/photos")
@@ -0,0 +1,257 @@
+import json
+import threading
+import types
+
+import pytest
+
+from src.services.asset_store import AssetStore
+from src.services.image_processing import image_spec, variant_key
+from src.services.intelligent_publisher import IntelligentPublisher
+from src.services.llm_adapter import LLMAdapter
+
+COMMAND = "Publica en Facebook e Instagram sobre el nuevo café con una imagen moderna"
+
+
+@pytest.fixture(autouse=True)
+def no_stores(monkeypatch):
+    monkeypatch.setenv("ASSET_STORE_ENABLED", "false")
+    monkeypatch.setenv("RUN_STORE_ENABLED", "false")
+
+
+def make_publisher(monkeypatch, generation_mode="per_platform"):
+    monkeypatch.setattr(LLMAdapter, "DEFAULT_GENERATION_MODE", generation_mode)
+    publisher = IntelligentPublisher("sk-test", one_shot=False)
+    generated = []
+
+    def generate_content(analysis):
+        generated.append(list(analysis["platforms"]))
+        return {platform: {"text": f"texto para {platform}"} for platform in analysis["platforms"]}
+
+    publisher._generate_content = generate_content
+    publisher._request_image = lambda prompt, platforms: {"prompt_hash": "h", "asset": None, "dalle_url": "u"}
+    publisher._upload_image = lambda image, platforms: {platform: "123" for platform in platforms}
+    publisher._publish_to_platform = lambda platform, content, image_url, checkpoints=None: {
+        "status": "published",
+        "text": content["text"],
+        "image_url": image_url,
+    }
+    return publisher, generated
+
+
+def stage_names(publisher):
+    return [stage.name for stage in publisher._build_stages(COMMAND, publish=True)]
+
+
+def test_paid_and_non_idempotent_stages_are_not_retried(monkeypatch):
+    publisher, _ = make_publisher(monkeypatch)
+    stages = {stage.name: stage for stage in publisher._build_stages(COMMAND, publish=True)}
+
+    assert IntelligentPublisher.STAGE_POLICIES["image_generate"]["retries"] == 0
+    assert stages["image:generate"].retries == 0
+    assert stages["analyze"].retries == 0
+    assert all(stages[f"content:{platform}"].retries == 0 for platform in ("facebook", "instagram", "linkedin"))
+    assert all(stages[f"publish:{platform}"].retries == 0 for platform in ("facebook", "instagram", "linkedin"))
+
+
+def test_per_platform_mode_has_a_content_stage_per_platform(monkeypatch):
+    publisher, generated = make_publisher(monkeypatch)
+
+    assert {"content:facebook", "content:instagram", "content:linkedin"} <= set(stage_names(publisher))
+
+    result = publisher.process_natural_command(COMMAND)
+
+    assert result["success"]
+    assert sorted(generated) == [["facebook"], ["instagram"]]
+
+
+def test_combined_mode_keeps_a_single_content_stage(monkeypatch):
+    publisher, generated = make_publisher(monkeypatch, generation_mode="combined")
+
+    names = stage_names(publisher)
+    assert "content" in names
+    assert not any(name.startswith("content:") for name in names)
+
+    result = publisher.process_natural_command(COMMAND)
+
+    assert result["success"]
+    assert generated == [["facebook", "instagram"]]
+    assert result["generated_content"]["instagram"] == {"text": "texto para instagram"}
+    assert result["publication_results"]["facebook"]["status"] == "published"
+
+
+def test_failed_publish_is_reported_without_blocking_other_platforms(monkeypatch):
+    publisher, _ = make_publisher(monkeypatch)
+    publish = publisher._publish_to_platform
+
+    def flaky_publish(platform, content, image_url, checkpoints=None):
+        if platform == "instagram":
+            raise Exception("API caída")
+        return publish(platform, content, image_url, checkpoints)
+
+    publisher._publish_to_platform = flaky_publish
+    result = publisher.process_natural_command(COMMAND)
+
+    assert result["success"]
+    assert result["publication_results"]["facebook"]["status"] == "published"
+    assert result["publication_results"]["instagram"] == {
+        "status": "failed",
+        "error": "API caída",
+        "elapsed_seconds": result["publication_results"]["instagram"]["elapsed_seconds"],
+    }
+
+
+
+def llm_analysis(monkeypatch, content):
+    publisher = IntelligentPublisher("sk-test", one_shot=False)
+    publisher.FAST_PATH_MIN_CONFIDENCE = 1.1
+
+    async def acreate_completion(operation, tier=None, **params):
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=content), finish_reason="stop")]
+        )
+
+    monkeypatch.setattr(publisher.llm_adapter, "acreate_completion", acreate_completion)
+    return publisher._analyze_command(COMMAND)
+
+
+@pytest.mark.parametrize("content", [
+    '{"platforms": "facebook", "title": "Café", "content": "Nuevo café"}',
+    '{"platforms": ["tiktok"], "title": "Café", "content": "Nuevo café"}',
+    '{"platforms": ["facebook"], "content": "Nuevo café"}',
+    '{"platforms": ["facebook"], "title": "Café", "content": "Nuevo café", "needs_image": true}',
+])
+def test_invalid_llm_analysis_falls_back_to_local_parser(monkeypatch, content):
+    analysis = llm_analysis(monkeypatch, content)
+
+    assert analysis["analysis_source"] == "fallback"
+    assert analysis["platforms"] == ["facebook", "instagram"]
+
+
+def test_llm_analysis_is_normalized(monkeypatch):
+    analysis = llm_analysis(
+        monkeypatch,
+        '{"platforms": ["Facebook", "facebook"], "title": " Café ", "content": "Nuevo café",'
+        ' "needs_image": "true", "image_prompt": "taza moderna"}',
+    )
+
+    assert analysis == {
+        "platforms": ["facebook"],
+        "title": "Café",
+        "content": "Nuevo café",
+        "needs_image": True,
+        "image_prompt": "taza moderna",
+        "analysis_source": "llm",
+    }
+
+
+def test_image_is_generated_while_content_is_written(monkeypatch):
+    publisher, _ = make_publisher(monkeypatch, generation_mode="combined")
+    both_running = threading.Barrier(2, timeout=5)
+    generate_content, request_image = publisher._generate_content, publisher._request_image
+
+    def overlapping(step):
+        def run(*args):
+            both_running.wait()
+            return step(*args)
+        return run
+
+    publisher._generate_content = overlapping(generate_content)
+    publisher._request_image = overlapping(request_image)
+
+    result = publisher.process_natural_command(COMMAND)
+
+    assert result["success"]
+    assert result["publication_results"]["instagram"]["image_url"]
+
+
+def test_platform_images_are_derived_once_per_format_and_reused(monkeypatch, tmp_path):
+    publisher, _ = make_publisher(monkeypatch)
+    publisher.asset_store = AssetStore(str(tmp_path / "assets.sqlite3"))
+    uploads = []
+    derived = []
+
+    def variant(platform):
+        key = variant_key(image_spec(platform))
+        return {
+            "data": key.encode(),
+            "content_type": "image/jpeg",
+            "sha256": key,
+            "variant_key": key,
+            "processed": True,
+            "fit": "crop",
+            "bytes": 10,
+            "original_bytes": 100,
+            "saved_bytes": 90,
+        }
+
+    def prepare_for_platforms(data, platforms):
+        derived.extend(platforms)
+        return {platform: variant(platform) for platform in platforms}
+
+    def upload(image_bytes, content_type):
+        uploads.append(image_bytes)
+        return f"photo-{len(uploads)}"
+
+    monkeypatch.setattr(publisher.image_processor, "prepare_for_platforms", prepare_for_platforms)
+    publisher._upload_image_bytes_to_facebook = upload
+    stored = {"variants": {variant_key(image_spec("instagram")): {"facebook_photo_id": "ig-photo"}}}
+
+    photo_ids = publisher._derive_platform_images(
+        "master", stored, ["facebook", "instagram", "linkedin"], master_bytes=b"maestra"
+    )
+
+    assert photo_ids == {"facebook": "photo-1", "instagram": "ig-photo", "linkedin": "photo-1"}
+    assert derived == ["facebook", "linkedin"]
+    assert len(uploads) == 1
+
+    refs = publisher.asset_store.find_by_content("master")["refs"]
+    assert publisher._derive_platform_images("master", refs, ["linkedin"]) == {"linkedin": "photo-1"}
+    assert len(uploads) == 1
+
+
+def one_shot_publisher(monkeypatch, responses):
+    publisher, generated = make_publisher(monkeypatch)
+    publisher.one_shot = publisher.combined_content = True
+    publisher.FAST_PATH_MIN_CONFIDENCE = 1.1
+    operations = []
+
+    async def acreate_completion(operation, tier=None, **params):
+        operations.append(operation)
+        content = responses.pop(0)
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=content), finish_reason="stop")]
+        )
+
+    monkeypatch.setattr(publisher.llm_adapter, "acreate_completion", acreate_completion)
+    return publisher, generated, operations
+
+
+def test_one_shot_analyzes_and_writes_in_one_call(monkeypatch):
+    response = json.dumps({
+        "platforms": ["facebook", "instagram"],
+        "title": "Café",
+        "content": "Nuevo café",
+        "needs_image": False,
+        "posts": {"facebook": {"text": "Nuevo café en Facebook", "hashtags": ["#cafe"]}},
+    })
+    publisher, generated, operations = one_shot_publisher(monkeypatch, [response])
+
+    result = publisher.process_natural_command(COMMAND)
+
+    assert result["success"]
+    assert operations == ["one_shot"]
+    assert result["analysis"]["analysis_source"] == "one_shot"
+    assert result["generated_content"]["facebook"]["text"] == "Nuevo café en Facebook"
+    assert generated == [["instagram"]]
+
+
+def test_invalid_one_shot_response_falls_back_to_the_analysis(monkeypatch):
+    analysis = json.dumps({"platforms": ["linkedin"], "title": "Café", "content": "Nuevo café", "needs_image": False})
+    publisher, generated, operations = one_shot_publisher(monkeypatch, ['{"posts": {}}', analysis])
+
+    result = publisher.process_natural_command(COMMAND)
+
+    assert result["success"]
+    assert operations == ["one_shot", "analyze_command"]
+    assert result["analysis"]["analysis_source"] == "llm"
+    assert generated == [["linkedin"]]
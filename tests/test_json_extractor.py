@@ -0,0 +1,62 @@
+import pytest
+
+from src.services.json_extractor import IncrementalJSONExtractor, JSONExtractionError, extract_json
+
+
+def test_extracts_object_inside_markdown_with_trailing_commas():
+    text = 'Aquí tienes:\n```json\n{"text": "hola", "hashtags": ["#a", "#b",],}\n```\nSaludos'
+    assert extract_json(text) == {"text": "hola", "hashtags": ["#a", "#b"]}
+
+
+def test_smart_quotes_and_literal_newlines():
+    text = '{“text”: “línea uno\nlínea dos”, "tone": "casual"}'
+    assert extract_json(text) == {"text": "línea uno\nlínea dos", "tone": "casual"}
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('{"text": "di "hola" y adiós", "n": 1}', 'di "hola" y adiós'),
+        ('{"text": "quote "here", then more"}', 'quote "here", then more'),
+        ('{"text": "uno, "dos", tres", "n": 1}', 'uno, "dos", tres'),
+        ('{"text": "fin "cita"}', 'fin "cita'),
+    ],
+)
+def test_unescaped_inner_quotes_are_repaired(text, expected):
+    assert extract_json(text)["text"] == expected
+
+
+def test_closing_quote_followed_by_comma_and_next_key():
+    assert extract_json('{"a": "x" , "b": true}') == {"a": "x", "b": True}
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('{"text": "hola mun', {"text": "hola mun"}),
+        ('{"text": "hola", "hashtags": ["#a", "#b', {"text": "hola", "hashtags": ["#a", "#b"]}),
+        ('{"text": "hola", "tone', {"text": "hola"}),
+        ('{"text": "hola", "tone":', {"text": "hola"}),
+        ('{"n": 12', {"n": 12}),
+        ('{"n": 12.', {"n": 12}),
+        ('{"n": 1.5e', {"n": 1.5}),
+        ('{"ok": tru', {}),
+        ('{"text": "a\\u00e', {"text": "a"}),
+    ],
+)
+def test_truncated_responses_are_closed(text, expected):
+    assert extract_json(text) == expected
+
+
+def test_streaming_matches_full_parse_and_exposes_partials():
+    text = '{"text": "quote "here", then more", "hashtags": ["#x"], "character_count": 23}'
+    extractor = IncrementalJSONExtractor()
+    partials = [extractor.feed(char) for char in text]
+    assert extractor.is_complete and not extractor.was_truncated
+    assert extractor.result() == extract_json(text)
+    assert any(partial.get("text", "").startswith("quote") for partial in partials)
+
+
+def test_missing_object_raises():
+    with pytest.raises(JSONExtractionError):
+        extract_json("no hay JSON aquí")
@@ -0,0 +1,65 @@
+import types
+
+import pytest
+
+from src.services import linkedin_service
+from src.services.asset_store import AssetStore, facebook_photo_url
+from src.services.linkedin_service import LinkedInService
+
+IMAGE = b"\x89PNG\r\n\x1a\nimagen"
+
+
+@pytest.fixture
+def linkedin(monkeypatch, tmp_path):
+    store = AssetStore(str(tmp_path / "assets.sqlite3"))
+    monkeypatch.setattr(linkedin_service, "get_default_asset_store", lambda: store)
+    calls = []
+
+    def get(url):
+        calls.append(("download", url))
+        return types.SimpleNamespace(status_code=200, content=IMAGE)
+
+    def post(url, headers=None, json=None, data=None):
+        if "registerUpload" in url:
+            calls.append(("register", url))
+            return types.SimpleNamespace(status_code=200, json=lambda: {
+                "value": {
+                    "asset": "urn:li:digitalmediaAsset:1",
+                    "uploadMechanism": {
+                        "com.linkedin.digitalmedia.uploading.MediaUploadHttpRequest": {"uploadUrl": "https://upload"}
+                    },
+                }
+            })
+        calls.append(("upload", url))
+        return types.SimpleNamespace(status_code=201, text="")
+
+    monkeypatch.setattr(linkedin_service.requests, "get", get)
+    monkeypatch.setattr(linkedin_service.requests, "post", post)
+    return LinkedInService(), calls
+
+
+def test_uploaded_asset_is_reused_by_url_after_token_rotation(linkedin):
+    service, calls = linkedin
+
+    assert service.upload_image(facebook_photo_url("123", "OLD"), "persona") == "urn:li:digitalmediaAsset:1"
+    assert [call[0] for call in calls] == ["download", "register", "upload"]
+
+    assert service.upload_image(facebook_photo_url("123", "ROTATED"), "persona") == "urn:li:digitalmediaAsset:1"
+    assert len(calls) == 3
+
+
+def test_same_bytes_from_another_url_skip_the_upload(linkedin):
+    service, calls = linkedin
+    service.upload_image(facebook_photo_url("123", "TOKEN"), "persona")
+
+    assert service.upload_image("https://cdn.example.com/copia.png", "persona") == "urn:li:digitalmediaAsset:1"
+    assert [call[0] for call in calls] == ["download", "register", "upload", "download"]
+
+
+def test_assets_are_not_shared_between_people(linkedin):
+    service, calls = linkedin
+    service.upload_image(facebook_photo_url("123", "TOKEN"), "persona")
+
+    service.upload_image(facebook_photo_url("123", "TOKEN"), "otra-persona")
+
+    assert [call[0] for call in calls].count("register") == 2
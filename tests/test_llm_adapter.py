@@ -0,0 +1,247 @@
+import asyncio
+import json
+import types
+
+import pytest
+
+from src.services import llm_adapter
+from src.services.llm_adapter import LLMAdapter
+from src.services.llm_backend import LLMBackend
+from src.services.response_cache import ResponseCache
+from src.services.token_budget import TokenBudgeter
+
+
+def completion(content, finish_reason="stop", completion_tokens=50):
+    return types.SimpleNamespace(
+        choices=[
+            types.SimpleNamespace(message=types.SimpleNamespace(content=content), finish_reason=finish_reason)
+        ],
+        usage=types.SimpleNamespace(prompt_tokens=100, completion_tokens=completion_tokens, total_tokens=150),
+    )
+
+
+def post(text):
+    return json.dumps({"text": text, "hashtags": ["#cafe"], "character_count": len(text), "tone": "cercano"})
+
+
+TRUNCATED = '{"text": "Nuestro nuevo café llega este lunes con'
+
+
+class ScriptedBackend(LLMBackend):
+    """Devuelve las respuestas en orden y registra los parámetros de cada llamada"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def chat_completion(self, **request_params):
+        self.requests.append(request_params)
+        return self.responses.pop(0)
+
+    async def achat_completion(self, **request_params):
+        if request_params.pop("stream", False):
+            self.requests.append(request_params)
+            return self._stream(self.responses.pop(0))
+        return self.chat_completion(**request_params)
+
+    async def _stream(self, response):
+        content = response.choices[0].message.content
+        for index in range(0, len(content), 10):
+            last = index + 10 >= len(content)
+            yield types.SimpleNamespace(
+                choices=[
+                    types.SimpleNamespace(
+                        delta=types.SimpleNamespace(content=content[index:index + 10]),
+                        finish_reason=response.choices[0].finish_reason if last else None,
+                    )
+                ]
+            )
+
+
+class PassThroughHedger:
+    async def run(self, operation, factory):
+        return await factory()
+
+
+@pytest.fixture(autouse=True)
+def isolated_budget(monkeypatch):
+    budgeter = TokenBudgeter(LLMAdapter.PLATFORM_LIMITS)
+    monkeypatch.setattr(llm_adapter, "TOKEN_BUDGETER", budgeter)
+    monkeypatch.setattr(llm_adapter, "HEDGER", PassThroughHedger())
+    return budgeter
+
+
+def make_adapter(responses):
+    backend = ScriptedBackend(responses)
+    return LLMAdapter("sk-test", backend=backend, cache=ResponseCache()), backend
+
+
+def test_truncated_response_is_retried_with_boosted_budget(isolated_budget):
+    adapter, backend = make_adapter(
+        [completion(TRUNCATED, "length", 596), completion(post("Nuestro nuevo café llega este lunes."))]
+    )
+
+    content = adapter.transform_for_platform("Café", "Nuevo café", "facebook")
+
+    first, retry = (request["max_tokens"] for request in backend.requests)
+    assert retry > first
+    assert content["text"] == "Nuestro nuevo café llega este lunes."
+    assert not content.get("needs_regeneration")
+    assert isolated_budget.stats()["facebook"]["truncations"] == 1
+    assert adapter.transform_for_platform("Café", "Nuevo café", "facebook") == content
+    assert len(backend.requests) == 2
+
+
+def test_response_still_truncated_is_marked_and_not_cached():
+    adapter, backend = make_adapter(
+        [completion(TRUNCATED, "length"), completion(TRUNCATED, "length"), completion(post("Completo."))]
+    )
+
+    content = asyncio.run(adapter.atransform_for_platform("Café", "Nuevo café", "instagram"))
+
+    assert content["needs_regeneration"] is True
+    assert len(backend.requests) == 2
+
+    regenerated = asyncio.run(adapter.atransform_for_platform("Café", "Nuevo café", "instagram"))
+
+    assert regenerated["text"] == "Completo."
+    assert len(backend.requests) == 3
+
+
+def test_truncated_stream_completes_with_boosted_retry():
+    adapter, backend = make_adapter(
+        [completion(TRUNCATED, "length"), completion(post("Nuestro nuevo café llega este lunes."))]
+    )
+
+    async def collect():
+        return [event async for event in adapter.astream_for_platform("Café", "Nuevo café", "linkedin")]
+
+    events = asyncio.run(collect())
+
+    assert events[-1]["event"] == "platform_complete"
+    assert events[-1]["content"]["text"] == "Nuestro nuevo café llega este lunes."
+    assert backend.requests[1]["max_tokens"] > backend.requests[0]["max_tokens"]
+    assert adapter._get_cached("Café", "Nuevo café", "linkedin", adapter.preference) is not None
+
+
+def test_run_coroutine_sync_inside_a_running_loop():
+    async def answer():
+        return 42
+
+    async def caller():
+        return llm_adapter.run_coroutine_sync(answer())
+
+    assert llm_adapter.run_coroutine_sync(answer()) == 42
+    assert asyncio.run(caller()) == 42
+
+
+@pytest.mark.parametrize("platform, material, preference, tier", [
+    ("facebook", "Nuevo café", "balanced", "fast"),
+    ("facebook", "x" * LLMAdapter.LONG_MATERIAL_CHARS, "balanced", "standard"),
+    ("linkedin", "Nuevo café", "balanced", "standard"),
+    ("linkedin", "Nuevo café", "quality", "quality"),
+    ("linkedin", "x" * LLMAdapter.LONG_MATERIAL_CHARS, "quality", "quality"),
+    ("facebook", "Nuevo café", "latency", "fast"),
+])
+def test_select_model_tier(platform, material, preference, tier):
+    adapter, _ = make_adapter([])
+
+    assert adapter.select_model_tier(platform, material, preference) == tier
+
+
+def combined(*platforms):
+    return completion(json.dumps({platform: json.loads(post(f"Café en {platform}.")) for platform in platforms}))
+
+
+def test_combined_sections_are_cached_under_the_model_used():
+    adapter, backend = make_adapter([
+        combined("facebook", "linkedin"),
+        completion(post("Café solo en Facebook.")),
+    ])
+    request = dict(heading="Café", material="Nuevo café", target_platforms=["facebook", "linkedin"])
+
+    first = adapter.transform_for_multiple_platforms(**request, generation_mode="combined")
+    assert backend.requests[0]["model"] == adapter.model_tiers["standard"]
+
+    assert adapter.transform_for_multiple_platforms(**request, generation_mode="combined") == first
+    assert len(backend.requests) == 1
+
+    alone = adapter.transform_for_platform("Café", "Nuevo café", "facebook")
+
+    assert alone["text"] == "Café solo en Facebook."
+    assert backend.requests[1]["model"] == adapter.model_tiers["fast"]
+
+
+def test_combined_mode_uses_one_call_and_regenerates_missing_sections():
+    adapter, backend = make_adapter([
+        combined("facebook", "instagram"),
+        completion(post("Café en LinkedIn.")),
+    ])
+
+    results = adapter.transform_for_multiple_platforms(
+        "Café", "Nuevo café", ["facebook", "instagram", "linkedin"], generation_mode="combined", use_cache=False
+    )
+
+    assert [results[platform]["text"] for platform in ("facebook", "instagram", "linkedin")] == [
+        "Café en facebook.", "Café en instagram.", "Café en LinkedIn."
+    ]
+    assert len(backend.requests) == 2
+    assert "linkedin" in json.dumps(backend.requests[0]["messages"], ensure_ascii=False).lower()
+    assert backend.requests[1]["max_tokens"] == llm_adapter.TOKEN_BUDGETER.budget("linkedin")
+
+
+def test_invalid_generation_mode_is_rejected():
+    with pytest.raises(ValueError):
+        LLMAdapter("sk-test", backend=ScriptedBackend([]), cache=ResponseCache(), generation_mode="batch")
+
+
+def test_use_cache_false_bypasses_and_refreshes_the_cache():
+    adapter, backend = make_adapter([completion(post("Primera.")), completion(post("Segunda."))])
+
+    adapter.transform_for_platform("Café", "Nuevo café", "facebook")
+    fresh = adapter.transform_for_platform("Café", "Nuevo café", "facebook", use_cache=False)
+
+    assert fresh["text"] == "Segunda."
+    assert len(backend.requests) == 2
+    assert adapter.transform_for_platform("Café", "Nuevo café", "facebook")["text"] == "Segunda."
+
+
+def test_stream_for_multiple_platforms_emits_deltas_then_final_content():
+    adapter, backend = make_adapter([completion(post("Nuestro nuevo café llega este lunes."))])
+
+    async def collect():
+        return [
+            event async for event in adapter.astream_for_multiple_platforms(
+                "Café", "Nuevo café", ["facebook", "myspace"]
+            )
+        ]
+
+    events = asyncio.run(collect())
+
+    deltas = [event["text"] for event in events if event["event"] == "delta"]
+    complete = [event for event in events if event["event"] == "platform_complete"]
+    errors = [event for event in events if event["event"] == "platform_error"]
+    assert "".join(deltas) == "Nuestro nuevo café llega este lunes."
+    assert len(deltas) > 1
+    assert [event["platform"] for event in complete] == ["facebook"]
+    assert complete[0]["content"]["text"] == "Nuestro nuevo café llega este lunes."
+    assert [event["platform"] for event in errors] == ["myspace"]
+
+    cached = asyncio.run(collect())
+
+    assert [event["event"] for event in cached if event["platform"] == "facebook"] == ["platform_complete"]
+    assert len(backend.requests) == 1
+
+
+def test_long_material_is_digested_once_and_reused_across_platforms():
+    material = "El nuevo café de especialidad llega el lunes a todas las tiendas. " * 60
+    digest = completion(json.dumps({"summary": "Café de especialidad desde el lunes", "key_facts": ["Todas las tiendas"]}))
+    adapter, backend = make_adapter([digest] + [completion(post("Café nuevo."))] * 3)
+
+    adapter.transform_for_multiple_platforms("Café", material, ["facebook", "linkedin"], use_digest=True)
+    adapter.transform_for_multiple_platforms("Café", material, ["instagram"], use_digest=True)
+
+    assert len(backend.requests) == 4
+    platform_prompts = [request["messages"][-1]["content"] for request in backend.requests[1:]]
+    assert all("RESUMEN: Café de especialidad desde el lunes" in prompt for prompt in platform_prompts)
+    assert all(material.strip() not in prompt for prompt in platform_prompts)
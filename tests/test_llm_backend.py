@@ -0,0 +1,53 @@
+import json
+import random
+
+import pytest
+
+from src.services.llm_adapter import LLMAdapter
+from src.services.llm_backend import OpenAIBackend, create_backend
+from src.services.prompt_registry import PromptRegistry
+from src.services.standin_server import LatencyModel, build_canned_content
+
+REGISTRY = PromptRegistry(LLMAdapter.PLATFORM_LIMITS)
+
+
+def test_canned_content_follows_the_platform_prompt():
+    content = json.loads(build_canned_content(REGISTRY.build_messages("Café", "Nuevo café", "instagram"), []))
+
+    assert content["text"] == "✨ Café\n\nNuevo café"
+    assert content["character_count"] == len(content["text"])
+    assert set(REGISTRY.get_response_format("instagram")) <= set(content)
+
+
+def test_canned_content_for_combined_prompt_parses_as_sections():
+    messages = REGISTRY.build_combined_messages("Café", "Nuevo café", ["linkedin", "facebook"])
+    adapter = LLMAdapter("sk-test")
+
+    sections = adapter._parse_combined_response(build_canned_content(messages, []), ["facebook", "linkedin"])
+
+    assert set(sections) == {"facebook", "linkedin"}
+
+
+def test_first_matching_canned_response_wins():
+    messages = REGISTRY.build_messages("Café", "Nuevo café", "facebook")
+    rules = [{"match": "Nuevo café", "content": {"text": "fijo"}}, {"match": "Café", "content": "otro"}]
+
+    assert json.loads(build_canned_content(messages, rules)) == {"text": "fijo"}
+
+
+def test_latency_model_specs():
+    rng = random.Random(1)
+
+    assert LatencyModel("fixed:0.5", rng).sample() == 0.5
+    assert 1 <= LatencyModel("uniform:1,2", rng).sample() <= 2
+    with pytest.raises(ValueError):
+        LatencyModel("normal:1,2", rng)
+
+
+def test_base_url_redirects_the_backend(monkeypatch):
+    monkeypatch.setenv("OPENAI_BASE_URL", "http://localhost:8100/v1")
+
+    backend = create_backend("local")
+
+    assert isinstance(backend, OpenAIBackend)
+    assert str(backend.client.base_url).startswith("http://localhost:8100/v1")
@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+from src.services.material_digest import split_into_chunks
+from src.services.token_estimator import estimate_tokens
+
+WORDS = "café tienda lanzamiento producto evento cliente mercado ciudad equipo proyecto precio horario".split()
+
+
+def build_paragraphs(seed, count=12, sentences=22):
+    rnd = random.Random(seed)
+    return [
+        " ".join(
+            f"Sección {i}, punto {j}: " + " ".join(rnd.choice(WORDS) for _ in range(20)) + "."
+            for j in range(sentences)
+        )
+        for i in range(count)
+    ]
+
+
+def test_chunks_respect_max_tokens_and_keep_all_text():
+    material = "\n\n".join(build_paragraphs(0))
+    chunks = split_into_chunks(material, 3000)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 3000 for chunk in chunks)
+    assert "".join(chunks).replace("\n", "").replace(" ", "") == material.replace("\n", "").replace(" ", "")
+
+
+def test_chunks_end_at_sentence_boundaries():
+    chunks = split_into_chunks("\n\n".join(build_paragraphs(1)), 1000)
+
+    assert all(chunk[-1] in ".!?:;" for chunk in chunks)
+
+
+def test_edit_only_invalidates_its_own_chunk():
+    paragraphs = build_paragraphs(2)
+    before = split_into_chunks("\n\n".join(paragraphs), 3000)
+
+    edited = list(paragraphs)
+    edited[6] = edited[6].replace("Sección 6, punto 10:", "Sección 6, punto 10 (actualizado):")
+    after = split_into_chunks("\n\n".join(edited), 3000)
+
+    changed = [chunk for chunk in after if chunk not in before]
+    assert len(changed) == 1
+    assert "(actualizado)" in changed[0]
+    assert len(after) == len(before)
+
+
+def test_growing_the_first_section_keeps_later_chunks():
+    paragraphs = build_paragraphs(3)
+    before = split_into_chunks("\n\n".join(paragraphs), 3000)
+
+    edited = list(paragraphs)
+    edited[0] = " ".join(f"Sección 0, nuevo punto {j}: precio y horario del evento." for j in range(25)) + " " + edited[0]
+    after = split_into_chunks("\n\n".join(edited), 3000)
+
+    reused = [chunk for chunk in after if chunk in before]
+    assert len(reused) >= len(before) - 1
+    assert after[-len(reused):] == before[-len(reused):]
+
+
+def test_oversized_sentence_is_split():
+    chunks = split_into_chunks("palabra " * 2000, 200)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 200 for chunk in chunks)
+
+
+def test_invalid_max_tokens():
+    with pytest.raises(ValueError):
+        split_into_chunks("texto", 0)
@@ -0,0 +1,46 @@
+from src.services.llm_adapter import LLMAdapter
+from src.services.prompt_registry import PromptRegistry
+
+
+def make_registry():
+    return PromptRegistry(LLMAdapter.PLATFORM_LIMITS)
+
+
+def test_system_prompt_is_static_and_material_goes_last():
+    registry = make_registry()
+
+    first = registry.build_messages("Café", "Nuevo café", "linkedin")
+    second = registry.build_messages("Evento", "Otro material", "linkedin")
+
+    assert first[0] == second[0]
+    assert "Nuevo café" not in first[0]["content"]
+    assert first[-1] == {"role": "user", "content": "ENCABEZADO: Café\nMATERIAL: Nuevo café"}
+    assert str(LLMAdapter.PLATFORM_LIMITS["linkedin"]) in first[0]["content"]
+
+
+def test_combined_prompt_shares_prefix_regardless_of_platform_order():
+    registry = make_registry()
+
+    forward = registry.build_combined_messages("Café", "Nuevo café", ["facebook", "linkedin"])
+    backward = registry.build_combined_messages("Café", "Nuevo café", ["linkedin", "facebook"])
+
+    assert forward == backward
+    assert "### FACEBOOK" in forward[0]["content"] and "### LINKEDIN" in forward[0]["content"]
+    assert "### INSTAGRAM" not in forward[0]["content"]
+
+
+def test_response_format_is_a_copy():
+    registry = make_registry()
+
+    registry.get_response_format("facebook")["text"] = "cambiado"
+
+    assert registry.get_response_format("facebook")["text"] != "cambiado"
+
+
+def test_token_report_covers_every_template():
+    report = make_registry().token_report()
+
+    assert {f"platform:{platform}" for platform in LLMAdapter.PLATFORM_LIMITS} | {"combined:all"} <= set(
+        report["templates"]
+    )
+    assert all(template["tokens"] > 0 for template in report["templates"].values())
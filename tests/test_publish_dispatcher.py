@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pytest
+
+from src.services.publish_dispatcher import ensure_published, publish_concurrently
+
+
+@pytest.mark.parametrize(
+    "response",
+    [{"id": "123"}, {"id": "1_2", "post_id": "1_2"}, {"success": True, "data": {"id": "urn:li:share:1"}}],
+)
+def test_confirmed_publications(response):
+    assert ensure_published("facebook", response) is response
+
+
+@pytest.mark.parametrize(
+    "response",
+    [{"error": {"message": "Invalid OAuth access token"}}, {"success": False, "error": "401"}, {}, None],
+)
+def test_error_responses_raise(response):
+    with pytest.raises(Exception, match="Error publicando en facebook"):
+        ensure_published("facebook", response)
+
+
+def test_each_platform_has_its_own_timeout():
+    release = threading.Event()
+
+    def publish(platform):
+        if platform == "instagram":
+            release.wait(5)
+        if platform == "linkedin":
+            raise Exception("401")
+        return {"status": "published", "platform": platform}
+
+    started = time.monotonic()
+    try:
+        results = publish_concurrently(
+            ["facebook", "instagram", "linkedin"], publish, timeouts={"instagram": 0.2}
+        )
+    finally:
+        release.set()
+
+    assert time.monotonic() - started < 2
+    assert results["facebook"]["status"] == "published"
+    assert results["instagram"]["status"] == "timeout"
+    assert results["instagram"]["elapsed_seconds"] == 0.2
+    assert (results["linkedin"]["status"], results["linkedin"]["error"]) == ("failed", "401")
+    assert list(results) == ["facebook", "instagram", "linkedin"]
+
+
+def test_platforms_are_published_concurrently():
+    all_started = threading.Barrier(3, timeout=5)
+
+    def publish(platform):
+        all_started.wait()
+        return {"status": "published"}
+
+    results = publish_concurrently(["facebook", "instagram", "linkedin", "facebook"], publish)
+
+    assert [result["status"] for result in results.values()] == ["published"] * 3
@@ -0,0 +1,50 @@
+from src.services.response_cache import ResponseCache
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", {"text": "a"})
+    cache.set("b", {"text": "b"})
+    cache.get("a")
+    cache.set("c", {"text": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"text": "a"}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disk_tier_survives_a_new_instance(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite3")
+    ResponseCache(db_path=db_path).set("key", {"text": "guardado"})
+
+    cache = ResponseCache(db_path=db_path)
+
+    assert cache.get("key") == {"text": "guardado"}
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.get("key") == {"text": "guardado"}
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_expired_entries_are_misses():
+    cache = ResponseCache()
+    cache.set("key", {"text": "viejo"}, ttl_seconds=-1)
+
+    assert cache.get("key") is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_cached_values_are_copies():
+    cache = ResponseCache()
+    value = {"hashtags": ["#cafe"]}
+    cache.set("key", value)
+    value["hashtags"].append("#otro")
+    cache.get("key")["hashtags"].append("#otro")
+
+    assert cache.get("key") == {"hashtags": ["#cafe"]}
+
+
+def test_build_key_is_stable_and_content_addressed():
+    key = ResponseCache.build_key(heading="Café", platform="facebook")
+
+    assert key == ResponseCache.build_key(platform="facebook", heading="Café")
+    assert key != ResponseCache.build_key(heading="Café ", platform="facebook")
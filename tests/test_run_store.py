@@ -0,0 +1,217 @@
+import time
+
+import pytest
+
+from src.services.content_publisher import ContentPublisher
+from src.services.intelligent_publisher import IntelligentPublisher
+from src.services.run_store import RunConflictError, RunStore
+
+COMMAND = "Publica en Facebook e Instagram sobre el nuevo café con una imagen moderna"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RunStore(str(tmp_path / "runs.sqlite3"))
+
+
+@pytest.fixture(autouse=True)
+def no_default_stores(monkeypatch):
+    monkeypatch.setenv("ASSET_STORE_ENABLED", "false")
+    monkeypatch.setenv("RUN_STORE_ENABLED", "false")
+
+
+def test_completed_stages_are_reused(store):
+    checkpoints = store.start("run", "smart_publish", command="hola")
+    checkpoints.save("analyze", {"platforms": ["facebook"]})
+
+    resumed = store.start("run", "smart_publish", command="hola")
+
+    assert "analyze" in resumed
+    assert resumed.reuse("analyze") == {"platforms": ["facebook"]}
+    assert resumed.reused == ["analyze"]
+    assert store.stats()["resumed_runs"] == 1
+
+
+def test_run_id_of_another_request_is_a_conflict(store):
+    store.start("run", "smart_publish", command="hola")
+
+    with pytest.raises(RunConflictError):
+        store.start("run", "smart_publish", command="otro comando")
+    with pytest.raises(ValueError):
+        store.start("run", "generate_content", command="hola")
+
+
+def test_expired_runs_start_over(tmp_path):
+    store = RunStore(str(tmp_path / "runs.sqlite3"), ttl_seconds=0.01)
+    store.start("run", "smart_publish", command="hola").save("analyze", {})
+    time.sleep(0.02)
+
+    assert "analyze" not in store.start("run", "smart_publish", command="hola")
+
+
+def make_content_publisher(store, content_attempts, publish_failures):
+    publisher = ContentPublisher("sk-test")
+    publisher.run_store = store
+    generated, published = [], []
+
+    def transform(heading, material, target_platforms, **kwargs):
+        generated.append(list(target_platforms))
+        available = content_attempts.pop(0)
+        return {platform: {"text": f"texto {platform}"} for platform in target_platforms if platform in available}
+
+    def publish(platform, content, image_url=None, checkpoints=None):
+        published.append(platform)
+        if platform in publish_failures:
+            raise Exception(f"{platform} no disponible")
+        return {"status": "published", "platform": platform}
+
+    publisher.llm_adapter.transform_for_multiple_platforms = transform
+    publisher._publish_to_platform = publish
+    return publisher, generated, published
+
+
+def test_content_run_resumes_a_platform_without_content(store):
+    publisher, generated, published = make_content_publisher(
+        store, content_attempts=[["facebook"], ["instagram"]], publish_failures=[]
+    )
+    request = dict(heading="Café", material="Nuevo café", platforms=["facebook", "instagram"], auto_publish=True)
+
+    first = publisher.generate_and_publish(**request)
+
+    assert first["missing_platforms"] == ["instagram"]
+    assert first["publication_results"]["facebook"]["status"] == "published"
+    assert first["publication_results"]["instagram"]["status"] == "failed"
+
+    second = publisher.generate_and_publish(**request, run_id=first["run_id"])
+
+    assert generated == [["facebook", "instagram"], ["instagram"]]
+    assert published == ["facebook", "instagram"]
+    assert second["missing_platforms"] == []
+    assert set(second["generated_content"]) == {"facebook", "instagram"}
+    assert second["publication_results"]["instagram"]["status"] == "published"
+    assert set(second["resumed_stages"]) == {"content:facebook", "publish:facebook"}
+
+
+def test_content_run_retries_only_failed_publications(store):
+    failures = ["instagram"]
+    publisher, generated, published = make_content_publisher(
+        store, content_attempts=[["facebook", "instagram"]], publish_failures=failures
+    )
+    request = dict(heading="Café", material="Nuevo café", platforms=["facebook", "instagram"], auto_publish=True)
+
+    first = publisher.generate_and_publish(**request)
+    assert first["publication_results"]["instagram"]["status"] == "failed"
+
+    failures.clear()
+    second = publisher.generate_and_publish(**request, run_id=first["run_id"])
+
+    assert generated == [["facebook", "instagram"]]
+    assert sorted(published) == ["facebook", "instagram", "instagram"]
+    assert second["publication_results"]["instagram"]["status"] == "published"
+
+
+def test_content_run_id_conflict_is_not_wrapped(store):
+    publisher, _, _ = make_content_publisher(store, content_attempts=[["facebook"]], publish_failures=[])
+    first = publisher.generate_and_publish(heading="Café", material="Nuevo café", platforms=["facebook"])
+
+    with pytest.raises(RunConflictError):
+        publisher.generate_and_publish(
+            heading="Té", material="Nuevo té", platforms=["facebook"], run_id=first["run_id"]
+        )
+
+
+def make_smart_publisher(store, publish_failures):
+    publisher = IntelligentPublisher("sk-test", one_shot=False)
+    publisher.run_store = store
+    calls = {"content": 0, "image": 0, "publish": []}
+
+    def generate_content(analysis):
+        calls["content"] += 1
+        return {platform: {"text": f"texto {platform}"} for platform in analysis["platforms"]}
+
+    def request_image(prompt, platforms):
+        calls["image"] += 1
+        return {"prompt_hash": "h", "asset": None, "dalle_url": "u"}
+
+    def publish(platform, content, image_url, checkpoints=None):
+        calls["publish"].append(platform)
+        if platform in publish_failures:
+            raise Exception(f"{platform} no disponible")
+        return {"status": "published", "platform": platform}
+
+    publisher._generate_content = generate_content
+    publisher._request_image = request_image
+    publisher._upload_image = lambda image, platforms: {platform: "123" for platform in platforms}
+    publisher._publish_to_platform = publish
+    return publisher, calls
+
+
+def test_smart_publish_resume_after_partial_failure(store):
+    failures = ["instagram"]
+    publisher, calls = make_smart_publisher(store, failures)
+
+    first = publisher.process_natural_command(COMMAND)
+    assert first["publication_results"]["instagram"]["status"] == "failed"
+    assert first["publication_results"]["facebook"]["status"] == "published"
+
+    failures.clear()
+    second = publisher.process_natural_command(COMMAND, run_id=first["run_id"])
+
+    assert second["publication_results"]["instagram"]["status"] == "published"
+    assert calls["content"] == 2
+    assert calls["image"] == 1
+    assert sorted(calls["publish"]) == ["facebook", "instagram", "instagram"]
+    assert {"analyze", "image:generate", "image:upload", "publish:facebook"} <= set(second["resumed_stages"])
+
+
+def test_smart_publish_run_id_conflict_propagates(store):
+    publisher, _ = make_smart_publisher(store, [])
+    first = publisher.process_natural_command(COMMAND)
+
+    with pytest.raises(RunConflictError):
+        publisher.process_natural_command("Publica en LinkedIn sobre otra cosa", run_id=first["run_id"])
+
+
+def test_publish_error_response_is_not_checkpointed(store, monkeypatch):
+    from src.services import content_publisher
+
+    responses = [{"error": {"message": "Invalid OAuth access token"}}, {"id": "1_2"}]
+    monkeypatch.setattr(content_publisher, "facebook_post_text", lambda text: responses.pop(0))
+    publisher = ContentPublisher("sk-test")
+    publisher.run_store = store
+    publisher.llm_adapter.transform_for_multiple_platforms = lambda heading, material, target_platforms, **kwargs: {
+        platform: {"text": "texto"} for platform in target_platforms
+    }
+    request = dict(heading="Café", material="Nuevo café", platforms=["facebook"], auto_publish=True)
+
+    first = publisher.generate_and_publish(**request)
+    assert first["publication_results"]["facebook"]["status"] == "failed"
+
+    second = publisher.generate_and_publish(**request, run_id=first["run_id"])
+
+    assert second["publication_results"]["facebook"]["status"] == "published"
+    assert second["publication_results"]["facebook"]["response"] == {"id": "1_2"}
+    assert "publish:facebook" not in second["resumed_stages"]
+
+
+def test_temporary_image_url_is_not_checkpointed(store):
+    publisher, calls = make_smart_publisher(store, [])
+    uploads = []
+
+    def upload(image, platforms):
+        uploads.append(image["dalle_url"])
+        if len(uploads) <= publisher.STAGE_POLICIES["image_upload"]["retries"] + 1:
+            raise Exception("Facebook no disponible")
+        return {platform: "123" for platform in platforms}
+
+    publisher._upload_image = upload
+
+    first = publisher.process_natural_command(COMMAND)
+    second = publisher.process_natural_command(COMMAND, run_id=first["run_id"])
+
+    assert calls["image"] == 2
+    assert set(uploads) == {"u"}
+    assert "image:generate" not in second["resumed_stages"]
+    outputs = store.start(second["run_id"], "smart_publish", command=COMMAND, one_shot=False).outputs
+    assert outputs["image:generate"] == {"prompt_hash": "h", "asset": None, "dalle_url": None}
+    assert outputs["image:upload"] == {"facebook": "123", "instagram": "123"}
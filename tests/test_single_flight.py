@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.services.single_flight import SingleFlight
+
+
+def test_concurrent_threads_share_one_execution_and_get_copies():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def generate():
+        calls.append(1)
+        release.wait(2)
+        return {"text": "hola", "hashtags": ["#a"]}
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [pool.submit(flight.do, "clave", generate) for _ in range(5)]
+        time.sleep(0.1)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert all(result == {"text": "hola", "hashtags": ["#a"]} for result in results)
+    results[0]["hashtags"].append("#mutado")
+    assert results[1]["hashtags"] == ["#a"]
+    assert flight.stats()["coalesced"] == 4 and flight.stats()["in_flight"] == 0
+
+
+def test_different_keys_are_not_coalesced():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: {"v": 1}) == {"v": 1}
+    assert flight.do("b", lambda: {"v": 2}) == {"v": 2}
+    assert flight.stats()["executions"] == 2
+
+
+def test_leader_error_reaches_followers_and_next_call_runs_again():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("fallo del LLM")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "clave", failing)
+        started.wait(1)
+        follower = pool.submit(flight.do, "clave", lambda: {"v": "no usado"})
+        for future in (leader, follower):
+            with pytest.raises(ValueError):
+                future.result()
+
+    assert flight.do("clave", lambda: {"v": 1}) == {"v": 1}
+
+
+def test_async_followers_share_result_across_event_loops():
+    flight = SingleFlight()
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        return {"v": 1}
+
+    def run_in_own_loop():
+        return asyncio.run(flight.ado("clave", generate))
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        results = list(pool.map(lambda _: run_in_own_loop(), range(3)))
+
+    assert results == [{"v": 1}] * 3
+    assert len(calls) == 1
+
+
+def test_cancelled_async_leader_hands_over_to_a_follower():
+    flight = SingleFlight()
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        return {"v": len(calls)}
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.ado("clave", generate))
+        await asyncio.sleep(0.05)
+        follower = asyncio.ensure_future(flight.ado("clave", generate))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == {"v": 2}
+    assert len(calls) == 2
@@ -0,0 +1,176 @@
+import threading
+import time
+
+import pytest
+
+from src.services.stage_executor import (
+    BLOCKED,
+    COMPLETED,
+    DISABLED,
+    FAILED,
+    SKIPPED,
+    TIMEOUT,
+    Stage,
+    StageExecutor,
+    StageStats,
+    stage_policy,
+)
+
+
+def statuses(run):
+    return {entry["stage"]: entry["status"] for entry in run["trace"]}
+
+
+def attempts(run):
+    return {entry["stage"]: entry["attempts"] for entry in run["trace"]}
+
+
+def test_dependencies_receive_results_and_independent_stages_overlap():
+    barrier = threading.Barrier(2, timeout=2)
+
+    def branch(value):
+        def run(inputs):
+            barrier.wait()
+            return inputs["root"] + value
+        return run
+
+    run = StageExecutor().run(
+        [
+            Stage("root", lambda inputs: 1),
+            Stage("left", branch(10), deps=["root"]),
+            Stage("right", branch(20), deps=["root"]),
+            Stage("join", lambda inputs: inputs["left"] + inputs["right"], deps=["left", "right"]),
+        ]
+    )
+
+    assert run["results"] == {"root": 1, "left": 11, "right": 21, "join": 32}
+    assert set(statuses(run).values()) == {COMPLETED}
+
+
+def test_failure_blocks_only_dependents():
+    def fail(inputs):
+        raise Exception("sin conexión")
+
+    run = StageExecutor().run(
+        [
+            Stage("root", lambda inputs: "ok"),
+            Stage("broken", fail, deps=["root"]),
+            Stage("after_broken", lambda inputs: "nunca", deps=["broken"]),
+            Stage("sibling", lambda inputs: "ok", deps=["root"]),
+        ]
+    )
+
+    assert statuses(run) == {
+        "root": COMPLETED,
+        "broken": FAILED,
+        "after_broken": BLOCKED,
+        "sibling": COMPLETED,
+    }
+    assert run["errors"]["broken"] == "sin conexión"
+    assert "broken" in run["errors"]["after_broken"]
+    assert "after_broken" not in run["results"]
+
+
+def test_skipped_and_disabled_stages_deliver_none():
+    run = StageExecutor().run(
+        [
+            Stage("skipped", lambda inputs: "nunca", condition=lambda inputs: False),
+            Stage("disabled", lambda inputs: "nunca", enabled=False),
+            Stage("consumer", lambda inputs: dict(inputs), deps=["skipped", "disabled"]),
+        ]
+    )
+
+    assert statuses(run) == {"skipped": SKIPPED, "disabled": DISABLED, "consumer": COMPLETED}
+    assert run["results"]["consumer"] == {"skipped": None, "disabled": None}
+    assert run["errors"] == {}
+
+
+def test_timeout_without_retries_runs_once_and_blocks_dependents():
+    calls = []
+    release = threading.Event()
+
+    def slow(inputs):
+        calls.append(1)
+        release.wait(2)
+        return "tarde"
+
+    started = time.monotonic()
+    run = StageExecutor().run(
+        [
+            Stage("slow", slow, timeout=0.1, retries=0),
+            Stage("after", lambda inputs: "nunca", deps=["slow"]),
+        ]
+    )
+    release.set()
+
+    assert time.monotonic() - started < 1
+    assert statuses(run) == {"slow": TIMEOUT, "after": BLOCKED}
+    assert attempts(run)["slow"] == 1
+    assert len(calls) == 1
+
+
+def test_timed_out_attempt_is_retried_while_the_first_keeps_running():
+    calls = []
+    release = threading.Event()
+
+    def slow_then_fast(inputs):
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(2)
+        return len(calls)
+
+    run = StageExecutor().run([Stage("stage", slow_then_fast, timeout=0.1, retries=1, retry_delay=0)])
+    release.set()
+
+    assert statuses(run) == {"stage": COMPLETED}
+    assert attempts(run)["stage"] == 2
+    assert len(calls) == 2
+
+
+def test_failed_attempt_is_retried_until_success():
+    calls = []
+
+    def flaky(inputs):
+        calls.append(1)
+        if len(calls) < 3:
+            raise Exception("intermitente")
+        return "ok"
+
+    stats = StageStats()
+    run = StageExecutor(stats=stats).run([Stage("flaky", flaky, retries=2, retry_delay=0.01)])
+
+    assert run["results"] == {"flaky": "ok"}
+    assert attempts(run)["flaky"] == 3
+    assert stats.stats()["flaky"]["retries"] == 2
+
+
+def test_retries_exhausted_reports_last_error():
+    def fail(inputs):
+        raise Exception("siempre falla")
+
+    run = StageExecutor().run([Stage("stage", fail, retries=1, retry_delay=0.01)])
+
+    assert statuses(run) == {"stage": FAILED}
+    assert attempts(run)["stage"] == 2
+    assert run["errors"] == {"stage": "siempre falla"}
+
+
+@pytest.mark.parametrize(
+    "stages",
+    [
+        [Stage("a", lambda inputs: 1), Stage("a", lambda inputs: 2)],
+        [Stage("a", lambda inputs: 1, deps=["missing"])],
+        [Stage("a", lambda inputs: 1, deps=["b"]), Stage("b", lambda inputs: 2, deps=["a"])],
+    ],
+)
+def test_invalid_graphs(stages):
+    with pytest.raises(ValueError):
+        StageExecutor().run(stages)
+
+
+def test_stage_policy_env_override(monkeypatch):
+    monkeypatch.setenv("STAGE_TIMEOUT_IMAGE_GENERATE", "30")
+    monkeypatch.setenv("STAGE_RETRIES_IMAGE_GENERATE", "2")
+
+    assert stage_policy("image_generate", 120, retries=0) == {"timeout": 30.0, "retries": 2}
+    assert stage_policy("analyze", 45, retries=1) == {"timeout": 45.0, "retries": 1}
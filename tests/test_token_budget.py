@@ -0,0 +1,39 @@
+from src.services.llm_adapter import LLMAdapter
+from src.services.token_budget import TokenBudgeter
+
+
+def make_budgeter(**kwargs):
+    return TokenBudgeter(LLMAdapter.PLATFORM_LIMITS, **kwargs)
+
+
+def test_static_budget_follows_platform_limits():
+    budgeter = make_budgeter()
+
+    assert budgeter.budget("instagram") < budgeter.budget("linkedin")
+    assert budgeter.budget("desconocida") == budgeter.ceiling
+
+
+def test_budget_shrinks_to_observed_p95_after_enough_samples():
+    budgeter = make_budgeter(min_samples=10)
+    static = budgeter.budget("facebook")
+
+    for _ in range(9):
+        budgeter.record("facebook", static, 300)
+    assert budgeter.budget("facebook") == static
+
+    budgeter.record("facebook", static, 300)
+    assert budgeter.budget("facebook") == 360
+
+
+def test_truncation_boosts_the_budget_up_to_the_ceiling():
+    budgeter = make_budgeter(min_samples=1)
+    static = budgeter.budget("facebook")
+    budgeter.record("facebook", static, 100)
+
+    budgeter.record("facebook", budgeter.budget("facebook"), 120, "length")
+
+    assert budgeter.budget("facebook") > static
+    for _ in range(20):
+        budgeter.record("facebook", budgeter.budget("facebook"), None, "length")
+    assert budgeter.budget("facebook") == budgeter.ceiling
+    assert budgeter.stats()["facebook"]["truncations"] == 21